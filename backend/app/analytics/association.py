@@ -0,0 +1,176 @@
+"""
+Categorical association (Cramér's V, normalized mutual information)
+
+Pour chaque paire catégorielle × catégorielle et catégorielle × numérique,
+une table de contingence sur les lignes où les deux colonnes sont
+renseignées. Les colonnes sont codées en entiers (pd.factorize, codes
+stables dans un process) ; chaque table se remplit d'un np.bincount sur
+`code_x * niveaux_y + code_y`. Les numériques sont découpées en
+NUMERIC_BINS classes d'effectifs égaux, bornes tirées d'une première passe
+(RankTable, app/analytics/correlation.py) ; une numérique à peu de valeurs
+distinctes garde une classe par valeur.
+Les tables des parts se fusionnent en réalignant les niveaux par libellé.
+Colonnes de plus de MAX_LEVELS niveaux (identifiants, texte libre) exclues.
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.analytics.correlation import numeric_values
+
+NUMERIC_BINS = 10
+MAX_LEVELS = 100
+
+
+def _level(value) -> str:
+    # 1 et 1.0 (blocs CSV lus en entiers ou en flottants) : même niveau
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _pad(table: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    if table.shape == shape:
+        return table
+    return np.pad(table, [(0, shape[0] - table.shape[0]), (0, shape[1] - table.shape[1])])
+
+
+def association_measures(table: np.ndarray) -> Tuple[Optional[float], Optional[float], int]:
+    """(Cramér's V, NMI (arithmetic mean of the entropies, like scikit-learn), observations)"""
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0].astype(np.float64)
+    n = float(table.sum())
+    r, c = table.shape
+    if n == 0 or r < 2 or c < 2:
+        return None, None, int(n)
+
+    rows, cols = table.sum(axis=1), table.sum(axis=0)
+    expected = np.outer(rows, cols) / n
+    chi2 = float(((table - expected) ** 2 / expected).sum())
+    cramers_v = math.sqrt(chi2 / (n * (min(r, c) - 1)))
+
+    p, pr, pc = table / n, rows / n, cols / n
+    nz = p > 0
+    mi = float((p[nz] * np.log(p[nz] / np.outer(pr, pc)[nz])).sum())
+    entropy = float(-(pr * np.log(pr)).sum() - (pc * np.log(pc)).sum()) / 2
+    nmi = mi / entropy if entropy > 0 else 0.0
+    return round(min(cramers_v, 1.0), 3), round(min(max(nmi, 0.0), 1.0), 3), int(n)
+
+
+class AssociationAccumulator:
+    """Mergeable contingency tables of every pair involving a categorical column"""
+
+    def __init__(self, edges: Optional[Dict[str, np.ndarray]] = None):
+        self.edges = {col: e for col, e in (edges or {}).items() if len(e)}
+        self.columns: Optional[List[str]] = None
+        self.excluded = set()
+        self.levels: Dict[str, Dict[str, int]] = {}   # libellé -> code, par colonne catégorielle
+        self.tables: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def _exclude(self, col: str):
+        self.excluded.add(col)
+        self.levels.pop(col, None)
+        self.tables = {pair: t for pair, t in self.tables.items() if col not in pair}
+
+    def _count(self, col: str) -> int:
+        return len(self.edges[col]) if col in self.edges else len(self.levels[col])
+
+    def _encode(self, col: str, series: pd.Series) -> Optional[np.ndarray]:
+        if col in self.edges:
+            values = numeric_values(series)
+            if values is None:
+                return None
+            edges = self.edges[col]
+            codes = np.minimum(np.searchsorted(edges, values), len(edges) - 1)
+            return np.where(np.isnan(values), -1, codes)
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return None
+        if numeric_values(series) is not None and col not in self.levels:
+            return np.full(len(series), -1, dtype=np.int64) if series.isna().all() else None
+        codes, uniques = pd.factorize(series)
+        vocab = self.levels.setdefault(col, {})
+        mapping = np.array([vocab.setdefault(_level(u), len(vocab)) for u in uniques], dtype=np.int64)
+        if len(vocab) > MAX_LEVELS:
+            return None
+        if not len(mapping):
+            return np.full(len(series), -1, dtype=np.int64)
+        return np.where(codes >= 0, mapping[codes], -1)
+
+    def _add(self, pair: Tuple[str, str], counts: np.ndarray):
+        table = self.tables.get(pair)
+        if table is None:
+            self.tables[pair] = counts
+            return
+        shape = (max(table.shape[0], counts.shape[0]), max(table.shape[1], counts.shape[1]))
+        self.tables[pair] = _pad(table, shape) + _pad(counts, shape)
+
+    def update(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+        codes: Dict[str, np.ndarray] = {}
+        for col in self.columns:
+            if col in self.excluded or col not in df.columns:
+                continue
+            encoded = self._encode(col, df[col])
+            if encoded is None:
+                if col in self.levels or col in self.edges:
+                    self._exclude(col)
+                continue
+            codes[col] = encoded
+
+        names = list(codes)
+        for i, a in enumerate(names):
+            for b in names[i + 1:]:
+                if a in self.edges and b in self.edges:
+                    continue  # numérique × numérique : voir les corrélations
+                ka, kb = self._count(a), self._count(b)
+                valid = (codes[a] >= 0) & (codes[b] >= 0)
+                counts = np.bincount(codes[a][valid] * kb + codes[b][valid], minlength=ka * kb)
+                self._add((a, b), counts.reshape(ka, kb))
+
+    def merge(self, other: "AssociationAccumulator"):
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self.columns = other.columns
+        elif self.columns != other.columns:
+            raise ValueError("Cannot merge associations computed on different columns")
+        for col in other.excluded - self.excluded:
+            self._exclude(col)
+
+        # Codes de l'autre part -> codes de celle-ci (niveaux alignés par libellé)
+        remap: Dict[str, np.ndarray] = {}
+        for col, vocab in other.levels.items():
+            if col in self.excluded:
+                continue
+            mine = self.levels.setdefault(col, {})
+            remap[col] = np.array([mine.setdefault(label, len(mine)) for label in vocab], dtype=np.int64)
+            if len(mine) > MAX_LEVELS:
+                self._exclude(col)
+        for (a, b), table in other.tables.items():
+            if a in self.excluded or b in self.excluded:
+                continue
+            rows = remap.get(a, np.arange(table.shape[0]))
+            cols = remap.get(b, np.arange(table.shape[1]))
+            aligned = np.zeros((self._count(a), self._count(b)), dtype=table.dtype)
+            aligned[np.ix_(rows, cols)] = table
+            self._add((a, b), aligned)
+
+    def to_payload(self) -> dict:
+        """Columns used and pairs sorted by decreasing Cramér's V"""
+        used = [c for c in self.columns or [] if c not in self.excluded and (c in self.edges or c in self.levels)]
+        columns = [
+            {"name": c, "kind": "numeric" if c in self.edges else "categorical", "levels": self._count(c)}
+            for c in used
+        ]
+        pairs = []
+        for (a, b), table in self.tables.items():
+            cramers_v, nmi, n = association_measures(table)
+            pairs.append({"x": a, "y": b, "cramers_v": cramers_v, "nmi": nmi, "n": n})
+        pairs.sort(key=lambda p: -1.0 if p["cramers_v"] is None else -p["cramers_v"])
+        return {
+            "bins": NUMERIC_BINS,
+            "max_levels": MAX_LEVELS,
+            "columns": columns,
+            "excluded": [c for c in self.columns or [] if c in self.excluded],
+            "pairs": pairs,
+        }
@@ -0,0 +1,105 @@
+"""
+Lazy per-column statistics
+
+L'onglet distributions n'affiche qu'une colonne à la fois : ses statistiques
+sont calculées seules, en ne lisant que cette colonne du Parquet (sidecar)
+par requêtes Range (app/analytics/ranges.py), puis rangées par colonne
+dans `dataset_analytics`. Le profil global se déduit du pied de page
+Parquet (nombre de lignes, types, nulls des statistiques de groupes).
+Sans sidecar Parquet, ces fonctions renvoient None : l'appelant retombe
+sur le profil complet.
+"""
+import hashlib
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from app.analytics.profiler import profile_columns, profile_from_metadata
+from app.analytics.ranges import fetch_parquet_columns, fetch_parquet_footer
+from app.analytics.readers import open_parquet, parquet_columns
+from app.analytics.sidecar import analytics_source
+from app.analytics.store import (
+    analysis_version_key,
+    column_analysis,
+    file_key,
+    load_analyses,
+    load_analysis,
+    save_analyses,
+    save_analysis,
+)
+from app.core.compute import compute_executor
+from app.core.config import get_settings
+from app.core.singleflight import analysis_key, coalesce
+
+
+def _parquet_url(dataset: dict) -> Optional[str]:
+    url, ext = analytics_source(dataset)
+    return url if ext == ".parquet" else None
+
+
+def columns_from_stats(stats: dict, names: List[str]) -> List[dict]:
+    by_name = {column["name"]: column for column in stats["columns"]}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Colonne inconnue : {unknown[0]}")
+    return [by_name[name] for name in names]
+
+
+async def dataset_profile(dataset: dict) -> Optional[dict]:
+    """Global profile of the dataset file, from the stored results or the Parquet footer"""
+    file_hash = file_key(dataset)
+    stored = await load_analysis(file_hash, "profile")
+    if stored is not None:
+        return stored
+    url = _parquet_url(dataset)
+    if url is None:
+        return None
+
+    footer, _ = await fetch_parquet_footer(url)
+    # Lecture du seul pied de page (quelques ms) : pas de passage par le pool
+    profile = profile_from_metadata(footer)
+    if profile is not None:
+        await save_analysis(file_hash, "profile", profile)
+    return profile
+
+
+async def column_stats(dataset: dict, names: List[str]) -> Optional[List[dict]]:
+    """
+    Stats of the columns `names`, in that order: stored ones are reused,
+    the others are computed together, reading only their column chunks.
+    """
+    file_hash = file_key(dataset)
+    analyses: Dict[str, str] = {name: column_analysis("column", name) for name in names}
+    stored = await load_analyses(file_hash, set(analyses.values()))
+    missing = [name for name in dict.fromkeys(names) if analyses[name] not in stored]
+    if not missing:
+        return [stored[analyses[name]] for name in names]
+
+    # Profil complet déjà calculé (tâche d'ingestion) : rien à lire
+    full = await load_analysis(file_hash, "stats")
+    if full is not None:
+        return columns_from_stats(full, names)
+
+    url = _parquet_url(dataset)
+    if url is None:
+        return None
+
+    async def compute() -> Dict[str, dict]:
+        footer, metadata = await fetch_parquet_footer(url)
+        available = set(parquet_columns(open_parquet(footer)))
+        unknown = [name for name in missing if name not in available]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Colonne inconnue : {unknown[0]}")
+        source = await fetch_parquet_columns(url, footer, metadata, missing)
+        payloads = await compute_executor.run(profile_columns, source, missing, get_settings().profile_chunk_rows)
+        results = {analyses[name]: payload for name, payload in zip(missing, payloads)}
+        await save_analyses(file_hash, results)
+        return results
+
+    async def load_cached() -> Optional[Dict[str, dict]]:
+        cached = await load_analyses(file_hash, {analyses[name] for name in missing})
+        return cached if len(cached) == len(missing) else None
+
+    # Même jeu de colonnes demandé en même temps : un seul calcul
+    digest = hashlib.sha1("\0".join(sorted(missing)).encode()).hexdigest()[:16]
+    computed = await coalesce(analysis_key(f"{analysis_version_key('column')}:{digest}", file_hash), compute, load_cached)
+    stored.update(computed)
+    return [stored[analyses[name]] for name in names]
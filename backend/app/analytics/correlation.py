@@ -0,0 +1,289 @@
+"""
+Streaming Pearson / Spearman correlation
+
+Corrélation par paires complètes (même règle que DataFrame.corr) calculée
+bloc par bloc : chaque bloc produit des matrices de co-moments (effectifs,
+moyennes, sommes de carrés et produits croisés centrés par paire de colonnes)
+qui se fusionnent avec les formules de Chan et al.
+Les produits matriciels se font en float32 par sous-blocs de lignes, cumulés
+en float64 ; un bloc sans valeur manquante n'en calcule qu'un seul.
+
+Spearman : corrélation de Pearson des rangs. Une première passe construit la
+table des valeurs de chaque colonne (RankTable, fusionnable). Deux écarts
+assumés avec DataFrame.corr(method="spearman") :
+- les rangs sont ceux de toutes les valeurs renseignées de la colonne, puis
+  corrélés par paires complètes (= df.rank().corr()) ; pandas reclasse
+  chaque paire sur ses seules lignes complètes. Identique sans valeur
+  manquante ; reclasser chaque paire coûterait p² passes ;
+- au-delà de RANK_LEVELS valeurs distinctes, les rangs sont interpolés entre
+  groupes d'effectifs égaux (écart de l'ordre du millième).
+
+Le résultat est rangé sous forme compacte (triangle supérieur, entiers au
+millième) ; `correlation_view` en tire la matrice, la forme compacte ou les
+`top_k` paires les plus corrélées.
+"""
+import math
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# Arrondi des coefficients (3 décimales, comme la sortie pandas précédente)
+SCALE = 1000
+
+# Lignes par produit float32 : erreur d'arrondi négligeable au millième
+SUB_BLOCK_ROWS = 8192
+
+# Au-delà de ce nombre de valeurs distinctes, rangs interpolés par quantiles
+RANK_LEVELS = 4096
+
+
+def _is_numeric(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def numeric_values(series: pd.Series) -> Optional[np.ndarray]:
+    if not _is_numeric(series.dtype):
+        return None
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class RankTable:
+    """
+    Sorted distinct values of a column and their counts: exact mid-ranks,
+    or (past RANK_LEVELS values) RANK_LEVELS equal-count buckets whose ranks
+    are interpolated.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.exact = True
+
+    def _add(self, keys: np.ndarray, counts: np.ndarray):
+        keys = np.concatenate([self.keys, keys])
+        counts = np.concatenate([self.counts, counts])
+        order = np.argsort(keys, kind="stable")
+        keys, counts = keys[order], counts[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+        self.keys = keys[starts]
+        self.counts = np.add.reduceat(counts, starts) if len(keys) else counts
+        if len(self.keys) > RANK_LEVELS:
+            self._coarsen()
+
+    def _coarsen(self):
+        # Groupes d'effectifs égaux, représentés par leur plus grande valeur
+        cumulative = np.cumsum(self.counts)
+        bucket = np.minimum((cumulative - 1) * RANK_LEVELS // cumulative[-1], RANK_LEVELS - 1)
+        ends = np.flatnonzero(np.r_[bucket[1:] != bucket[:-1], True])
+        self.keys = self.keys[ends]
+        self.counts = np.diff(np.r_[0, cumulative[ends]])
+        self.exact = False
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if len(values):
+            keys, counts = np.unique(values, return_counts=True)
+            self._add(keys, counts.astype(np.int64))
+
+    def merge(self, other: "RankTable"):
+        self.exact = self.exact and other.exact
+        self._add(other.keys, other.counts)
+
+    def ranks(self, values: np.ndarray) -> np.ndarray:
+        """Ranks (1-based, ties averaged) of `values` among the column values; NaN stays NaN"""
+        ranks = np.full(len(values), np.nan)
+        present = ~np.isnan(values)
+        if not len(self.keys):
+            return ranks
+        cumulative = np.cumsum(self.counts).astype(np.float64)
+        if self.exact:
+            mid = cumulative - (self.counts - 1) / 2
+            idx = np.minimum(np.searchsorted(self.keys, values[present]), len(self.keys) - 1)
+            ranks[present] = mid[idx]
+        else:
+            ranks[present] = np.interp(values[present], self.keys, cumulative)
+        return ranks
+
+    def bin_edges(self, bins: int) -> np.ndarray:
+        """Upper bounds of `bins` equal-count bins (every distinct value when there are fewer)"""
+        if len(self.keys) <= bins:
+            return self.keys.copy()
+        cumulative = np.cumsum(self.counts)
+        targets = cumulative[-1] * np.arange(1, bins + 1) / bins
+        idx = np.minimum(np.searchsorted(cumulative, targets), len(self.keys) - 1)
+        return np.unique(self.keys[idx])
+
+
+class RankAccumulator:
+    """First pass of Spearman: a RankTable per numeric column"""
+
+    def __init__(self):
+        self.tables: Dict[str, RankTable] = {}
+
+    def update(self, df: pd.DataFrame):
+        for col in df.columns:
+            values = numeric_values(df[col])
+            if values is not None:
+                self.tables.setdefault(col, RankTable()).update(values)
+
+    def merge(self, other: "RankAccumulator"):
+        for col, table in other.tables.items():
+            if col in self.tables:
+                self.tables[col].merge(table)
+            else:
+                self.tables[col] = table
+
+
+class CorrelationAccumulator:
+    """Pairwise-complete co-moment matrices over the numeric columns (of their ranks with `ranks`)"""
+
+    def __init__(self, ranks: Optional[Dict[str, RankTable]] = None):
+        self.ranks = ranks
+        self.columns: Optional[List[str]] = None
+        self.excluded = set()
+        self.n: Optional[np.ndarray] = None     # n[i, j] : lignes où i et j sont renseignés
+        self.mean: Optional[np.ndarray] = None  # mean[i, j] : moyenne de i sur ces lignes
+        self.m2: Optional[np.ndarray] = None    # m2[i, j] : somme des carrés centrés de i sur ces lignes
+        self.c: Optional[np.ndarray] = None     # c[i, j] : co-moment de i et j
+
+    def __getstate__(self):
+        # Les tables de rangs ne servent qu'au calcul : pas renvoyées par le pool
+        return {**self.__dict__, "ranks": None}
+
+    def _matrix(self, df: pd.DataFrame) -> np.ndarray:
+        if self.columns is None:
+            self.columns = list(df.columns)
+        values = np.full((len(df), len(self.columns)), np.nan)
+        for i, col in enumerate(self.columns):
+            if col not in df.columns or col in self.excluded:
+                continue
+            series = df[col]
+            column = numeric_values(series)
+            if column is not None:
+                values[:, i] = column if self.ranks is None else self.ranks.get(col, RankTable()).ranks(column)
+            elif series.notna().any():
+                self.excluded.add(col)
+        return values
+
+    @staticmethod
+    def _sums(values: np.ndarray, shift: np.ndarray):
+        """(n, sums, squares, products) of the pairwise-complete rows, centered on `shift`"""
+        p = values.shape[1]
+        n, sums, squares, products = (np.zeros((p, p)) for _ in range(4))
+        for start in range(0, len(values), SUB_BLOCK_ROWS):
+            block = values[start:start + SUB_BLOCK_ROWS]
+            present = ~np.isnan(block)
+            centered = np.where(present, block - shift, 0.0).astype(np.float32)
+            products += centered.T @ centered
+            if present.all():
+                # Bloc complet : effectifs, sommes et carrés ne dépendent que de la colonne
+                n += len(block)
+                sums += centered.sum(axis=0, dtype=np.float64)[:, None]
+                squares += np.square(centered).sum(axis=0, dtype=np.float64)[:, None]
+                continue
+            mask = present.astype(np.float32)
+            n += mask.T @ mask
+            sums += centered.T @ mask
+            squares += np.square(centered).T @ mask
+        return n, sums, squares, products
+
+    def update(self, df: pd.DataFrame):
+        values = self._matrix(df)
+        if len(values) == 0:
+            return
+
+        # Décalage par la moyenne du bloc : limite les annulations numériques
+        counts = (~np.isnan(values)).sum(axis=0)
+        shift = np.divide(np.nansum(values, axis=0), counts, out=np.zeros(values.shape[1]), where=counts > 0)
+        n, sums, squares, products = self._sums(values, shift)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            local_mean = np.where(n > 0, sums / n, 0.0)
+            m2 = np.where(n > 0, squares - sums * local_mean, 0.0)
+            c = np.where(n > 0, products - sums * local_mean.T, 0.0)
+
+        other = CorrelationAccumulator()
+        other.columns, other.excluded = self.columns, set()
+        other.n, other.mean, other.m2, other.c = n, local_mean + shift[:, None], m2, c
+        self._merge_moments(other)
+
+    def _merge_moments(self, other: "CorrelationAccumulator"):
+        if self.n is None:
+            self.n, self.mean, self.m2, self.c = other.n, other.mean, other.m2, other.c
+            return
+        n = self.n + other.n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            delta = other.mean - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * np.where(n > 0, other.n / n, 0.0), 0.0)
+        self.m2 = self.m2 + other.m2 + delta * delta * weight
+        self.c = self.c + other.c + delta * delta.T * weight
+        self.n = n
+
+    def merge(self, other: "CorrelationAccumulator"):
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self.columns = other.columns
+        elif self.columns != other.columns:
+            raise ValueError("Cannot merge correlations computed on different columns")
+        self.excluded |= other.excluded
+        if other.n is not None:
+            self._merge_moments(other)
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [c for c in self.columns or [] if c not in self.excluded]
+
+    def to_payload(self, method: str = "pearson") -> dict:
+        """Stored form: upper triangle (row by row, diagonal included) in thousandths, None when undefined"""
+        columns = self.numeric_columns
+        p = len(columns)
+        if self.n is None:
+            return {"method": method, "columns": columns, "scale": SCALE, "values": [None] * (p * (p + 1) // 2)}
+
+        idx = [self.columns.index(c) for c in columns]
+        sub = np.ix_(idx, idx)
+        n, m2, c = self.n[sub], self.m2[sub], self.c[sub]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = c / np.sqrt(m2 * m2.T)
+        upper = np.triu_indices(p)
+        values = np.clip(corr[upper], -1.0, 1.0)
+        defined = (n[upper] >= 2) & np.isfinite(values)
+        scaled = np.rint(np.where(defined, values, 0.0) * SCALE).astype(int).tolist()
+        encoded = [v if ok else None for v, ok in zip(scaled, defined.tolist())]
+        return {"method": method, "columns": columns, "scale": SCALE, "values": encoded}
+
+
+def correlation_view(payload: dict, fmt: str = "matrix", top_k: Optional[int] = None) -> dict:
+    """
+    Response built from a stored payload: full matrix, compact form
+    (the stored one) or the `top_k` pairs of largest absolute correlation.
+    """
+    columns, scale = payload["columns"], payload["scale"]
+    p = len(columns)
+    values = np.array([np.nan if v is None else v for v in payload["values"]], dtype=np.float64) / scale
+    rows, cols = np.triu_indices(p)
+
+    if top_k is not None:
+        strength = np.where(np.isnan(values) | (rows == cols), -1.0, np.abs(values))
+        k = min(top_k, int((strength >= 0).sum()))
+        best = np.argpartition(-strength, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+        best = best[np.lexsort((best, -strength[best]))]
+        pairs = [
+            {"x": columns[rows[i]], "y": columns[cols[i]], "r": round(float(values[i]), 3)}
+            for i in best.tolist()
+        ]
+        return {"method": payload["method"], "columns": columns, "pairs": pairs}
+
+    if fmt == "compact":
+        return payload
+
+    matrix = np.empty((p, p))
+    matrix[rows, cols] = values
+    matrix[cols, rows] = values
+
+    def cell(v: float):
+        return None if math.isnan(v) else round(v, 3)
+
+    return {"method": payload["method"], "columns": columns, "matrix": [[cell(v) for v in row] for row in matrix.tolist()]}
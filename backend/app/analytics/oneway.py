@@ -0,0 +1,256 @@
+"""
+Exposure-weighted one-way analysis
+
+Pour chaque facteur (toute colonne autre que la cible, l'exposition et le
+montant), par niveau : lignes, exposition, sinistres (somme de la cible),
+fréquence = sinistres / exposition et son intervalle de confiance de
+Poisson exact (quantiles du khi-deux, Garwood), sévérité = montant /
+sinistres si une colonne de montant est donnée.
+
+Une seule lecture du fichier : chaque bloc est réduit par facteur avec
+np.bincount pondéré (codes pd.factorize des catégorielles, valeurs
+distinctes des numériques). Une numérique garde une modalité par valeur
+jusqu'à MAX_LEVELS valeurs, sinon ses valeurs (regroupées au-delà de
+FINE_LEVELS en classes d'effectifs égaux, comme RankTable) sont découpées
+après coup en NUMERIC_BINS classes d'effectifs égaux.
+"""
+import math
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+from app.analytics.correlation import numeric_values
+
+NUMERIC_BINS = 10
+MAX_LEVELS = 100
+FINE_LEVELS = 4096
+CONFIDENCE = 0.95
+
+# Colonnes des sommes par niveau
+ROWS, EXPOSURE, CLAIMS, AMOUNT = range(4)
+
+
+def poisson_interval(counts: np.ndarray, confidence: float = CONFIDENCE):
+    """Exact (Garwood) Poisson interval of observed counts, from chi-square quantiles"""
+    alpha = 1 - confidence
+    counts = np.asarray(counts, dtype=np.float64)
+    low = np.where(counts > 0, chi2.ppf(alpha / 2, 2 * np.maximum(counts, 1e-12)) / 2, 0.0)
+    high = chi2.ppf(1 - alpha / 2, 2 * counts + 2) / 2
+    return low, high
+
+
+def _level(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _group_sums(codes: np.ndarray, weights: np.ndarray, levels: int) -> np.ndarray:
+    return np.column_stack([np.bincount(codes, weights=weights[:, k], minlength=levels) for k in range(weights.shape[1])])
+
+
+def _add_rows(table: np.ndarray, rows: int) -> np.ndarray:
+    return table if len(table) >= rows else np.vstack([table, np.zeros((rows - len(table), table.shape[1]))])
+
+
+class _NumericFactor:
+    """Sums per distinct value, merged into equal-count buckets past FINE_LEVELS values"""
+
+    def __init__(self):
+        self.keys = np.empty(0)
+        self.sums = np.empty((0, 4))
+        self.exact = True
+        self.low = math.inf
+
+    def add(self, keys: np.ndarray, sums: np.ndarray):
+        if not len(keys):
+            return
+        self.low = min(self.low, float(keys[0]))
+        keys = np.concatenate([self.keys, keys])
+        sums = np.vstack([self.sums, sums])
+        order = np.argsort(keys, kind="stable")
+        keys, sums = keys[order], sums[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        self.keys, self.sums = keys[starts], np.add.reduceat(sums, starts, axis=0)
+        if len(self.keys) > FINE_LEVELS:
+            self._coarsen(FINE_LEVELS)
+            self.exact = False
+
+    def _coarsen(self, buckets: int):
+        cumulative = np.cumsum(self.sums[:, ROWS])
+        bucket = np.minimum(((cumulative - 1) * buckets // cumulative[-1]).astype(np.int64), buckets - 1)
+        ends = np.flatnonzero(np.r_[bucket[1:] != bucket[:-1], True])
+        self.keys = self.keys[ends]
+        self.sums = np.diff(np.vstack([np.zeros((1, 4)), np.cumsum(self.sums, axis=0)[ends]]), axis=0)
+
+    def merge(self, other: "_NumericFactor"):
+        self.exact = self.exact and other.exact
+        self.add(other.keys, other.sums)
+        self.low = min(self.low, other.low)
+
+    def levels(self) -> tuple:
+        """(kind, labels, sums) of the final levels: one per value, or NUMERIC_BINS bins"""
+        if self.exact and len(self.keys) <= MAX_LEVELS:
+            return "numeric", [float(k) for k in self.keys], self.sums
+        binned = _NumericFactor()
+        binned.keys, binned.sums = self.keys, self.sums
+        binned._coarsen(NUMERIC_BINS)
+        bounds = [self.low] + binned.keys.tolist()
+        labels = [
+            f"[{low:g}, {high:g}]" if i == 0 else f"]{low:g}, {high:g}]"
+            for i, (low, high) in enumerate(zip(bounds, bounds[1:]))
+        ]
+        return "binned", labels, binned.sums
+
+
+class OneWayAccumulator:
+    """Exposure, claims and amounts per level of every factor, in one pass"""
+
+    def __init__(self, target: str, exposure: Optional[str] = None, amount: Optional[str] = None):
+        self.target, self.exposure, self.amount = target, exposure, amount
+        self.columns: Optional[List[str]] = None
+        self.excluded = set()
+        self.totals = np.zeros(4)
+        self.missing: Dict[str, np.ndarray] = {}
+        self.numeric: Dict[str, _NumericFactor] = {}
+        self.levels: Dict[str, Dict[str, int]] = {}   # libellé -> code, par facteur catégoriel
+        self.categorical: Dict[str, np.ndarray] = {}
+
+    def _variable(self, df: pd.DataFrame, name: Optional[str], role: str, default: float) -> np.ndarray:
+        if name is None:
+            return np.full(len(df), default)
+        if name not in df.columns:
+            raise ValueError(f"Colonne inconnue : {name}")
+        values = numeric_values(df[name])
+        if values is None:
+            raise ValueError(f"Variable {role} non numérique : {name}")
+        return values
+
+    def _exclude(self, col: str):
+        self.excluded.add(col)
+        for table in (self.missing, self.numeric, self.levels, self.categorical):
+            table.pop(col, None)
+
+    def update(self, df: pd.DataFrame):
+        if self.columns is None:
+            variables = {self.target, self.exposure, self.amount}
+            self.columns = [c for c in df.columns if c not in variables]
+        claims = self._variable(df, self.target, "cible", 0.0)
+        exposure = self._variable(df, self.exposure, "d'exposition", 1.0)
+        amount = np.nan_to_num(self._variable(df, self.amount, "de montant", 0.0))
+        valid = ~np.isnan(claims) & ~np.isnan(exposure)
+        weights = np.column_stack([np.ones(int(valid.sum())), exposure[valid], claims[valid], amount[valid]])
+        self.totals += weights.sum(axis=0)
+        if not len(weights):
+            return
+
+        for col in self.columns:
+            if col in self.excluded or col not in df.columns:
+                continue
+            series = df[col][valid]
+            present = series.notna().to_numpy()
+            if not present.all():
+                self.missing[col] = self.missing.get(col, np.zeros(4)) + weights[~present].sum(axis=0)
+            values = numeric_values(series)
+            if values is not None and col not in self.levels:
+                keys, codes = np.unique(values[present], return_inverse=True)
+                self.numeric.setdefault(col, _NumericFactor()).add(keys, _group_sums(codes, weights[present], len(keys)))
+            elif col in self.numeric or pd.api.types.is_datetime64_any_dtype(series.dtype):
+                self._exclude(col)  # texte dans une colonne numérique, ou date
+            else:
+                self._update_categorical(col, series[present], weights[present])
+
+    def _update_categorical(self, col: str, series: pd.Series, weights: np.ndarray):
+        codes, uniques = pd.factorize(series)
+        vocab = self.levels.setdefault(col, {})
+        mapping = np.array([vocab.setdefault(_level(u), len(vocab)) for u in uniques], dtype=np.int64)
+        if len(vocab) > MAX_LEVELS:
+            self._exclude(col)
+            return
+        table = _add_rows(self.categorical.get(col, np.zeros((0, 4))), len(vocab))
+        if len(mapping):
+            table = table + _group_sums(mapping[codes], weights, len(vocab))
+        self.categorical[col] = table
+
+    def merge(self, other: "OneWayAccumulator"):
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self.columns = other.columns
+        self.totals += other.totals
+        for col in other.excluded:
+            self._exclude(col)
+        for col, sums in other.missing.items():
+            if col not in self.excluded:
+                self.missing[col] = self.missing.get(col, np.zeros(4)) + sums
+        for col, factor in other.numeric.items():
+            if col in self.levels:
+                self._exclude(col)
+            elif col not in self.excluded:
+                self.numeric.setdefault(col, _NumericFactor()).merge(factor)
+        for col, vocab in other.levels.items():
+            if col in self.numeric:
+                self._exclude(col)
+            if col in self.excluded:
+                continue
+            mine = self.levels.setdefault(col, {})
+            codes = np.array([mine.setdefault(label, len(mine)) for label in vocab], dtype=np.int64)
+            if len(mine) > MAX_LEVELS:
+                self._exclude(col)
+                continue
+            table = _add_rows(self.categorical.get(col, np.zeros((0, 4))), len(mine))
+            table[codes] += other.categorical[col]
+            self.categorical[col] = table
+
+    def _stats(self, labels: list, sums: np.ndarray) -> List[dict]:
+        if not len(sums):
+            return []
+        sums = np.asarray(sums, dtype=np.float64).reshape(-1, 4)
+        low, high = poisson_interval(sums[:, CLAIMS])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            exposure = sums[:, EXPOSURE]
+            frequency = sums[:, CLAIMS] / exposure
+            ci_low, ci_high = low / exposure, high / exposure
+            severity = sums[:, AMOUNT] / sums[:, CLAIMS]
+
+        def clean(v: float, digits: int) -> Optional[float]:
+            return round(v, digits) if math.isfinite(v) else None
+
+        return [
+            {
+                "level": label,
+                "rows": int(row[ROWS]),
+                "exposure": clean(float(row[EXPOSURE]), 2),
+                "claims": clean(float(row[CLAIMS]), 4),
+                "frequency": clean(f, 6),
+                "ci_low": clean(lo, 6),
+                "ci_high": clean(hi, 6),
+                "severity": clean(s, 2) if self.amount else None,
+            }
+            for label, row, f, lo, hi, s in zip(
+                labels, sums, frequency.tolist(), ci_low.tolist(), ci_high.tolist(), severity.tolist(),
+            )
+        ]
+
+    def to_payload(self) -> dict:
+        """Cube: totals, then the levels of each factor (missing values last, level None)"""
+        factors = []
+        for col in self.columns or []:
+            if col in self.numeric:
+                kind, labels, sums = self.numeric[col].levels()
+            elif col in self.categorical:
+                labels, sums, kind = list(self.levels[col]), self.categorical[col], "categorical"
+            else:
+                continue
+            if col in self.missing:
+                labels, sums = list(labels) + [None], np.vstack([sums, self.missing[col]])
+            factors.append({"name": col, "kind": kind, "levels": self._stats(labels, sums)})
+        return {
+            "target": self.target,
+            "exposure": self.exposure,
+            "amount": self.amount,
+            "confidence": CONFIDENCE,
+            "totals": self._stats([None], self.totals)[0],
+            "factors": factors,
+            "excluded": [c for c in self.columns or [] if c in self.excluded],
+        }
@@ -0,0 +1,311 @@
+"""
+Parallel profiling and correlation
+
+Le fichier (sur disque) est découpé en parts : groupes de lignes Parquet ×
+blocs de colonnes, ou plages d'octets CSV alignées sur les fins de ligne.
+Les fichiers Parquet (sidecars) sont lus en mémoire mappée, colonnes
+projetées (les corrélations ne décodent que les colonnes numériques).
+Chaque part est traitée par le pool de calcul (app/core/compute.py) et
+renvoie un agrégat partiel fusionnable (DatasetProfiler /
+CorrelationAccumulator / AssociationAccumulator / OneWayAccumulator), réduit
+ensuite dans le process de l'API.
+Avec une clé de cache, les parts lues restent en mémoire dans le process
+(app/core/framecache.py) pour les analyses suivantes du même fichier : une
+part est toujours envoyée au même process du pool (route dérivée de la clé
+et de ses lignes), qui l'a déjà en cache.
+"""
+import io
+import math
+import mmap
+import os
+import zlib
+from functools import reduce
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from app.analytics.association import NUMERIC_BINS, AssociationAccumulator
+from app.analytics.correlation import CorrelationAccumulator, RankAccumulator, RankTable
+from app.analytics.oneway import OneWayAccumulator
+from app.analytics.profiler import DatasetProfiler
+from app.analytics.readers import FileWindow, iter_frames, open_parquet, parquet_columns, parquet_numeric_columns
+from app.core.compute import compute_executor
+from app.core.config import get_settings
+from app.core.framecache import frame_cache
+
+# ---------------------------------------------------------------------------
+# Découpage
+# ---------------------------------------------------------------------------
+
+def _blocks(items: list, count: int) -> List[list]:
+    size = math.ceil(len(items) / max(count, 1))
+    return [items[i:i + size] for i in range(0, len(items), size)] or [items]
+
+
+def _parquet_parts(path: str, workers: int, split_columns: bool, numeric_only: bool) -> List[dict]:
+    parquet = open_parquet(path)
+    groups = list(range(parquet.metadata.num_row_groups))
+    # Projection : seules les colonnes utiles à l'analyse sont décodées
+    names = parquet_numeric_columns(parquet) if numeric_only else parquet_columns(parquet)
+
+    row_blocks = _blocks(groups, min(len(groups), workers * 2)) if groups else [[]]
+    column_blocks = [names]
+    if split_columns and len(row_blocks) < workers and len(names) > 1:
+        column_blocks = _blocks(names, min(len(names), math.ceil(workers / len(row_blocks))))
+    return [
+        {"kind": "parquet", "row_groups": rows, "columns": cols}
+        for rows in row_blocks
+        for cols in column_blocks
+    ]
+
+
+def _csv_parts(path: str, workers: int) -> List[dict]:
+    settings = get_settings()
+    size = os.path.getsize(path)
+    if workers < 2 or size < settings.analytics_csv_split_mb * 1024 * 1024:
+        return [{"kind": "whole"}]
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # Un champ entre guillemets peut contenir un retour à la ligne : pas de découpage
+        if data.find(b'"') != -1:
+            return [{"kind": "whole"}]
+        header_end = data.find(b"\n") + 1
+        if header_end == 0:
+            return [{"kind": "whole"}]
+        names = list(pd.read_csv(io.BytesIO(data[:header_end]), nrows=0).columns)
+
+        count = min(workers * 2, max(1, size // (settings.analytics_csv_split_mb * 1024 * 1024)))
+        bounds = [header_end]
+        for i in range(1, count):
+            newline = data.find(b"\n", max(header_end, size * i // count))
+            if newline == -1:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+        bounds.append(size)
+
+    return [
+        {"kind": "csv_range", "start": start, "end": end, "names": names}
+        for start, end in zip(bounds, bounds[1:])
+        if end > start
+    ]
+
+
+def plan_parts(path: str, ext: str, workers: int, split_columns: bool = True, numeric_only: bool = False) -> List[dict]:
+    if ext == ".parquet":
+        return _parquet_parts(path, workers, split_columns, numeric_only)
+    if ext in (".csv", ""):
+        return _csv_parts(path, workers)
+    return [{"kind": "whole"}]
+
+
+# ---------------------------------------------------------------------------
+# Travail d'une part (exécuté dans un process du pool)
+# ---------------------------------------------------------------------------
+
+def _stream_part(path: str, ext: str, part: dict, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if part["kind"] == "parquet":
+        parquet = open_parquet(path)
+        if not part["row_groups"]:
+            yield parquet.schema_arrow.empty_table().select(part["columns"]).to_pandas()
+            return
+        for batch in parquet.iter_batches(batch_size=chunk_rows, row_groups=part["row_groups"], columns=part["columns"]):
+            yield batch.to_pandas()
+    elif part["kind"] == "csv_range":
+        with io.BufferedReader(FileWindow(path, part["start"], part["end"]), 1024 * 1024) as window:
+            with pd.read_csv(window, header=None, names=part["names"], chunksize=chunk_rows) as reader:
+                yield from reader
+    else:
+        yield from iter_frames(path, ext, chunk_rows)
+
+
+# Octets en mémoire par octet de fichier, une fois lu (estimation avant lecture)
+_EXPANSION = {".parquet": 2, ".xlsx": 10, ".xls": 4}
+_DEFAULT_EXPANSION = 3
+
+
+def _estimated_bytes(path: str, ext: str, part: dict) -> int:
+    if part["kind"] == "parquet":
+        metadata = open_parquet(path).metadata
+        columns = set(part["columns"])
+        size = sum(
+            metadata.row_group(rg).column(i).total_uncompressed_size
+            for rg in part["row_groups"]
+            for i in range(metadata.num_columns)
+            if metadata.row_group(rg).column(i).path_in_schema in columns
+        )
+    elif part["kind"] == "csv_range":
+        size = part["end"] - part["start"]
+    else:
+        size = os.path.getsize(path)
+    return size * _EXPANSION.get(ext, _DEFAULT_EXPANSION)
+
+
+def _cached_part(path: str, ext: str, part: dict, chunk_rows: int, cache_key: str) -> pd.DataFrame:
+    if part["kind"] == "parquet":
+        # Entrée par groupes de lignes, complétée colonne par colonne
+        def load(columns: List[str]) -> pd.DataFrame:
+            return _stream_frame(path, ext, {**part, "columns": columns}, chunk_rows)
+
+        return frame_cache.get_or_load((cache_key, tuple(part["row_groups"])), part["columns"], load)
+    key = (cache_key, part["kind"], part.get("start"), part.get("end"))
+    return frame_cache.get_or_load(key, None, lambda _: _stream_frame(path, ext, part, chunk_rows))
+
+
+def _stream_frame(path: str, ext: str, part: dict, chunk_rows: int) -> pd.DataFrame:
+    return pd.concat(list(_stream_part(path, ext, part, chunk_rows)), ignore_index=True)
+
+
+def _iter_part(path: str, ext: str, part: dict, chunk_rows: int, cache_key: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    if cache_key is None or not frame_cache.fits(_estimated_bytes(path, ext, part)):
+        # Trop gros pour le cache : lecture en flux, mémoire bornée
+        yield from _stream_part(path, ext, part, chunk_rows)
+        return
+    df = _cached_part(path, ext, part, chunk_rows, cache_key)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def profile_part(path: str, ext: str, part: dict, chunk_rows: int, cache_key: Optional[str] = None) -> DatasetProfiler:
+    profiler = DatasetProfiler()
+    for df in _iter_part(path, ext, part, chunk_rows, cache_key):
+        profiler.update(df)
+    return profiler
+
+
+def rank_part(path: str, ext: str, part: dict, chunk_rows: int, cache_key: Optional[str] = None) -> RankAccumulator:
+    accumulator = RankAccumulator()
+    for df in _iter_part(path, ext, part, chunk_rows, cache_key):
+        accumulator.update(df)
+    return accumulator
+
+
+def correlate_part(
+    path: str,
+    ext: str,
+    part: dict,
+    chunk_rows: int,
+    cache_key: Optional[str] = None,
+    ranks: Optional[Dict[str, RankTable]] = None,
+) -> CorrelationAccumulator:
+    accumulator = CorrelationAccumulator(ranks)
+    for df in _iter_part(path, ext, part, chunk_rows, cache_key):
+        accumulator.update(df)
+    return accumulator
+
+
+def associate_part(
+    path: str,
+    ext: str,
+    part: dict,
+    chunk_rows: int,
+    cache_key: Optional[str] = None,
+    edges: Optional[Dict[str, np.ndarray]] = None,
+) -> AssociationAccumulator:
+    accumulator = AssociationAccumulator(edges)
+    for df in _iter_part(path, ext, part, chunk_rows, cache_key):
+        accumulator.update(df)
+    return accumulator
+
+
+def oneway_part(
+    path: str,
+    ext: str,
+    part: dict,
+    chunk_rows: int,
+    cache_key: Optional[str],
+    target: str,
+    exposure: Optional[str] = None,
+    amount: Optional[str] = None,
+) -> OneWayAccumulator:
+    accumulator = OneWayAccumulator(target, exposure, amount)
+    for df in _iter_part(path, ext, part, chunk_rows, cache_key):
+        accumulator.update(df)
+    return accumulator
+
+
+# ---------------------------------------------------------------------------
+# Orchestration (côté API)
+# ---------------------------------------------------------------------------
+
+def part_routes(parts: List[dict], cache_key: str) -> List[int]:
+    """
+    Pool route of each part: the same rows of the same file (whatever the
+    analysis and its columns) always go to the same process. Consecutive row
+    blocks, and the column blocks of one row block, go to consecutive
+    processes.
+    """
+    base = zlib.crc32(cache_key.encode())
+    row_blocks: Dict[tuple, int] = {}
+    column_blocks: Dict[tuple, int] = {}
+    routes = []
+    for part in parts:
+        rows = (part["kind"], tuple(part.get("row_groups", ())), part.get("start"))
+        block = row_blocks.setdefault(rows, len(row_blocks))
+        routes.append(base + block + column_blocks.get(rows, 0))
+        column_blocks[rows] = column_blocks.get(rows, 0) + 1
+    return routes
+
+
+async def _map_parts(fn, path: str, ext: str, parts: List[dict], cache_key: Optional[str], *extra) -> list:
+    chunk_rows = get_settings().profile_chunk_rows
+    routes = part_routes(parts, cache_key) if cache_key is not None else None
+    return await compute_executor.map(
+        fn, [(path, ext, part, chunk_rows, cache_key, *extra) for part in parts], routes=routes,
+    )
+
+
+def _reduce(partials: list):
+    def merge(acc, partial):
+        acc.merge(partial)
+        return acc
+    return reduce(merge, partials)
+
+
+async def profile_path(path: str, ext: str, cache_key: Optional[str] = None) -> dict:
+    """
+    Stats payload of a local file, computed by the process pool. `cache_key`
+    identifies the file content: its parts are kept in the frame cache.
+    """
+    parts = plan_parts(path, ext, compute_executor.workers)
+    return _reduce(await _map_parts(profile_part, path, ext, parts, cache_key)).to_payload()
+
+
+async def correlate_path(
+    path: str,
+    ext: str,
+    cache_key: Optional[str] = None,
+    method: str = "pearson",
+) -> CorrelationAccumulator:
+    """
+    Merged correlation accumulator of a local file, computed by the process
+    pool. Spearman reads the file twice: value tables, then ranks.
+    """
+    parts = plan_parts(path, ext, compute_executor.workers, split_columns=False, numeric_only=True)
+    ranks = None
+    if method == "spearman":
+        ranks = _reduce(await _map_parts(rank_part, path, ext, parts, cache_key)).tables
+    return _reduce(await _map_parts(correlate_part, path, ext, parts, cache_key, ranks))
+
+
+async def associate_path(path: str, ext: str, cache_key: Optional[str] = None) -> dict:
+    """
+    Association payload of a local file, computed by the process pool:
+    value tables of the numeric columns (bin edges), then contingency tables.
+    """
+    parts = plan_parts(path, ext, compute_executor.workers, split_columns=False)
+    tables = _reduce(await _map_parts(rank_part, path, ext, parts, cache_key)).tables
+    edges = {col: table.bin_edges(NUMERIC_BINS) for col, table in tables.items()}
+    return _reduce(await _map_parts(associate_part, path, ext, parts, cache_key, edges)).to_payload()
+
+
+async def oneway_path(
+    path: str,
+    ext: str,
+    cache_key: Optional[str],
+    target: str,
+    exposure: Optional[str] = None,
+    amount: Optional[str] = None,
+) -> dict:
+    """One-way cube of a local file (one pass), computed by the process pool"""
+    parts = plan_parts(path, ext, compute_executor.workers, split_columns=False)
+    return _reduce(await _map_parts(oneway_part, path, ext, parts, cache_key, target, exposure, amount)).to_payload()
@@ -0,0 +1,221 @@
+"""
+Analytics precomputation after a file upload
+
+Dès qu'un fichier est stocké, une tâche `dataset_analytics` est inscrite
+dans la file durable (app/core/jobs.py) : un worker écrit le sidecar
+Parquet du fichier (app/analytics/sidecar.py), en calcule l'aperçu, le
+profil complet et les corrélations (pool de calcul) puis les range dans
+`dataset_analytics` (app/analytics/store.py), avec le tableau one-way
+(app/analytics/oneway.py) si le dataset a une cible et une exposition ;
+le premier visiteur trouve les résultats déjà prêts.
+L'avancement est visible dans `datasets.analytics_status`
+(pending -> running -> done | failed) et via `GET /jobs/{id}`.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+from fastapi import HTTPException
+from app.analytics.parallel import correlate_path, oneway_path, profile_path
+from app.analytics.preview import preview_file
+from app.analytics.sidecar import SIDECAR_BUCKET, analytics_source, sidecar_object_path, source_key, write_sidecar
+from app.analytics.store import analysis_version_key, column_analysis, file_key, load_analyses, save_analyses
+from app.core.compute import compute_executor
+from app.core.config import get_settings
+from app.core.database import get_supabase_admin_client, execute, run_in_db_pool
+from app.core.filecache import file_cache
+from app.core.jobs import JobContext, enqueue_job, job_key, job_task
+from app.core.singleflight import analysis_key, hold_leases
+from app.schemas import AnalyticsStatus
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_TASK = "dataset_analytics"
+
+# Analyses calculées par la tâche (les autres le sont à la demande)
+PRECOMPUTED = ("preview", "stats", "correlations")
+
+
+def oneway_analysis(target: str, exposure: Optional[str], amount: Optional[str] = None) -> str:
+    """Analysis type of the one-way cube of these variables"""
+    return column_analysis("oneway", "\0".join([target, exposure or "", amount or ""]))
+
+
+def dataset_oneway(dataset: dict) -> Optional[str]:
+    """Precomputed one-way cube of the dataset (target and exposure both set)"""
+    if dataset.get("target_variable") and dataset.get("exposure_variable"):
+        return oneway_analysis(dataset["target_variable"], dataset["exposure_variable"])
+    return None
+
+
+def precomputed_analyses(dataset: dict) -> List[str]:
+    oneway = dataset_oneway(dataset)
+    return list(PRECOMPUTED) + ([oneway] if oneway else [])
+
+
+async def oneway_payload(
+    path: str,
+    ext: str,
+    cache_key: Optional[str],
+    target: str,
+    exposure: Optional[str] = None,
+    amount: Optional[str] = None,
+) -> dict:
+    """One-way cube, or {"error": ...} when the variables do not fit the file (stored too)"""
+    try:
+        return await oneway_path(path, ext, cache_key, target, exposure, amount)
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+async def analyze_path(path: str, ext: str, cache_key: Optional[str] = None, dataset: Optional[dict] = None) -> dict:
+    """Compute every stored analysis from a local file (one-way cube from the `dataset` variables)"""
+    oneway = dataset_oneway(dataset or {})
+    tasks = [
+        compute_executor.run(preview_file, path, ext),
+        profile_path(path, ext, cache_key),
+        correlate_path(path, ext, cache_key),
+    ]
+    if oneway:
+        tasks.append(oneway_payload(path, ext, cache_key, dataset["target_variable"], dataset["exposure_variable"]))
+    preview, stats, correlations, *cube = await asyncio.gather(*tasks)
+    # Moins de 2 colonnes numériques : conservé quand même, l'API répond 422
+    results = {"preview": preview, "stats": stats, "correlations": correlations.to_payload()}
+    if oneway:
+        results[oneway] = cube[0]
+    return results
+
+
+async def build_sidecar(path: str, ext: str, file_hash: str, dest: str) -> str:
+    """Write the Parquet sidecar of a local file to `dest`, upload it, return its public URL"""
+    settings = get_settings()
+    # Excel volumineux : la conversion peut dépasser le délai des calculs interactifs
+    await compute_executor.run(
+        write_sidecar, path, ext, dest, settings.sidecar_row_group_rows, settings.profile_chunk_rows,
+        timeout=settings.job_timeout_s,
+    )
+    bucket = get_supabase_admin_client().storage.from_(SIDECAR_BUCKET)
+    object_path = sidecar_object_path(file_hash)
+    await run_in_db_pool(bucket.upload, object_path, dest, {"content-type": "application/vnd.apache.parquet", "upsert": "true"})
+    return bucket.get_public_url(object_path)
+
+
+async def find_sidecar(file_hash: str) -> Optional[str]:
+    """Sidecar already built for this content (identical file uploaded before)"""
+    response = await execute(
+        get_supabase_admin_client()
+        .table("datasets")
+        .select("sidecar_url")
+        .eq("file_hash", file_hash)
+        .not_.is_("sidecar_url", "null")
+        .limit(1)
+    )
+    return response.data[0]["sidecar_url"] if response.data else None
+
+
+async def _update_dataset(dataset_id: str, file_url: str, values: dict) -> bool:
+    # Filtre sur file_url : un run obsolète n'écrase jamais un upload plus récent
+    response = await execute(
+        get_supabase_admin_client().table("datasets").update(values).eq("id", dataset_id).eq("file_url", file_url)
+    )
+    return bool(response.data)
+
+
+async def _set_status(dataset_id: str, file_url: str, status: AnalyticsStatus, extra: Optional[dict] = None) -> bool:
+    return await _update_dataset(dataset_id, file_url, {
+        "analytics_status": status.value,
+        "analytics_updated_at": datetime.now(timezone.utc).isoformat(),
+        **(extra or {}),
+    })
+
+
+async def missing_analyses(file_hash: str, analyses: Iterable[str] = PRECOMPUTED) -> List[str]:
+    """Precomputed analyses of the file not stored yet for the current algorithm versions"""
+    analyses = list(analyses)
+    stored = await load_analyses(file_hash, analyses)
+    return [analysis for analysis in analyses if analysis not in stored]
+
+
+async def reusable_sidecar(file_hash: str, analyses: Iterable[str] = PRECOMPUTED) -> Optional[str]:
+    """Sidecar URL when the sidecar and every analysis of this content already exist"""
+    if await missing_analyses(file_hash, analyses):
+        return None
+    return await find_sidecar(file_hash)
+
+
+async def schedule_dataset_analytics(dataset_id: str, file_url: str, file_hash: str) -> dict:
+    """Queue the precomputation; the same file is never queued twice at once"""
+    return await enqueue_job(
+        ANALYTICS_TASK,
+        {"dataset_id": dataset_id, "file_url": file_url, "file_hash": file_hash},
+        idempotency_key=job_key(ANALYTICS_TASK, dataset_id, file_hash),
+        priority=10,
+    )
+
+
+async def _dataset_variables(dataset_id: str) -> dict:
+    response = await execute(
+        get_supabase_admin_client().table("datasets").select("target_variable, exposure_variable").eq("id", dataset_id).limit(1)
+    )
+    return response.data[0] if response.data else {}
+
+
+async def _analyze(ctx: JobContext, file_hash: str, sidecar_url: Optional[str], dataset: dict) -> dict:
+    dataset_id, file_url = ctx.payload["dataset_id"], ctx.payload["file_url"]
+    source_url, ext = analytics_source({"file_url": file_url, "sidecar_url": sidecar_url})
+    async with file_cache.local_file(source_key(file_hash, sidecar_url is not None), source_url, ext) as path:
+        sidecar_path = path + ".sidecar.parquet"
+        try:
+            if sidecar_url is None:
+                await ctx.progress(0.1, "Conversion en Parquet")
+                try:
+                    sidecar_url = await build_sidecar(path, ext, file_hash, sidecar_path)
+                    await _update_dataset(dataset_id, file_url, {"sidecar_url": sidecar_url})
+                    # Les analyses à la demande liront le sidecar sans le télécharger
+                    file_cache.put(source_key(file_hash, True), sidecar_path, ".parquet")
+                    path, ext = sidecar_path, ".parquet"
+                except Exception as e:
+                    if isinstance(e, HTTPException) and e.status_code == 503:
+                        raise
+                    # Les analyses restent possibles sur le fichier d'origine
+                    logger.warning("Parquet sidecar failed for %s: %s", file_hash, e)
+
+            await ctx.progress(0.4, "Aperçu, profil et corrélations")
+            return await analyze_path(path, ext, source_key(file_hash, sidecar_url is not None), dataset)
+        finally:
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+
+
+@job_task(ANALYTICS_TASK)
+async def run_dataset_analytics(ctx: JobContext) -> dict:
+    dataset_id, file_url = ctx.payload["dataset_id"], ctx.payload["file_url"]
+    if not await _set_status(dataset_id, file_url, AnalyticsStatus.RUNNING):
+        return {"skipped": "superseded by a newer upload"}
+
+    file_hash = file_key(ctx.payload)
+    dataset = await _dataset_variables(dataset_id)
+    sidecar_url = await find_sidecar(file_hash)
+    if sidecar_url and not await missing_analyses(file_hash, precomputed_analyses(dataset)):
+        await _set_status(dataset_id, file_url, AnalyticsStatus.DONE, {"analytics_error": None, "sidecar_url": sidecar_url})
+        return {"reused": True}
+
+    # Les visiteurs qui manquent le cache pendant ce calcul attendent son résultat
+    computed = [analysis for analysis in ("stats", "correlations", dataset_oneway(dataset)) if analysis]
+    leases = [analysis_key(analysis_version_key(analysis), file_hash) for analysis in computed]
+    async with hold_leases(leases):
+        try:
+            results = await _analyze(ctx, file_hash, sidecar_url, dataset)
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            # Échec définitif seulement à la dernière tentative (sinon le worker retente)
+            status = AnalyticsStatus.FAILED if ctx.last_attempt else AnalyticsStatus.PENDING
+            await _set_status(dataset_id, file_url, status, {"analytics_error": str(error)[:1000]})
+            raise
+
+        await ctx.progress(0.9, "Enregistrement")
+        await save_analyses(file_hash, results)
+        await _set_status(dataset_id, file_url, AnalyticsStatus.DONE, {"analytics_error": None})
+    profile = results["stats"]["profile"]
+    return {"total_rows": profile["total_rows"], "total_cols": profile["total_cols"]}
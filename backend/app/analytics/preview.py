@@ -0,0 +1,32 @@
+"""
+Dataset file preview (first rows), run in the compute pool
+"""
+import io
+from typing import IO, Union
+import pandas as pd
+from app.analytics.readers import head_row_groups, open_parquet, parquet_columns
+
+PREVIEW_ROWS = 10
+
+
+def preview_file(source: Union[str, bytes, IO[bytes]], ext: str, nrows: int = PREVIEW_ROWS) -> dict:
+    """First `nrows` rows of a file given as a path, a file object or its leading bytes"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    if ext == ".parquet":
+        parquet = open_parquet(source)
+        # Seuls les premiers groupes de lignes sont lus (cf. app/analytics/ranges.py)
+        row_groups = head_row_groups(parquet.metadata, nrows)
+        batch = next(parquet.iter_batches(batch_size=nrows, row_groups=row_groups, columns=parquet_columns(parquet)), None)
+        df = batch.to_pandas() if batch is not None else parquet.schema_arrow.empty_table().to_pandas()
+    elif ext in (".xlsx", ".xls"):
+        # .xlsx : openpyxl en lecture seule, lignes lues en flux jusqu'à `nrows`
+        df = pd.read_excel(source, nrows=nrows)
+    else:
+        df = pd.read_csv(source, nrows=nrows, on_bad_lines="skip")
+
+    columns = [{"name": col, "type": str(df[col].dtype)} for col in df.columns]
+    rows = df.fillna("").astype(str).values.tolist()
+
+    return {"columns": columns, "rows": rows, "total_rows": len(rows)}
@@ -0,0 +1,281 @@
+"""
+Streaming dataset profiler
+
+Profil en une seule passe, bloc par bloc, à mémoire bornée : chaque colonne
+tient des résumés de taille fixe (moments de Welford, sketch de quantiles
+KLL, HyperLogLog, heavy hitters, histogramme en flux). Le payload produit a
+la même forme que l'ancien calcul pandas de /datasets/{id}/stats.
+
+Précision : moyenne, écart-type, min, max, null_count et top_values (tant
+que la colonne a moins de 2048 modalités) sont exacts ; les quantiles ont
+une erreur de rang inférieure à 1 %, `unique` est exact jusqu'à 2048 valeurs
+distinctes puis estimé à environ 1 %. L'histogramme est exact jusqu'à 2048
+valeurs distinctes (tiré des comptes exacts des heavy hitters : données
+entières, codes) ; au-delà, les comptes sont répartis uniformément dans des
+cases fines (1/1024 de l'étendue).
+"""
+import math
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from app.analytics.readers import Source, iter_frames, open_parquet, parquet_columns
+from app.analytics.sketches import FrequentItems, Moments, QuantileSketch, StreamingHistogram
+
+TARGET_CANDIDATES = ["ClaimNb", "claim_nb", "target", "label", "y", "income", "churn", "default"]
+
+
+def _is_numeric(dtype) -> bool:
+    # Même règle que select_dtypes(include=["number"]) : les booléens sont catégoriels
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _label(value) -> str:
+    """String form of a numeric key once a column turns out to be categorical"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _safe(v: float) -> Optional[float]:
+    return None if v is None or not math.isfinite(v) else round(float(v), 4)
+
+
+class ColumnProfile:
+    """Bounded-memory summary of one column"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.null_count = 0
+        self.dtype = None
+        self.numeric: Optional[bool] = None  # None tant que la colonne n'a que des nulls
+        self.moments = Moments()
+        self.quantiles = QuantileSketch()
+        self.histogram = StreamingHistogram()
+        self.frequent = FrequentItems()
+
+    def _observe_dtype(self, dtype):
+        if self.dtype is None or self.dtype == dtype:
+            self.dtype = dtype
+        elif _is_numeric(self.dtype) and _is_numeric(dtype):
+            self.dtype = np.promote_types(self.dtype, dtype)
+        elif _is_numeric(self.dtype):
+            self.dtype = dtype
+
+    def _demote(self):
+        """A column first seen as numeric holds text further down the file"""
+        self.numeric = False
+        self.moments, self.quantiles, self.histogram = Moments(), QuantileSketch(), StreamingHistogram()
+        self.frequent.relabel(_label)
+
+    def update(self, series: pd.Series):
+        self.count += len(series)
+        nulls = series.isna()
+        null_count = int(nulls.sum())
+        self.null_count += null_count
+        values = series[~nulls] if null_count else series
+        if values.empty:
+            return
+
+        self._observe_dtype(series.dtype)
+        numeric = _is_numeric(series.dtype)
+        if self.numeric is None:
+            self.numeric = numeric
+        elif self.numeric and not numeric:
+            coerced = pd.to_numeric(values, errors="coerce")
+            if coerced.isna().any():
+                self._demote()
+            else:
+                values, numeric = coerced, True
+
+        if self.numeric:
+            array = values.to_numpy(dtype=np.float64)
+            self.moments.update(array)
+            self.quantiles.update(array)
+            self.histogram.update(array)
+            self.frequent.update_counts(pd.Series(array).value_counts())
+        else:
+            if numeric:
+                labels = values.map(_label)
+            elif pd.api.types.is_string_dtype(values.dtype) and values.dtype != object:
+                labels = values
+            else:
+                labels = values.astype(str)
+            self.frequent.update(labels)
+
+    def merge(self, other: "ColumnProfile"):
+        self.count += other.count
+        self.null_count += other.null_count
+        if other.numeric is None:
+            return
+        if other.dtype is not None:
+            self._observe_dtype(other.dtype)
+        if self.numeric is None:
+            self.numeric = other.numeric
+        if self.numeric and not other.numeric:
+            self._demote()
+        elif other.numeric and not self.numeric:
+            other._demote()
+
+        if self.numeric:
+            self.moments.merge(other.moments)
+            self.quantiles.merge(other.quantiles)
+            self.histogram.merge(other.histogram)
+        self.frequent.merge(other.frequent)
+
+    def _histogram(self, unique: int) -> dict:
+        n_bins = min(30, max(5, unique))
+        lo, hi = self.moments.min, self.moments.max
+        if lo == hi:
+            counts, edges = np.histogram([lo], bins=n_bins, weights=[self.moments.n])
+            counts = counts.astype(np.int64)
+        else:
+            edges = np.linspace(lo, hi, n_bins + 1)
+            if self.frequent.exact:
+                # Toutes les valeurs distinctes et leurs effectifs sont connus
+                keys = self.frequent.counts.index.to_numpy(dtype=np.float64)
+                weights = self.frequent.counts.to_numpy(dtype=np.float64)
+                counts = np.rint(np.histogram(keys, bins=edges, weights=weights)[0]).astype(np.int64)
+            else:
+                counts = self.histogram.rebin(edges)
+        return {
+            "counts": counts.tolist(),
+            "edges": [round(float(e), 4) for e in edges.tolist()],
+        }
+
+    def to_payload(self, total_rows: int) -> dict:
+        numeric = self.numeric is not False
+        unique = self.frequent.distinct_count()
+        stat = {
+            "name": self.name,
+            "dtype": str(self.dtype if self.dtype is not None else np.dtype("float64")),
+            "is_numeric": numeric,
+            "null_count": self.null_count,
+            "null_pct": round(self.null_count / total_rows * 100, 1) if total_rows > 0 else 0,
+            "unique": unique,
+        }
+
+        if numeric:
+            p25, p50, p75 = self.quantiles.quantiles([0.25, 0.50, 0.75])
+            empty = self.moments.n == 0
+            stat.update({
+                "mean": None if empty else _safe(self.moments.mean),
+                "std": _safe(self.moments.std),
+                "min": None if empty else _safe(self.moments.min),
+                "p25": _safe(p25),
+                "p50": _safe(p50),
+                "p75": _safe(p75),
+                "max": None if empty else _safe(self.moments.max),
+            })
+            if self.moments.n > 1:
+                stat["histogram"] = self._histogram(unique)
+        else:
+            top = self.frequent.top(10)
+            stat["top_values"] = [{"value": str(k), "count": int(v)} for k, v in top.items()]
+
+        return stat
+
+
+class DatasetProfiler:
+    """
+    Feeds DataFrame chunks to one ColumnProfile per column. Partials merge
+    whether they cover other rows, other columns, or both.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, ColumnProfile] = {}
+
+    @property
+    def total_rows(self) -> int:
+        return max((c.count for c in self.columns.values()), default=0)
+
+    def update(self, df: pd.DataFrame):
+        for col in df.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnProfile(col)
+            self.columns[col].update(df[col])
+
+    def merge(self, other: "DatasetProfiler"):
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+
+    def to_payload(self) -> dict:
+        total_rows = self.total_rows
+        total_nulls = sum(c.null_count for c in self.columns.values())
+        columns_stats: List[dict] = [c.to_payload(total_rows) for c in self.columns.values()]
+        numeric_count = sum(1 for s in columns_stats if s["is_numeric"])
+
+        return {
+            "profile": _global_profile(list(self.columns), total_rows, total_nulls, numeric_count),
+            "columns": columns_stats,
+        }
+
+
+def _global_profile(names: List[str], total_rows: int, total_nulls: int, numeric_count: int) -> dict:
+    total_cols = len(names)
+    total_cells = total_rows * total_cols
+    return {
+        "total_rows": total_rows,
+        "total_cols": total_cols,
+        "overall_null_pct": round(total_nulls / total_cells * 100, 1) if total_cells > 0 else 0,
+        "numeric_count": numeric_count,
+        "categorical_count": total_cols - numeric_count,
+        # Détection variable cible
+        "suggested_target": next((c for c in TARGET_CANDIDATES if c in names), None),
+    }
+
+
+def profile_from_metadata(source: Source) -> Optional[dict]:
+    """
+    Global profile of a Parquet file from its footer alone (row count, types,
+    null counts of the row-group statistics). None if statistics are missing.
+    """
+    import pyarrow as pa
+
+    parquet = open_parquet(source)
+    metadata, schema = parquet.metadata, parquet.schema_arrow
+    names = parquet_columns(parquet)
+    nulls = dict.fromkeys(names, 0)
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for i in range(row_group.num_columns):
+            column = row_group.column(i)
+            if column.path_in_schema not in nulls:
+                continue
+            if column.statistics is None or not column.statistics.has_null_count:
+                return None
+            nulls[column.path_in_schema] += column.statistics.null_count
+
+    total_rows = metadata.num_rows
+    numeric_count = sum(
+        1 for name in names
+        if pa.types.is_integer(schema.field(name).type)
+        or pa.types.is_floating(schema.field(name).type)
+        # Colonne sans aucune valeur : comptée numérique, comme par le profileur
+        or nulls[name] == total_rows
+    )
+    return _global_profile(names, total_rows, sum(nulls.values()), numeric_count)
+
+
+def profile_columns(source: Source, columns: List[str], chunk_rows: int) -> List[dict]:
+    """Stats of some columns of a Parquet file, read through column projection"""
+    profiler = DatasetProfiler()
+    for df in iter_frames(source, ".parquet", chunk_rows, columns=columns):
+        profiler.update(df)
+    total_rows = open_parquet(source).metadata.num_rows
+    return [profiler.columns[name].to_payload(total_rows) for name in columns]
+
+
+def profile_frames(frames: Iterable[pd.DataFrame]) -> dict:
+    profiler = DatasetProfiler()
+    for df in frames:
+        profiler.update(df)
+    return profiler.to_payload()
+
+
+def profile_file(source: Source, ext: str, chunk_rows: int) -> dict:
+    """Stats payload of a dataset file, read `chunk_rows` rows at a time"""
+    return profile_frames(iter_frames(source, ext, chunk_rows))
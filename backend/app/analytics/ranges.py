@@ -0,0 +1,167 @@
+"""
+Partial reads of remote Parquet files through HTTP Range requests
+
+Pour un aperçu, seuls le pied de page (métadonnées) et le premier groupe de
+lignes sont utiles : `fetch_parquet_head` les récupère en deux ou trois
+requêtes Range au lieu de télécharger le fichier, et les expose à pyarrow
+sous forme de `RangeFile` (fichier dont seules ces plages sont connues).
+De même, `fetch_parquet_columns` ne récupère que les colonnes demandées.
+"""
+import asyncio
+import io
+from typing import Dict, List, Optional, Tuple
+import pyarrow.parquet as pq
+from app.analytics.readers import head_row_groups
+from app.core.http_client import storage_http
+
+PARQUET_MAGIC = b"PAR1"
+
+# pyarrow lit d'emblée les 64 derniers KB du fichier pour trouver le pied de page
+FOOTER_READ_SIZE = 64 * 1024
+
+# Plages plus proches que cela : une seule requête (pyarrow regroupe aussi ses lectures)
+COALESCE_GAP = 64 * 1024
+
+
+class RangeFile(io.RawIOBase):
+    """Read-only file of `size` bytes of which only some byte ranges were fetched"""
+
+    def __init__(self, size: int, segments: Optional[Dict[int, bytes]] = None):
+        super().__init__()
+        self.size = size
+        self.segments: Dict[int, bytes] = dict(segments or {})
+        self._pos = 0
+
+    def __reduce__(self):
+        # Envoyé tel quel au pool de calcul
+        return RangeFile, (self.size, self.segments)
+
+    def add(self, offset: int, data: bytes):
+        self.segments[offset] = data
+
+    def covers(self, start: int, end: int) -> bool:
+        return any(s <= start and end <= s + len(d) for s, d in self.segments.items())
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        filled = 0
+        while filled < len(buffer) and self._pos < self.size:
+            segment = next(((s, d) for s, d in self.segments.items() if s <= self._pos < s + len(d)), None)
+            if segment is None:
+                raise OSError(f"Byte {self._pos} was not fetched")
+            start, data = segment
+            chunk = data[self._pos - start:self._pos - start + len(buffer) - filled]
+            buffer[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+            self._pos += len(chunk)
+        return filled
+
+
+def _content_size(response) -> int:
+    """Total size from `Content-Range: bytes a-b/size` (body length if the range was ignored)"""
+    content_range = response.headers.get("content-range", "")
+    if response.status_code == 206 and "/" in content_range:
+        return int(content_range.rsplit("/", 1)[1])
+    return len(response.content)
+
+
+async def fetch_range(url: str, start: int, end: Optional[int] = None, timeout: float = 30) -> Tuple[int, bytes, int]:
+    """
+    (offset, bytes, file size) of `url`[start:end]. A negative `start`
+    without `end` asks for the last -start bytes. A server that ignores
+    Range returns the whole file at offset 0.
+    """
+    if start < 0:
+        spec = f"bytes={start}"
+    else:
+        spec = f"bytes={start}-" + (str(end - 1) if end is not None else "")
+    response = await storage_http.get(url, headers={"Range": spec}, timeout=timeout)
+    response.raise_for_status()
+    size = _content_size(response)
+    if response.status_code != 206:
+        return 0, response.content, size
+    offset = int(response.headers["content-range"].split()[1].split("-")[0])
+    return offset, response.content, size
+
+
+def column_chunk_span(column) -> Tuple[int, int]:
+    """[start, end) byte span of one column chunk (dictionary page included)"""
+    start = column.data_page_offset
+    if column.has_dictionary_page and column.dictionary_page_offset:
+        start = min(start, column.dictionary_page_offset)
+    return start, start + column.total_compressed_size
+
+
+def row_group_span(metadata, index: int) -> Tuple[int, int]:
+    """[start, end) byte span of the column chunks of one row group"""
+    row_group = metadata.row_group(index)
+    spans = [column_chunk_span(row_group.column(i)) for i in range(row_group.num_columns)]
+    return min((s for s, _ in spans), default=0), max((e for _, e in spans), default=0)
+
+
+async def fetch_parquet_footer(url: str) -> Tuple[RangeFile, object]:
+    """RangeFile holding the footer of a remote Parquet file, and its metadata"""
+    offset, tail, size = await fetch_range(url, -FOOTER_READ_SIZE)
+    file = RangeFile(size, {offset: tail})
+    if not (offset == 0 and len(tail) == size):
+        if tail[-4:] != PARQUET_MAGIC:
+            raise ValueError("Not a Parquet file")
+        footer_start = size - 8 - int.from_bytes(tail[-8:-4], "little")
+        if footer_start < offset:
+            # Pied de page plus grand que la lecture initiale (beaucoup de colonnes)
+            start, data, _ = await fetch_range(url, footer_start, offset)
+            file.add(start, data)
+    # Petit fichier (ou Range ignoré) : déjà complet
+    return file, pq.read_metadata(file)
+
+
+async def _fetch_spans(url: str, file: RangeFile, spans: List[Tuple[int, int]]):
+    """Fetch byte spans into `file`, merging those less than COALESCE_GAP apart"""
+    merged: List[List[int]] = []
+    for start, end in sorted(spans):
+        if end <= start or file.covers(start, end):
+            continue
+        if merged and start - merged[-1][1] <= COALESCE_GAP:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    for start, data, _ in await asyncio.gather(*(fetch_range(url, start, end) for start, end in merged)):
+        file.add(start, data)
+
+
+async def fetch_parquet_head(url: str, nrows: int) -> RangeFile:
+    """Footer and leading row groups (first `nrows` rows) of a remote Parquet file"""
+    file, metadata = await fetch_parquet_footer(url)
+    groups = head_row_groups(metadata, nrows)
+    if groups:
+        # Groupes contigus : une seule requête
+        await _fetch_spans(url, file, [(row_group_span(metadata, groups[0])[0], row_group_span(metadata, groups[-1])[1])])
+    file.seek(0)
+    return file
+
+
+async def fetch_parquet_columns(url: str, file: RangeFile, metadata, columns: List[str]) -> RangeFile:
+    """Add the chunks of `columns` in every row group to a footer RangeFile (column projection)"""
+    wanted = set(columns)
+    spans = []
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for i in range(row_group.num_columns):
+            if row_group.column(i).path_in_schema in wanted:
+                spans.append(column_chunk_span(row_group.column(i)))
+    await _fetch_spans(url, file, spans)
+    file.seek(0)
+    return file
@@ -0,0 +1,99 @@
+"""
+Chunked readers for dataset files (CSV, Parquet, Excel)
+"""
+import io
+import mmap
+import os
+from typing import IO, Iterator, List, Optional, Union
+import pandas as pd
+
+Source = Union[str, IO[bytes]]
+
+
+class FileWindow(io.RawIOBase):
+    """Bytes [start, end) of a local file, read through a memory map instead of a copy"""
+
+    def __init__(self, path: str, start: int, end: int):
+        super().__init__()
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._pos, self._end = start, min(end, len(self._map))
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = max(0, min(len(buffer), self._end - self._pos))
+        buffer[:n] = self._map[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._map.close()
+        super().close()
+
+
+def file_extension(file_url: str) -> str:
+    """Extension of a Storage URL, query string excluded ('' if none)"""
+    return os.path.splitext(file_url.split("?")[0])[1].lower()
+
+
+def parquet_columns(parquet) -> List[str]:
+    """Data columns of a ParquetFile (pandas index columns excluded, like read_parquet)"""
+    index = {c for c in (parquet.schema_arrow.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)}
+    return [name for name in parquet.schema_arrow.names if name not in index]
+
+
+def parquet_numeric_columns(parquet) -> List[str]:
+    """Columns that can enter a correlation (numbers, or no value at all)"""
+    import pyarrow as pa
+
+    schema = parquet.schema_arrow
+    return [
+        name for name in parquet_columns(parquet)
+        if pa.types.is_integer(schema.field(name).type)
+        or pa.types.is_floating(schema.field(name).type)
+        or pa.types.is_null(schema.field(name).type)
+    ]
+
+
+def head_row_groups(metadata, nrows: int) -> List[int]:
+    """Leading row groups holding the first `nrows` rows"""
+    groups, rows = [], 0
+    while len(groups) < metadata.num_row_groups and (rows < nrows or not groups):
+        rows += metadata.row_group(len(groups)).num_rows
+        groups.append(len(groups))
+    return groups
+
+
+def open_parquet(source: Source):
+    """ParquetFile, memory-mapped when given a local path"""
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(source, memory_map=isinstance(source, str))
+
+
+def iter_frames(source: Source, ext: str, chunk_rows: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield the file as DataFrames of at most `chunk_rows` rows. CSV and
+    Parquet are read incrementally (Parquet: only `columns` if given);
+    Excel has no streaming reader and is loaded once, then sliced.
+    """
+    if ext == ".parquet":
+        parquet = open_parquet(source)
+        columns = parquet_columns(parquet) if columns is None else columns
+        if parquet.metadata.num_rows == 0:
+            yield parquet.schema_arrow.empty_table().select(columns).to_pandas()
+            return
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    elif ext in (".xlsx", ".xls"):
+        df = pd.read_excel(source)
+        if df.empty:
+            yield df
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+    else:
+        with pd.read_csv(source, chunksize=chunk_rows) as reader:
+            yield from reader
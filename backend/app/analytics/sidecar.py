@@ -0,0 +1,120 @@
+"""
+Parquet sidecar of uploaded dataset files
+
+À l'ingestion, le fichier d'origine (CSV, Excel, Parquet) est réécrit en
+Parquet typé, compressé (zstd), en groupes de lignes de taille fixe pour
+les lectures parallèles. Le sidecar est rangé dans le bucket
+`datasets-files` sous `sidecars/<sha256>.v<version>.parquet` (adressé par
+contenu : un fichier ré-uploadé à l'identique le retrouve) et référencé par
+`datasets.sidecar_url`. Toutes les analyses le lisent à la place de l'original.
+
+Les types sont unifiés sur tout le fichier avant écriture : une colonne
+entière dans un bloc et décimale dans un autre devient float64, une colonne
+mêlant nombres et textes devient texte.
+"""
+from typing import Callable, Dict, Iterator, List, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.analytics.readers import file_extension, iter_frames
+
+SIDECAR_VERSION = 1
+SIDECAR_BUCKET = "datasets-files"
+
+
+def sidecar_object_path(file_hash: str) -> str:
+    return f"sidecars/{file_hash}.v{SIDECAR_VERSION}.parquet"
+
+
+def _is_number(t: pa.DataType) -> bool:
+    return pa.types.is_integer(t) or pa.types.is_floating(t)
+
+
+def _promote(a: pa.DataType, b: pa.DataType) -> pa.DataType:
+    if a == b or pa.types.is_null(b):
+        return a
+    if pa.types.is_null(a):
+        return b
+    if _is_number(a) and _is_number(b):
+        return pa.float64() if pa.types.is_floating(a) or pa.types.is_floating(b) else pa.int64()
+    if pa.types.is_timestamp(a) and pa.types.is_timestamp(b):
+        return pa.timestamp("ns", tz=a.tz if a.tz == b.tz else None)
+    return pa.large_string() if pa.types.is_large_string(a) or pa.types.is_large_string(b) else pa.string()
+
+
+def _column_array(series: pd.Series) -> pa.Array:
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Colonne objet hétérogène (Excel) : texte, valeurs manquantes conservées
+        return pa.array([None if v is None or v is pd.NA or (isinstance(v, float) and v != v) else str(v) for v in series], pa.string())
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    return pa.table({str(name): _column_array(df[name]) for name in df.columns})
+
+
+def _cast(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    columns = []
+    for field in schema:
+        column = table.column(field.name)
+        if column.type != field.type:
+            column = column.cast(field.type)
+        columns.append(column)
+    return pa.table(columns, schema=schema)
+
+
+def _unified_schema(frames: Iterator[pd.DataFrame]) -> Tuple[pa.Schema, int]:
+    types: Dict[str, pa.DataType] = {}
+    rows = 0
+    for df in frames:
+        rows += len(df)
+        for field in _to_arrow(df).schema:
+            types[field.name] = _promote(types[field.name], field.type) if field.name in types else field.type
+    # Colonne entièrement vide : stockée en texte nul
+    return pa.schema([(name, pa.string() if pa.types.is_null(t) else t) for name, t in types.items()]), rows
+
+
+def write_sidecar(source: str, ext: str, dest: str, row_group_rows: int, chunk_rows: int) -> dict:
+    """
+    Rewrite a dataset file as Parquet at `dest` (runs in the compute pool).
+    Two passes over the file: type unification, then writing.
+    """
+    frames: Callable[[], Iterator[pd.DataFrame]]
+    if ext in (".xlsx", ".xls"):
+        # Lecture Excel unique (lente), gardée en mémoire pour les deux passes
+        df = pd.read_excel(source)
+        frames = lambda: (df.iloc[start:start + chunk_rows] for start in range(0, max(len(df), 1), chunk_rows))
+    else:
+        frames = lambda: iter_frames(source, ext, chunk_rows)
+
+    schema, rows = _unified_schema(frames())
+
+    pending: List[pa.Table] = []
+    pending_rows = 0
+    with pq.ParquetWriter(dest, schema, compression="zstd") as writer:
+        for df in frames():
+            pending.append(_cast(_to_arrow(df), schema))
+            pending_rows += len(df)
+            while pending_rows >= row_group_rows:
+                table = pa.concat_tables(pending)
+                writer.write_table(table.slice(0, row_group_rows), row_group_size=row_group_rows)
+                rest = table.slice(row_group_rows)
+                pending, pending_rows = [rest], len(rest)
+        if pending_rows or rows == 0:
+            writer.write_table(pa.concat_tables(pending) if pending else schema.empty_table(), row_group_size=row_group_rows)
+
+    metadata = pq.ParquetFile(dest).metadata
+    return {"rows": metadata.num_rows, "columns": metadata.num_columns, "row_groups": metadata.num_row_groups}
+
+
+def source_key(file_hash: str, sidecar: bool) -> str:
+    """Identity of the file analyses read, for the frame cache (a sidecar is not read like its original)"""
+    return f"{file_hash}:sidecar-v{SIDECAR_VERSION}" if sidecar else file_hash
+
+
+def analytics_source(dataset: dict) -> Tuple[str, str]:
+    """(URL, extension) of the file analyses should read: the sidecar when present"""
+    if dataset.get("sidecar_url"):
+        return dataset["sidecar_url"], ".parquet"
+    return dataset["file_url"], file_extension(dataset["file_url"])
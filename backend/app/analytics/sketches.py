@@ -0,0 +1,313 @@
+"""
+Mergeable streaming summaries
+
+Chaque résumé consomme les données par blocs (`update`), occupe une mémoire
+bornée quelle que soit la taille du fichier, et peut être fusionné avec un
+résumé du même type (`merge`) calculé sur un autre bloc.
+"""
+import math
+from typing import List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+
+class Moments:
+    """Count, mean, variance (Welford / Chan et al. pairwise merge), min and max"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        other = Moments()
+        other.n = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other: "Moments"):
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1, like pandas)"""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch: rank error of a fraction of a percent with k=512,
+    at most about 3k retained values.
+    Linear interpolation between retained values, like pandas: exact until
+    the first compaction.
+    """
+
+    def __init__(self, k: int = 512, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # Un élément reste au niveau courant si la taille est impaire
+            keep, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Les capacités dépendent de la hauteur : on repart du bas
+            level = 0
+
+    def update(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=np.float64)])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        if self.n == 0:
+            return [math.nan for _ in qs]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2 ** h, dtype=np.float64) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        # Une valeur de poids w tient les rangs [c - w, c - 1] (c : poids cumulé) ;
+        # placée au milieu, l'interpolation linéaire est celle de pandas quand w = 1
+        cumulative = np.cumsum(weights)
+        positions = cumulative - (weights + 1) / 2
+        ranks = np.asarray(qs, dtype=np.float64) * (cumulative[-1] - 1)
+        return [float(v) for v in np.interp(ranks, positions, items)]
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes (2^p one-byte registers)"""
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    @staticmethod
+    def hash_values(values) -> np.ndarray:
+        return pd.util.hash_array(np.asarray(values))
+
+    def update_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes << np.uint64(self.p)
+        # Position du premier bit à 1 : frexp est exact sur les 53 bits de poids fort
+        top = (rest >> np.uint64(11)).astype(np.float64)
+        bit_length = np.frexp(top)[1] + 11
+        max_rank = 64 - self.p + 1
+        rank = np.where(top > 0, 64 - bit_length + 1, max_rank)
+        np.maximum.at(self.registers, idx, np.minimum(rank, max_rank).astype(np.uint8))
+
+    def update(self, values):
+        self.update_hashes(self.hash_values(values))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            raw = m * math.log(m / zeros)  # linear counting (petites cardinalités)
+        return int(round(raw))
+
+
+class FrequentItems:
+    """
+    Misra-Gries heavy hitters with `capacity` counters, plus the column's
+    distinct count. Counts and distinct count are exact until the first
+    eviction; afterwards each count is underestimated by at most
+    n / (capacity + 1) and distinct values go to a HyperLogLog (which only
+    ever hashes each block's distinct keys, not every row).
+    """
+
+    def __init__(self, capacity: int = 2048):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.exact = True
+        self.distinct = HyperLogLog()
+
+    def _spill(self, keys: pd.Index):
+        self.exact = False
+        self.distinct.update(keys.to_numpy())
+
+    def update_counts(self, counts: pd.Series):
+        if len(counts) == 0:
+            return
+        merged = self.counts.add(counts, fill_value=0) if len(self.counts) else counts
+        if not self.exact:
+            self.distinct.update(counts.index.to_numpy())
+        if len(merged) > self.capacity:
+            if self.exact:
+                self._spill(merged.index)
+            threshold = np.partition(merged.to_numpy(), -(self.capacity + 1))[-(self.capacity + 1)]
+            merged = merged - threshold
+            merged = merged[merged > 0]
+        self.counts = merged.astype(np.int64)
+
+    def update(self, values: pd.Series):
+        self.update_counts(values.value_counts(dropna=True))
+
+    def merge(self, other: "FrequentItems"):
+        if self.exact and not other.exact:
+            self._spill(self.counts.index)
+        self.update_counts(other.counts)
+        if not other.exact:
+            self.distinct.merge(other.distinct)
+
+    def relabel(self, label):
+        """Map every key through `label` (keys that collide are summed)"""
+        counts = self.counts.copy()
+        counts.index = [label(v) for v in counts.index]
+        self.counts = counts.groupby(level=0).sum()
+
+    def distinct_count(self) -> int:
+        return len(self.counts) if self.exact else self.distinct.estimate()
+
+    def top(self, k: int) -> pd.Series:
+        return self.counts.sort_values(ascending=False, kind="stable").head(k)
+
+
+class StreamingHistogram:
+    """
+    Fixed-size histogram on a power-of-two grid: bin width is 2^exponent and
+    bins are aligned on multiples of it, so two histograms can always be
+    merged by coarsening the finer one. Re-binned to the final edges with
+    uniform mass inside each fine bin.
+    """
+
+    def __init__(self, bins: int = 1024):
+        self.bins = bins
+        self.exponent: Optional[int] = None
+        self.offset = 0
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def _fits(self, lo: float, hi: float, exponent: int) -> bool:
+        return math.floor(math.ldexp(hi, -exponent)) - math.floor(math.ldexp(lo, -exponent)) < self.bins
+
+    def _coarsen(self, exponent: int):
+        shift = exponent - self.exponent
+        cells = (self.offset + np.arange(self.bins)) >> shift
+        new_offset = int(cells[0])
+        counts = np.bincount(cells - new_offset, weights=self.counts, minlength=self.bins)[:self.bins]
+        self.counts = counts.astype(np.int64)
+        self.offset, self.exponent = new_offset, exponent
+
+    def _extent(self):
+        return math.ldexp(self.offset, self.exponent), math.ldexp(self.offset + self.bins, self.exponent)
+
+    def _cover(self, lo: float, hi: float):
+        if self.exponent is None:
+            if hi > lo:
+                exponent = math.ceil(math.log2((hi - lo) / (self.bins - 2)))
+            else:
+                exponent = math.frexp(abs(lo))[1] - 20 if lo else -20
+            while not self._fits(lo, hi, exponent):
+                exponent += 1
+            self.exponent, self.offset = exponent, math.floor(math.ldexp(lo, -exponent))
+            return
+        cur_lo, cur_hi = self._extent()
+        lo, hi = min(lo, cur_lo), max(hi, cur_hi - math.ldexp(1, self.exponent))
+        exponent = self.exponent
+        while not self._fits(lo, hi, exponent):
+            exponent += 1
+        if exponent != self.exponent:
+            self._coarsen(exponent)
+        first = math.floor(math.ldexp(lo, -exponent))
+        if first < self.offset:
+            self.counts = np.concatenate([np.zeros(self.offset - first, dtype=np.int64), self.counts])[:self.bins]
+            self.offset = first
+
+    def update(self, values: np.ndarray):
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        self._cover(float(values.min()), float(values.max()))
+        cells = np.floor(np.ldexp(values, -self.exponent)).astype(np.int64) - self.offset
+        self.counts += np.bincount(cells, minlength=self.bins)[:self.bins]
+
+    def merge(self, other: "StreamingHistogram"):
+        if other.exponent is None:
+            return
+        other = other._copy()
+        if self.exponent is None:
+            self.exponent, self.offset, self.counts = other.exponent, other.offset, other.counts
+            return
+        if self.exponent < other.exponent:
+            self._coarsen(other.exponent)
+        lo, hi = other._extent()
+        self._cover(lo, hi - math.ldexp(1, other.exponent))
+        if other.exponent < self.exponent:
+            other._coarsen(self.exponent)
+        start = other.offset - self.offset
+        self.counts[start:] += other.counts[:self.bins - start]
+
+    def _copy(self) -> "StreamingHistogram":
+        clone = StreamingHistogram(self.bins)
+        clone.exponent, clone.offset, clone.counts = self.exponent, self.offset, self.counts.copy()
+        return clone
+
+    def rebin(self, edges: np.ndarray) -> np.ndarray:
+        """Counts over `edges` (np.histogram convention: last bin closed)"""
+        total = int(self.counts.sum())
+        if self.exponent is None or total == 0:
+            return np.zeros(len(edges) - 1, dtype=np.int64)
+        fine_edges = np.ldexp(np.arange(self.offset, self.offset + self.bins + 1, dtype=np.float64), self.exponent)
+        fine_edges = np.clip(fine_edges, edges[0], edges[-1])
+        cdf = np.concatenate([[0.0], np.cumsum(self.counts, dtype=np.float64)])
+        at_edges = np.interp(edges, fine_edges, cdf)
+        at_edges[0], at_edges[-1] = 0.0, total
+        expected = np.diff(at_edges)
+        # Arrondi à la plus forte partie fractionnaire : le total reste exact
+        counts = np.floor(expected).astype(np.int64)
+        missing = total - int(counts.sum())
+        if missing > 0:
+            counts[np.argsort(-(expected - counts), kind="stable")[:missing]] += 1
+        return counts
@@ -0,0 +1,109 @@
+"""
+Analytics result store
+
+Les résultats (aperçu, profil, corrélations...) sont rangés dans la table
+`dataset_analytics` (supabase/schema.sql), une ligne par
+(file_hash, analysis_type, algorithm_version), payload JSON compressé.
+Incrémenter une version dans ALGORITHM_VERSIONS invalide uniquement cette
+analyse ; un fichier identique ré-uploadé retrouve ses résultats.
+Les analyses par colonne sont rangées sous `<famille>:<empreinte du nom>`
+(ex. `column:1f3a...`), versionnées par leur famille.
+"""
+import base64
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Iterable, Optional
+from postgrest.types import ReturnMethod
+from app.core.database import get_supabase_client, get_supabase_admin_client, execute
+
+# Version de l'algorithme de chaque analyse : à incrémenter quand son résultat change
+ALGORITHM_VERSIONS: Dict[str, int] = {
+    "preview": 1,
+    "stats": 1,
+    "correlations": 2,
+    "correlations_spearman": 1,
+    "associations": 1,
+    "profile": 1,
+    "column": 1,
+    "oneway": 1,
+}
+
+ENCODING = "zlib+base64"
+
+
+def file_key(dataset: dict) -> str:
+    """Content key of the dataset's current file (URL digest for files uploaded before hashing)"""
+    if dataset.get("file_hash"):
+        return dataset["file_hash"]
+    return "url-" + hashlib.sha256(dataset["file_url"].encode()).hexdigest()
+
+
+def algorithm_version(analysis: str) -> int:
+    return ALGORITHM_VERSIONS[analysis.split(":", 1)[0]]
+
+
+def column_analysis(family: str, column: str) -> str:
+    """Analysis type of one column (fits analysis_type VARCHAR(50) whatever the column name)"""
+    return f"{family}:{hashlib.sha1(column.encode()).hexdigest()[:24]}"
+
+
+def encode_payload(payload: Any) -> tuple[str, int]:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.b64encode(zlib.compress(raw, 6)).decode(), len(raw)
+
+
+def decode_payload(row: dict) -> Any:
+    if row.get("encoding", ENCODING) != ENCODING:
+        raise ValueError(f"Unknown analytics encoding: {row.get('encoding')}")
+    return json.loads(zlib.decompress(base64.b64decode(row["payload"])))
+
+
+async def load_analyses(file_hash: str, analyses: Iterable[str]) -> Dict[str, Any]:
+    """Stored results among `analyses` for the current algorithm versions"""
+    analyses = list(analyses)
+    response = await execute(
+        get_supabase_client()
+        .table("dataset_analytics")
+        .select("analysis_type, algorithm_version, encoding, payload")
+        .eq("file_hash", file_hash)
+        .in_("analysis_type", analyses)
+    )
+    return {
+        row["analysis_type"]: decode_payload(row)
+        for row in response.data or []
+        if row["algorithm_version"] == algorithm_version(row["analysis_type"])
+    }
+
+
+async def load_analysis(file_hash: str, analysis: str) -> Optional[Any]:
+    return (await load_analyses(file_hash, [analysis])).get(analysis)
+
+
+async def save_analyses(file_hash: str, payloads: Dict[str, Any]):
+    """Upsert one row per analysis (other analyses of the file are untouched)"""
+    rows = []
+    for analysis, payload in payloads.items():
+        encoded, size = encode_payload(payload)
+        rows.append({
+            "file_hash": file_hash,
+            "analysis_type": analysis,
+            "algorithm_version": algorithm_version(analysis),
+            "encoding": ENCODING,
+            "payload": encoded,
+            "payload_bytes": size,
+        })
+    await execute(
+        get_supabase_admin_client()
+        .table("dataset_analytics")
+        .upsert(rows, on_conflict="file_hash,analysis_type,algorithm_version", returning=ReturnMethod.minimal)
+    )
+
+
+async def save_analysis(file_hash: str, analysis: str, payload: Any):
+    await save_analyses(file_hash, {analysis: payload})
+
+
+def analysis_version_key(analysis: str) -> str:
+    """`stats@v1` : distinguishes in-flight computations across algorithm versions"""
+    return f"{analysis}@v{algorithm_version(analysis)}"
@@ -3,7 +3,8 @@ Benchmark API endpoints - SOTA performance tracking
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, get_supabase_admin_client, execute, rpc
+from app.core.dataloader import DataLoaders, get_dataloaders
 from app.middleware.supabase_auth import SupabaseUser, require_auth
 from app.schemas import (
     BenchmarkCreate,
@@ -38,7 +39,7 @@ async def list_benchmarks_for_dataset(
     if metric_type:
         query = query.eq("metric_type", metric_type.value)
 
-    response = query.order(sort_by, desc=(sort_order == "desc")).execute()
+    response = await execute(query.order(sort_by, desc=(sort_order == "desc")))
 
     benchmarks = [BenchmarkResponse(**b) for b in response.data]
     return BenchmarkListResponse(benchmarks=benchmarks, total=len(benchmarks))
@@ -65,14 +66,13 @@ async def get_leaderboard(
         MetricType.F1_SCORE,
     ]
 
-    response = (
+    response = await execute(
         supabase.table("benchmarks")
         .select("*")
         .eq("dataset_id", dataset_id)
         .eq("metric_type", metric_type.value)
         .order("metric_value", desc=higher_is_better)
         .limit(limit)
-        .execute()
     )
 
     return [BenchmarkResponse(**b) for b in response.data]
@@ -85,12 +85,11 @@ async def get_my_benchmarks(current_user: SupabaseUser = Depends(require_auth)):
     """
     supabase = get_supabase_client()
 
-    response = (
+    response = await execute(
         supabase.table("benchmarks")
         .select("*")
         .eq("user_id", current_user.user_id)
         .order("created_at", desc=True)
-        .execute()
     )
 
     return [BenchmarkResponse(**b) for b in response.data]
@@ -103,7 +102,7 @@ async def get_benchmark(benchmark_id: str):
     """
     supabase = get_supabase_client()
 
-    response = supabase.table("benchmarks").select("*").eq("id", benchmark_id).single().execute()
+    response = await execute(supabase.table("benchmarks").select("*").eq("id", benchmark_id).single())
 
     if not response.data:
         raise HTTPException(status_code=404, detail="Benchmark not found")
@@ -115,6 +114,7 @@ async def get_benchmark(benchmark_id: str):
 async def create_benchmark(
     benchmark: BenchmarkCreate,
     current_user: SupabaseUser = Depends(require_auth),
+    loaders: DataLoaders = Depends(get_dataloaders),
 ):
     """
     Create a new benchmark entry (requires authentication)
@@ -122,9 +122,7 @@ async def create_benchmark(
     supabase = get_supabase_client()
 
     # Check if dataset exists
-    dataset = supabase.table("datasets").select("id").eq("id", benchmark.dataset_id).single().execute()
-
-    if not dataset.data:
+    if not await loaders.exists("datasets", benchmark.dataset_id):
         raise HTTPException(status_code=404, detail="Dataset not found")
 
     # Create benchmark
@@ -139,7 +137,7 @@ async def create_benchmark(
         "methodology": benchmark.methodology,
     }
 
-    response = supabase.table("benchmarks").insert(data).execute()
+    response = await execute(supabase.table("benchmarks").insert(data))
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create benchmark")
@@ -159,7 +157,7 @@ async def update_benchmark(
     supabase = get_supabase_client()
 
     # Check ownership
-    existing = supabase.table("benchmarks").select("*").eq("id", benchmark_id).single().execute()
+    existing = await execute(supabase.table("benchmarks").select("*").eq("id", benchmark_id).single())
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="Benchmark not found")
@@ -173,7 +171,7 @@ async def update_benchmark(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    response = supabase.table("benchmarks").update(update_data).eq("id", benchmark_id).execute()
+    response = await execute(supabase.table("benchmarks").update(update_data).eq("id", benchmark_id))
 
     return BenchmarkResponse(**response.data[0])
 
@@ -189,7 +187,7 @@ async def delete_benchmark(
     supabase = get_supabase_client()
 
     # Check ownership
-    existing = supabase.table("benchmarks").select("user_id").eq("id", benchmark_id).single().execute()
+    existing = await execute(supabase.table("benchmarks").select("user_id").eq("id", benchmark_id).single())
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="Benchmark not found")
@@ -197,7 +195,7 @@ async def delete_benchmark(
     if existing.data["user_id"] != current_user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this benchmark")
 
-    supabase.table("benchmarks").delete().eq("id", benchmark_id).execute()
+    await execute(supabase.table("benchmarks").delete().eq("id", benchmark_id))
 
 
 @router.post("/{benchmark_id}/upvote", response_model=BenchmarkResponse)
@@ -208,22 +206,16 @@ async def upvote_benchmark(
     """
     Upvote a benchmark entry
     """
-    supabase = get_supabase_client()
-
-    # Get current benchmark
-    existing = supabase.table("benchmarks").select("*").eq("id", benchmark_id).single().execute()
-
-    if not existing.data:
-        raise HTTPException(status_code=404, detail="Benchmark not found")
-
-    # Increment upvotes
-    new_upvotes = existing.data.get("upvotes", 0) + 1
-
-    response = (
-        supabase.table("benchmarks")
-        .update({"upvotes": new_upvotes})
-        .eq("id", benchmark_id)
-        .execute()
+    # Incrément atomique côté base (upvote_benchmark), réservé à service_role :
+    # l'API a authentifié l'utilisateur
+    response = await rpc(
+        get_supabase_admin_client(),
+        "upvote_benchmark",
+        {"p_benchmark_id": benchmark_id},
+        errors={
+            "SQD03": (404, "Benchmark not found"),
+            "22P02": (404, "Benchmark not found"),
+        },
     )
 
-    return BenchmarkResponse(**response.data[0])
+    return BenchmarkResponse(**response.data)
@@ -1,16 +1,44 @@
 """
 Dataset API endpoints
 """
-from typing import Optional, List
+from typing import Any, Awaitable, Callable, Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
-from app.core.database import get_supabase_client, get_supabase_admin_client
+from app.core.database import get_supabase_client, get_supabase_admin_client, execute, run_in_db_pool
+from app.core.http_client import storage_http
+from app.core.filecache import file_cache
+from app.core.compute import compute_executor
+from app.core.dataloader import DataLoaders, get_dataloaders
+from app.core.counters import download_counter
+from app.core.singleflight import analysis_key, coalesce
+from app.analytics.columns import column_stats, columns_from_stats, dataset_profile
+from app.analytics.correlation import correlation_view
+from app.analytics.parallel import associate_path, correlate_path, profile_path
+from app.analytics.precompute import (
+    oneway_analysis,
+    oneway_payload,
+    precomputed_analyses,
+    reusable_sidecar,
+    schedule_dataset_analytics,
+)
+from app.analytics.sidecar import analytics_source, source_key
+from app.analytics.store import analysis_version_key, file_key, load_analysis, save_analysis
+from app.analytics.preview import PREVIEW_ROWS, preview_file
+from app.analytics.ranges import fetch_parquet_head
+from app.analytics.readers import file_extension
 from app.middleware.supabase_auth import SupabaseUser, get_current_user, require_auth
 import uuid
 import os
+import json
+import base64
+import httpx
 from app.schemas import (
     DatasetCreate,
     DatasetResponse,
+    DatasetPartialResponse,
     DatasetListResponse,
+    DATASET_CARD_FIELDS,
+    DATASET_DETAIL_FIELDS,
+    AnalyticsStatus,
     DatasetSource,
     BusinessTag,
     ModelingType,
@@ -20,7 +48,66 @@ from app.schemas import (
 router = APIRouter(prefix="/datasets", tags=["datasets"])
 
 
-@router.get("", response_model=DatasetListResponse)
+def _encode_cursor(sort_by: str, sort_order: str, row: dict) -> str:
+    """Opaque keyset cursor pointing after `row` for the given ordering"""
+    payload = {"s": sort_by, "o": sort_order, "v": row.get(sort_by), "id": row["id"]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        uuid.UUID(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if payload.get("s") != sort_by or payload.get("o") != sort_order:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/sort_order")
+
+    return payload
+
+
+def parse_dataset_fields(fields: Optional[str], default: tuple, required: tuple = ("id",)) -> str:
+    """
+    Turn a `fields=` query parameter into a PostgREST select list,
+    falling back to the endpoint's default projection
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in DATASET_DETAIL_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        requested = list(default)
+
+    columns = list(required) + [f for f in requested if f not in required]
+    return ",".join(columns)
+
+
+def _pgrst_value(value) -> str:
+    """Quote a value for use inside a PostgREST or=() filter"""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _keyset_filter(sort_by: str, desc: bool, value, last_id: str) -> str:
+    """
+    PostgREST or=() condition selecting the rows after (value, last_id)
+
+    NULLs sort last ascending and first descending (Postgres default, which
+    the (sort_by, id) indexes serve in both directions).
+    """
+    op = "lt" if desc else "gt"
+    if value is None:
+        after_nulls = f"and({sort_by}.is.null,id.{op}.{last_id})"
+        return f"{sort_by}.not.is.null,{after_nulls}" if desc else after_nulls
+    value = _pgrst_value(value)
+    condition = f"{sort_by}.{op}.{value},and({sort_by}.eq.{value},id.{op}.{last_id})"
+    return condition if desc else f"{condition},{sort_by}.is.null"
+
+
+@router.get("", response_model=DatasetListResponse, response_model_exclude_unset=True)
 async def list_datasets(
     page: int = Query(1, ge=1),
     page_size: int = Query(12, ge=1, le=100),
@@ -29,16 +116,41 @@ async def list_datasets(
     modeling_types: Optional[List[ModelingType]] = Query(None),
     pivot_variables: Optional[List[PivotVariable]] = Query(None),
     search: Optional[str] = None,
-    sort_by: str = Query("created_at", regex="^(global_score|created_at|name|review_count)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    sort_by: Optional[str] = Query(None, pattern="^(relevance|global_score|created_at|name|review_count)$"),
+    sort_order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Curseur opaque (next_cursor de la page précédente)"),
+    count: str = Query("exact", pattern="^(exact|estimated|none)$"),
+    fields: Optional[str] = Query(None, description="Colonnes à renvoyer, séparées par des virgules (défaut : vue carte)"),
 ):
     """
     List all datasets with filtering, pagination and sorting
+
+    Two pagination modes: `page` (offset, kept for existing callers) or
+    `cursor` (keyset on (sort_by, id), constant cost on deep pages).
+    `count=estimated` uses planner estimates, `count=none` skips the count.
+
+    `search` goes through the `search_datasets` RPC (French full-text on
+    name, tags and description + trigram typo tolerance on the name) and
+    defaults to `sort_by=relevance`, which only supports `page` pagination.
     """
     supabase = get_supabase_client()
+    search = (search or "").strip()
+    if not sort_by or (sort_by == "relevance" and not search):
+        sort_by = "relevance" if search else "created_at"
+    if sort_by == "relevance" and cursor:
+        raise HTTPException(status_code=400, detail="Cursor pagination is not available for sort_by=relevance")
 
-    # Build query
-    query = supabase.table("datasets").select("*", count="exact")
+    required = ("id",) if sort_by == "relevance" else ("id", sort_by)
+    columns = parse_dataset_fields(fields, DATASET_CARD_FIELDS, required=required)
+
+    # Build query (la recherche renvoie les lignes de datasets déjà triées par pertinence)
+    if search:
+        query = supabase.rpc("search_datasets", {"p_query": search}, get=True, count=None if count == "none" else count)
+        query = query.select(columns)
+    elif count == "none":
+        query = supabase.table("datasets").select(columns)
+    else:
+        query = supabase.table("datasets").select(columns, count=count)
 
     # Apply filters
     if source:
@@ -56,40 +168,53 @@ async def list_datasets(
         # Filter datasets that contain any of the specified pivot variables
         query = query.contains("pivot_variables", [pv.value for pv in pivot_variables])
 
-    if search:
-        query = query.ilike("name", f"%{search}%")
-
-    # Apply sorting
-    query = query.order(sort_by, desc=(sort_order == "desc"))
+    # Apply sorting (id départage les ex-aequo pour un ordre total stable)
+    desc = sort_order == "desc"
+    if sort_by != "relevance":
+        query = query.order(sort_by, desc=desc, nullsfirst=desc).order("id", desc=desc)
 
-    # Apply pagination
-    offset = (page - 1) * page_size
-    query = query.range(offset, offset + page_size - 1)
+    # Apply pagination (une ligne de plus pour savoir s'il existe une page suivante)
+    if cursor:
+        after = _decode_cursor(cursor, sort_by, sort_order)
+        query = query.or_(_keyset_filter(sort_by, desc, after["v"], after["id"]))
+        query = query.limit(page_size + 1)
+    else:
+        offset = (page - 1) * page_size
+        query = query.range(offset, offset + page_size)
 
     # Execute query
-    response = query.execute()
+    response = await execute(query)
+
+    rows = response.data[:page_size]
+    next_cursor = None
+    if len(response.data) > page_size and sort_by != "relevance":
+        next_cursor = _encode_cursor(sort_by, sort_order, rows[-1])
 
     return DatasetListResponse(
-        datasets=[DatasetResponse(**d) for d in response.data],
-        total=response.count or 0,
+        datasets=[DatasetPartialResponse(**d) for d in rows],
+        total=(response.count or 0) if count != "none" else None,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
-@router.get("/{dataset_id}", response_model=DatasetResponse)
-async def get_dataset(dataset_id: str):
+@router.get("/{dataset_id}", response_model=DatasetPartialResponse, response_model_exclude_unset=True)
+async def get_dataset(
+    dataset_id: str,
+    fields: Optional[str] = Query(None, description="Colonnes à renvoyer, séparées par des virgules (défaut : vue détail)"),
+    loaders: DataLoaders = Depends(get_dataloaders),
+):
     """
     Get a single dataset by ID
     """
-    supabase = get_supabase_client()
+    columns = parse_dataset_fields(fields, DATASET_DETAIL_FIELDS)
+    dataset = await loaders.load("datasets", dataset_id, columns=columns)
 
-    response = supabase.table("datasets").select("*").eq("id", dataset_id).single().execute()
-
-    if not response.data:
+    if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
 
-    return DatasetResponse(**response.data)
+    return DatasetPartialResponse(**dataset)
 
 
 @router.post("", response_model=DatasetResponse, status_code=201)
@@ -109,7 +234,7 @@ async def create_dataset(
     data["modeling_types"] = [mt.value for mt in dataset.modeling_types]
     data["pivot_variables"] = [pv.value for pv in dataset.pivot_variables]
 
-    response = supabase.table("datasets").insert(data).execute()
+    response = await execute(supabase.table("datasets").insert(data))
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create dataset")
@@ -128,7 +253,7 @@ async def delete_dataset(
     supabase = get_supabase_client()
 
     # Check ownership
-    existing = supabase.table("datasets").select("created_by").eq("id", dataset_id).single().execute()
+    existing = await execute(supabase.table("datasets").select("created_by").eq("id", dataset_id).single())
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="Dataset not found")
@@ -136,7 +261,7 @@ async def delete_dataset(
     if existing.data["created_by"] != current_user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this dataset")
 
-    supabase.table("datasets").delete().eq("id", dataset_id).execute()
+    await execute(supabase.table("datasets").delete().eq("id", dataset_id))
 
 
 @router.post("/{dataset_id}/upload-file")
@@ -147,7 +272,8 @@ async def upload_dataset_file(
 ):
     """
     Upload a dataset file (CSV, Parquet, Excel) to Supabase Storage.
-    Updates the dataset record with the public URL.
+    Updates the dataset record with the public URL and queues the
+    analytics precomputation (see `analytics_status` and `GET /jobs/{id}`).
     """
     ALLOWED_EXTENSIONS = [".csv", ".parquet", ".xlsx", ".xls"]
     MAX_SIZE_MB = 50
@@ -172,7 +298,8 @@ async def upload_dataset_file(
     size_mb = round(len(content) / (1024 * 1024), 2)
 
     try:
-        supabase_admin.storage.from_("datasets-files").upload(
+        await run_in_db_pool(
+            supabase_admin.storage.from_("datasets-files").upload,
             file_path,
             content,
             {"content-type": file.content_type or "application/octet-stream"},
@@ -180,7 +307,9 @@ async def upload_dataset_file(
         public_url = supabase_admin.storage.from_("datasets-files").get_public_url(file_path)
 
         # Récupérer le changelog existant
-        existing = supabase_admin.table("datasets").select("changelog").eq("id", dataset_id).single().execute()
+        existing = await execute(
+            supabase_admin.table("datasets").select("changelog, target_variable, exposure_variable").eq("id", dataset_id).single()
+        )
         current_changelog = (existing.data or {}).get("changelog") or []
         version_num = len(current_changelog) + 1
         new_entry = {
@@ -193,18 +322,30 @@ async def upload_dataset_file(
         }
         current_changelog.append(new_entry)
 
-        supabase_admin.table("datasets").update({
+        # Fichier identique déjà analysé : sidecar et résultats réutilisés tels quels
+        sidecar_url = await reusable_sidecar(sha256, precomputed_analyses(existing.data or {}))
+        reused = sidecar_url is not None
+        analytics_status = AnalyticsStatus.DONE if reused else AnalyticsStatus.PENDING
+
+        await execute(supabase_admin.table("datasets").update({
             "file_url": public_url,
             "file_hash": sha256,
+            "sidecar_url": sidecar_url,
             "changelog": current_changelog,
-            "computed_cache": {},  # Invalider le cache stats/correlations
-        }).eq("id", dataset_id).execute()
+            "analytics_status": analytics_status.value,
+            "analytics_error": None,
+        }).eq("id", dataset_id))
+
+        # Aperçu, profil et corrélations calculés par un worker (file `jobs`)
+        job = None if reused else await schedule_dataset_analytics(dataset_id, public_url, sha256)
 
         return {
             "file_url": public_url,
             "filename": file.filename,
             "size_mb": size_mb,
             "sha256": sha256,
+            "analytics_status": analytics_status.value,
+            "analytics_job_id": job["id"] if job else None,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur upload : {str(e)}")
@@ -217,7 +358,7 @@ async def similar_datasets(dataset_id: str):
     """
     supabase = get_supabase_client()
 
-    result = supabase.table("datasets").select("tags").eq("id", dataset_id).single().execute()
+    result = await execute(supabase.table("datasets").select("tags").eq("id", dataset_id).single())
 
     if not result.data:
         raise HTTPException(status_code=404, detail="Dataset non trouvé.")
@@ -227,13 +368,12 @@ async def similar_datasets(dataset_id: str):
     if not tags:
         return {"datasets": [], "source_tags": []}
 
-    similar = (
+    similar = await execute(
         supabase.table("datasets")
         .select("id, name, global_score, tags, modeling_types, file_url, download_count, review_count, file_size_mb")
         .neq("id", dataset_id)
         .overlaps("tags", tags)
         .limit(20)
-        .execute()
     )
 
     def common_count(d):
@@ -245,264 +385,306 @@ async def similar_datasets(dataset_id: str):
 
 
 @router.post("/{dataset_id}/download")
-async def download_dataset(dataset_id: str):
+async def download_dataset(
+    dataset_id: str,
+    loaders: DataLoaders = Depends(get_dataloaders),
+):
     """
     Incrémente le compteur de téléchargements et retourne l'URL du fichier.
+    L'incrément est différé (write-behind) : le compteur renvoyé est optimiste.
     """
-    supabase = get_supabase_client()
-    supabase_admin = get_supabase_admin_client()
+    dataset = await loaders.load("datasets", dataset_id, columns="file_url, download_count")
 
-    result = supabase.table("datasets").select("file_url, download_count").eq("id", dataset_id).single().execute()
-
-    if not result.data:
+    if not dataset:
         raise HTTPException(status_code=404, detail="Dataset non trouvé.")
 
-    if not result.data.get("file_url"):
+    if not dataset.get("file_url"):
         raise HTTPException(status_code=404, detail="Aucun fichier disponible pour ce dataset.")
 
-    new_count = (result.data.get("download_count") or 0) + 1
-    supabase_admin.table("datasets").update({"download_count": new_count}).eq("id", dataset_id).execute()
+    pending = download_counter.incr(dataset_id)
+    new_count = (dataset.get("download_count") or 0) + pending
 
-    return {"file_url": result.data["file_url"], "download_count": new_count}
+    return {"file_url": dataset["file_url"], "download_count": new_count}
 
 
 @router.get("/{dataset_id}/preview")
 async def preview_dataset(dataset_id: str):
     """
-    Retourne les 10 premières lignes du fichier CSV hébergé sur Supabase.
+    Retourne les 10 premières lignes du fichier hébergé sur Supabase.
+    L'aperçu est rangé par file_hash : les affichages suivants ne lisent plus le fichier.
     """
-    import pandas as pd
-    import io
-    import httpx
-
     supabase = get_supabase_client()
-    result = supabase.table("datasets").select("file_url").eq("id", dataset_id).single().execute()
+    result = await execute(supabase.table("datasets").select("file_url, file_hash, sidecar_url").eq("id", dataset_id).single())
 
     if not result.data or not result.data.get("file_url"):
         raise HTTPException(status_code=404, detail="Aucun fichier disponible pour ce dataset.")
 
-    file_url = result.data["file_url"]
-
     try:
-        ext = os.path.splitext(file_url.split("?")[0])[1].lower()
-
-        # Pour les CSV, télécharger seulement les 512 premiers KB (largement suffisant pour 10 lignes)
-        async with httpx.AsyncClient() as client:
-            if ext in (".csv", ""):
-                response = await client.get(
-                    file_url,
-                    headers={"Range": "bytes=0-524287"},
-                    timeout=20,
-                )
-            else:
-                response = await client.get(file_url, timeout=30)
-
-        content = response.content
-
-        if ext == ".csv" or ext == "":
-            df = pd.read_csv(io.BytesIO(content), nrows=10, on_bad_lines="skip")
-        elif ext == ".parquet":
-            df = pd.read_parquet(io.BytesIO(content)).head(10)
-        elif ext in (".xlsx", ".xls"):
-            df = pd.read_excel(io.BytesIO(content), nrows=10)
-        else:
-            df = pd.read_csv(io.BytesIO(content), nrows=10, on_bad_lines="skip")
-
-        columns = [{"name": col, "type": str(df[col].dtype)} for col in df.columns]
-        rows = df.fillna("").astype(str).values.tolist()
-
-        return {"columns": columns, "rows": rows, "total_rows": len(rows)}
-
+        return await _stored_analysis(file_key(result.data), "preview", lambda: _preview_payload(result.data))
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        # Échec côté stockage : rien n'est rangé, l'appel suivant retente
+        raise HTTPException(status_code=502, detail=f"Stockage indisponible : HTTP {e.response.status_code}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lecture fichier : {str(e)}")
 
 
-@router.get("/{dataset_id}/correlations")
-async def correlations_dataset(dataset_id: str):
+async def _preview_payload(dataset: dict) -> dict:
+    ext = file_extension(dataset["file_url"])
+
+    # Pour les CSV, télécharger seulement les 512 premiers KB (largement suffisant pour 10 lignes)
+    if ext in (".csv", ""):
+        response = await storage_http.get(
+            dataset["file_url"],
+            headers={"Range": "bytes=0-524287"},
+            timeout=20,
+        )
+        response.raise_for_status()
+        return await compute_executor.run(preview_file, response.content, ext)
+
+    # Parquet (ou sidecar d'un Excel) : pied de page et premier groupe de lignes par requêtes Range
+    source_url, ext = analytics_source(dataset)
+    if ext == ".parquet":
+        head = await fetch_parquet_head(source_url, PREVIEW_ROWS)
+        return await compute_executor.run(preview_file, head, ext, PREVIEW_ROWS)
+
+    # Excel sans sidecar : lecture en flux (openpyxl read-only) arrêtée après les premières lignes
+    async with file_cache.local_file(file_key(dataset), source_url, ext, timeout=30) as path:
+        return await compute_executor.run(preview_file, path, ext, PREVIEW_ROWS)
+
+
+async def _stored_analysis(
+    file_hash: str,
+    analysis: str,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
     """
-    Retourne la matrice de corrélation entre les colonnes numériques.
+    Stored result of one analysis of a file (dataset_analytics), computed
+    and stored on a miss. Concurrent misses on the same file share a single
+    computation, within this process and across replicas
+    (app/core/singleflight.py).
     """
-    import pandas as pd
-    import io
-    import httpx
-    import math
+    cached = await load_analysis(file_hash, analysis)
+    if cached is not None:
+        return cached
 
-    supabase = get_supabase_client()
-    result = supabase.table("datasets").select("file_url, computed_cache").eq("id", dataset_id).single().execute()
+    async def run():
+        payload = await compute()
+        await save_analysis(file_hash, analysis, payload)
+        return payload
 
-    if not result.data or not result.data.get("file_url"):
-        raise HTTPException(status_code=404, detail="Aucun fichier disponible pour ce dataset.")
+    return await coalesce(
+        analysis_key(analysis_version_key(analysis), file_hash),
+        run,
+        lambda: load_analysis(file_hash, analysis),
+    )
 
-    # Retourner le cache si disponible
-    cached = (result.data.get("computed_cache") or {}).get("correlations")
-    if cached:
-        return cached
 
-    file_url = result.data["file_url"]
+async def _shared_analysis(
+    dataset: dict,
+    analysis: str,
+    compute: Callable[[str, str, str], Awaitable[Any]],
+) -> Any:
+    """Stored analysis computed from a local copy of the file the analyses read"""
+    source_url, ext = analytics_source(dataset)
+    file_hash = file_key(dataset)
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(file_url, timeout=90)
-            response.raise_for_status()
+    cache_key = source_key(file_hash, bool(dataset.get("sidecar_url")))
 
-        ext = os.path.splitext(file_url.split("?")[0])[1].lower()
-        content = response.content
+    async def run():
+        async with file_cache.local_file(cache_key, source_url, ext) as path:
+            return await compute(path, ext, cache_key)
 
-        if ext == ".csv":
-            df = pd.read_csv(io.BytesIO(content))
-        elif ext == ".parquet":
-            df = pd.read_parquet(io.BytesIO(content))
-        elif ext in (".xlsx", ".xls"):
-            df = pd.read_excel(io.BytesIO(content))
-        else:
-            df = pd.read_csv(io.BytesIO(content))
+    return await _stored_analysis(file_hash, analysis, run)
 
-        numeric_df = df.select_dtypes(include=["number"])
 
-        if numeric_df.shape[1] < 2:
-            raise HTTPException(status_code=422, detail="Pas assez de colonnes numériques pour calculer les corrélations.")
+def _correlation_analysis(method: str) -> str:
+    return "correlations" if method == "pearson" else f"correlations_{method}"
 
-        corr = numeric_df.corr()
 
-        def safe_corr(v):
-            if v is None or (isinstance(v, float) and math.isnan(v)):
-                return None
-            return round(float(v), 3)
+def _correlation_compute(method: str) -> Callable[[str, str, str], Awaitable[dict]]:
+    async def compute(path: str, ext: str, cache_key: str) -> dict:
+        return (await correlate_path(path, ext, cache_key, method)).to_payload(method)
+    return compute
 
-        columns = corr.columns.tolist()
-        matrix = [[safe_corr(corr.loc[r, c]) for c in columns] for r in columns]
-        payload = {"columns": columns, "matrix": matrix}
 
-        # Stocker en cache
-        existing_cache = result.data.get("computed_cache") or {}
-        existing_cache["correlations"] = payload
-        get_supabase_admin_client().table("datasets").update({"computed_cache": existing_cache}).eq("id", dataset_id).execute()
+@router.get("/{dataset_id}/correlations")
+async def correlations_dataset(
+    dataset_id: str,
+    method: str = Query("pearson", pattern="^(pearson|spearman)$"),
+    fmt: str = Query("matrix", alias="format", pattern="^(matrix|compact)$", description="compact : triangle supérieur, en millièmes"),
+    top_k: Optional[int] = Query(None, ge=1, le=10_000, description="Seulement les k paires les plus corrélées (en valeur absolue)"),
+):
+    """
+    Retourne la matrice de corrélation (Pearson ou Spearman) entre les colonnes numériques.
+    Calculée par blocs de lignes en parallèle (co-moments fusionnables).
 
-        return payload
+    Spearman avec valeurs manquantes : chaque colonne est classée sur toutes
+    ses valeurs renseignées, puis les rangs sont corrélés par paires complètes
+    (df.rank().corr()) ; pandas reclasse chaque paire sur ses lignes communes.
+    Au-delà de 4096 valeurs distinctes, rangs interpolés (écart ~1e-3).
+    """
+    supabase = get_supabase_client()
+    result = await execute(supabase.table("datasets").select("file_url, file_hash, sidecar_url").eq("id", dataset_id).single())
 
+    if not result.data or not result.data.get("file_url"):
+        raise HTTPException(status_code=404, detail="Aucun fichier disponible pour ce dataset.")
+
+    try:
+        payload = await _shared_analysis(result.data, _correlation_analysis(method), _correlation_compute(method))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur calcul corrélations : {str(e)}")
 
+    if len(payload["columns"]) < 2:
+        raise HTTPException(status_code=422, detail="Pas assez de colonnes numériques pour calculer les corrélations.")
+    return correlation_view(payload, fmt, top_k)
 
-@router.get("/{dataset_id}/stats")
-async def stats_dataset(dataset_id: str):
+
+@router.get("/{dataset_id}/associations")
+async def associations_dataset(dataset_id: str):
     """
-    Calcule les statistiques complètes du dataset (profil global + stats par colonne).
+    Retourne le V de Cramér et l'information mutuelle normalisée de chaque paire
+    catégorielle × catégorielle et catégorielle × numérique (numériques en déciles).
     """
-    import pandas as pd
-    import io
-    import httpx
-    import math
-    import numpy as np
+    supabase = get_supabase_client()
+    result = await execute(supabase.table("datasets").select("file_url, file_hash, sidecar_url").eq("id", dataset_id).single())
+
+    if not result.data or not result.data.get("file_url"):
+        raise HTTPException(status_code=404, detail="Aucun fichier disponible pour ce dataset.")
+
+    try:
+        payload = await _shared_analysis(result.data, "associations", associate_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur calcul associations : {str(e)}")
+
+    if not payload["pairs"]:
+        raise HTTPException(status_code=422, detail="Aucune colonne catégorielle exploitable pour calculer les associations.")
+    return payload
 
+
+@router.get("/{dataset_id}/oneway")
+async def oneway_dataset(
+    dataset_id: str,
+    target: Optional[str] = Query(None, description="Nombre de sinistres (défaut : variable cible du dataset)"),
+    exposure: Optional[str] = Query(None, description="Exposition (défaut : celle du dataset ; sans exposition : 1 par ligne)"),
+    amount: Optional[str] = Query(None, description="Montant des sinistres, pour la sévérité"),
+):
+    """
+    Retourne le tableau one-way de chaque facteur : exposition, sinistres, fréquence
+    et intervalle de confiance de Poisson, sévérité. Précalculé pour la cible et
+    l'exposition du dataset, calculé une fois (une lecture du fichier) sinon.
+    """
     supabase = get_supabase_client()
-    result = supabase.table("datasets").select("file_url, computed_cache").eq("id", dataset_id).single().execute()
+    result = await execute(
+        supabase.table("datasets")
+        .select("file_url, file_hash, sidecar_url, target_variable, exposure_variable")
+        .eq("id", dataset_id)
+        .single()
+    )
 
     if not result.data or not result.data.get("file_url"):
         raise HTTPException(status_code=404, detail="Aucun fichier disponible pour ce dataset.")
 
-    # Retourner le cache si disponible
-    cached = (result.data.get("computed_cache") or {}).get("stats")
-    if cached:
-        return cached
+    target = target or result.data.get("target_variable")
+    exposure = exposure or result.data.get("exposure_variable")
+    if not target:
+        raise HTTPException(status_code=422, detail="Aucune variable cible : précisez `target`.")
 
-    file_url = result.data["file_url"]
+    async def compute(path: str, ext: str, cache_key: str) -> dict:
+        return await oneway_payload(path, ext, cache_key, target, exposure, amount)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(file_url, timeout=90)
-            response.raise_for_status()
-
-        ext = os.path.splitext(file_url.split("?")[0])[1].lower()
-        content = response.content
-
-        if ext == ".csv":
-            df = pd.read_csv(io.BytesIO(content))
-        elif ext == ".parquet":
-            df = pd.read_parquet(io.BytesIO(content))
-        elif ext in (".xlsx", ".xls"):
-            df = pd.read_excel(io.BytesIO(content))
-        else:
-            df = pd.read_csv(io.BytesIO(content))
-
-        total_rows, total_cols = df.shape
-        total_cells = total_rows * total_cols
-        total_nulls = int(df.isnull().sum().sum())
-        overall_null_pct = round(total_nulls / total_cells * 100, 1) if total_cells > 0 else 0
-
-        numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
-        categorical_cols = df.select_dtypes(exclude=["number"]).columns.tolist()
-
-        # Statistiques par colonne
-        columns_stats = []
-        for col in df.columns:
-            null_count = int(df[col].isnull().sum())
-            null_pct = round(null_count / total_rows * 100, 1) if total_rows > 0 else 0
-            unique = int(df[col].nunique())
-            is_numeric = col in numeric_cols
-
-            stat = {
-                "name": col,
-                "dtype": str(df[col].dtype),
-                "is_numeric": is_numeric,
-                "null_count": null_count,
-                "null_pct": null_pct,
-                "unique": unique,
-            }
-
-            if is_numeric:
-                s = df[col].dropna()
-                def safe(v):
-                    return None if (v is None or (isinstance(v, float) and math.isnan(v))) else round(float(v), 4)
-                stat.update({
-                    "mean": safe(s.mean()),
-                    "std": safe(s.std()),
-                    "min": safe(s.min()),
-                    "p25": safe(s.quantile(0.25)),
-                    "p50": safe(s.quantile(0.50)),
-                    "p75": safe(s.quantile(0.75)),
-                    "max": safe(s.max()),
-                })
-                if len(s) > 1:
-                    n_bins = min(30, max(5, unique))
-                    counts, edges = np.histogram(s, bins=n_bins)
-                    stat["histogram"] = {
-                        "counts": counts.tolist(),
-                        "edges": [round(float(e), 4) for e in edges.tolist()],
-                    }
-            else:
-                top = df[col].value_counts().head(10)
-                stat["top_values"] = [{"value": str(k), "count": int(v)} for k, v in top.items()]
-
-            columns_stats.append(stat)
-
-        # Profil global — détection variable cible
-        suggested_target = None
-        for candidate in ["ClaimNb", "claim_nb", "target", "label", "y", "income", "churn", "default"]:
-            if candidate in df.columns:
-                suggested_target = candidate
-                break
-
-        payload = {
-            "profile": {
-                "total_rows": total_rows,
-                "total_cols": total_cols,
-                "overall_null_pct": overall_null_pct,
-                "numeric_count": len(numeric_cols),
-                "categorical_count": len(categorical_cols),
-                "suggested_target": suggested_target,
-            },
-            "columns": columns_stats,
-        }
+        payload = await _shared_analysis(result.data, oneway_analysis(target, exposure, amount), compute)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur calcul one-way : {str(e)}")
 
-        # Stocker en cache
-        existing_cache = result.data.get("computed_cache") or {}
-        existing_cache["stats"] = payload
-        get_supabase_admin_client().table("datasets").update({"computed_cache": existing_cache}).eq("id", dataset_id).execute()
+    if "error" in payload:
+        raise HTTPException(status_code=422, detail=payload["error"])
+    return payload
 
-        return payload
 
+@router.get("/{dataset_id}/stats")
+async def stats_dataset(
+    dataset_id: str,
+    columns: Optional[str] = Query(None, description="Colonnes séparées par des virgules : profil global et stats de ces colonnes seulement"),
+):
+    """
+    Calcule les statistiques complètes du dataset (profil global + stats par colonne).
+    Le fichier est téléchargé en flux puis profilé bloc par bloc, à mémoire bornée,
+    en parallèle sur le pool de process (voir app/analytics/parallel.py).
+    Avec `columns`, seules ces colonnes sont lues (voir app/analytics/columns.py).
+    """
+    dataset = await _dataset_file(dataset_id)
+
+    try:
+        if columns is not None:
+            names = [name.strip() for name in columns.split(",") if name.strip()]
+            return {"profile": await _profile(dataset), "columns": await _column_stats(dataset, names)}
+        return await _shared_analysis(dataset, "stats", profile_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur calcul stats : {str(e)}")
+
+
+@router.get("/{dataset_id}/stats/profile")
+async def stats_profile(dataset_id: str):
+    """
+    Profil global du dataset (lignes, colonnes, nulls, types), lu dans les
+    métadonnées du Parquet sans parcourir les données.
+    """
+    dataset = await _dataset_file(dataset_id)
+
+    try:
+        return await _profile(dataset)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur calcul stats : {str(e)}")
+
+
+@router.get("/{dataset_id}/stats/columns/{column_name:path}")
+async def stats_column(dataset_id: str, column_name: str):
+    """
+    Statistiques d'une seule colonne (onglet distributions), calculées à la
+    demande en ne lisant que cette colonne, puis conservées.
+    """
+    dataset = await _dataset_file(dataset_id)
+
+    try:
+        return (await _column_stats(dataset, [column_name]))[0]
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur calcul stats : {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erreur calcul stats : {str(e)}")
+
+
+async def _dataset_file(dataset_id: str) -> dict:
+    supabase = get_supabase_client()
+    result = await execute(supabase.table("datasets").select("file_url, file_hash, sidecar_url").eq("id", dataset_id).single())
+
+    if not result.data or not result.data.get("file_url"):
+        raise HTTPException(status_code=404, detail="Aucun fichier disponible pour ce dataset.")
+    return result.data
+
+
+async def _profile(dataset: dict) -> dict:
+    profile = await dataset_profile(dataset)
+    if profile is None:
+        # Pas de sidecar Parquet (conversion en cours) : profil complet
+        profile = (await _shared_analysis(dataset, "stats", profile_path))["profile"]
+    return profile
+
+
+async def _column_stats(dataset: dict, names: List[str]) -> List[dict]:
+    stats = await column_stats(dataset, names)
+    if stats is None:
+        stats = columns_from_stats(await _shared_analysis(dataset, "stats", profile_path), names)
+    return stats
@@ -2,15 +2,22 @@
 Favorites API endpoints
 Permet aux utilisateurs de gérer leurs datasets favoris
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, get_supabase_admin_client, execute, rpc
 from app.middleware.supabase_auth import SupabaseUser, require_auth, get_current_user
-from app.schemas import DatasetResponse
+from app.schemas import DatasetPartialResponse, DATASET_CARD_FIELDS
+from app.api.datasets import parse_dataset_fields
 
 router = APIRouter(prefix="/favorites", tags=["favorites"])
 
+# Codes SQLSTATE des fonctions add_favorite / toggle_favorite
+DATASET_NOT_FOUND_ERRORS = {
+    "SQD01": (404, "Dataset non trouvé"),
+    "22P02": (404, "Dataset non trouvé"),
+}
+
 
 class FavoriteResponse(BaseModel):
     """Response for favorite operations"""
@@ -25,20 +32,24 @@ class FavoriteStatus(BaseModel):
     is_favorite: bool
 
 
-@router.get("", response_model=List[DatasetResponse])
+@router.get("", response_model=List[DatasetPartialResponse], response_model_exclude_unset=True)
 async def list_favorites(
     current_user: SupabaseUser = Depends(require_auth),
+    fields: Optional[str] = Query(None, description="Colonnes à renvoyer, séparées par des virgules (défaut : vue carte)"),
 ):
     """
     Liste tous les datasets favoris de l'utilisateur connecté
     """
     supabase = get_supabase_client()
 
+    columns = parse_dataset_fields(fields, DATASET_CARD_FIELDS)
+
     # Récupérer les IDs des favoris
-    favorites_response = supabase.table("user_favorites")\
-        .select("dataset_id")\
-        .eq("user_id", current_user.user_id)\
-        .execute()
+    favorites_response = await execute(
+        supabase.table("user_favorites")
+        .select("dataset_id")
+        .eq("user_id", current_user.user_id)
+    )
 
     if not favorites_response.data:
         return []
@@ -46,12 +57,13 @@ async def list_favorites(
     # Récupérer les datasets correspondants
     dataset_ids = [f["dataset_id"] for f in favorites_response.data]
 
-    datasets_response = supabase.table("datasets")\
-        .select("*")\
-        .in_("id", dataset_ids)\
-        .execute()
+    datasets_response = await execute(
+        supabase.table("datasets")
+        .select(columns)
+        .in_("id", dataset_ids)
+    )
 
-    return [DatasetResponse(**d) for d in datasets_response.data]
+    return [DatasetPartialResponse(**d) for d in datasets_response.data]
 
 
 @router.get("/check/{dataset_id}", response_model=FavoriteStatus)
@@ -67,11 +79,12 @@ async def check_favorite(
 
     supabase = get_supabase_client()
 
-    response = supabase.table("user_favorites")\
-        .select("id")\
-        .eq("user_id", current_user.user_id)\
-        .eq("dataset_id", dataset_id)\
-        .execute()
+    response = await execute(
+        supabase.table("user_favorites")
+        .select("id")
+        .eq("user_id", current_user.user_id)
+        .eq("dataset_id", dataset_id)
+    )
 
     return FavoriteStatus(
         dataset_id=dataset_id,
@@ -87,38 +100,22 @@ async def add_favorite(
     """
     Ajoute un dataset aux favoris
     """
-    supabase = get_supabase_client()
-
-    # Vérifier que le dataset existe
-    dataset = supabase.table("datasets")\
-        .select("id")\
-        .eq("id", dataset_id)\
-        .single()\
-        .execute()
-
-    if not dataset.data:
-        raise HTTPException(status_code=404, detail="Dataset non trouvé")
-
-    # Vérifier si déjà en favoris
-    existing = supabase.table("user_favorites")\
-        .select("id")\
-        .eq("user_id", current_user.user_id)\
-        .eq("dataset_id", dataset_id)\
-        .execute()
+    # Vérification du dataset et insertion idempotente en un seul appel (add_favorite).
+    # p_user_id vient du jeton vérifié : la RPC n'est exécutable que par service_role
+    response = await rpc(
+        get_supabase_admin_client(),
+        "add_favorite",
+        {"p_dataset_id": dataset_id, "p_user_id": current_user.user_id},
+        errors=DATASET_NOT_FOUND_ERRORS,
+    )
 
-    if existing.data:
+    if not response.data:
         return FavoriteResponse(
             success=True,
             message="Déjà dans vos favoris",
             is_favorite=True
         )
 
-    # Ajouter aux favoris
-    supabase.table("user_favorites").insert({
-        "user_id": current_user.user_id,
-        "dataset_id": dataset_id
-    }).execute()
-
     return FavoriteResponse(
         success=True,
         message="Ajouté aux favoris",
@@ -136,11 +133,12 @@ async def remove_favorite(
     """
     supabase = get_supabase_client()
 
-    supabase.table("user_favorites")\
-        .delete()\
-        .eq("user_id", current_user.user_id)\
-        .eq("dataset_id", dataset_id)\
-        .execute()
+    await execute(
+        supabase.table("user_favorites")
+        .delete()
+        .eq("user_id", current_user.user_id)
+        .eq("dataset_id", dataset_id)
+    )
 
     return FavoriteResponse(
         success=True,
@@ -157,47 +155,23 @@ async def toggle_favorite(
     """
     Toggle un dataset dans les favoris (ajoute si absent, retire si présent)
     """
-    supabase = get_supabase_client()
-
-    # Vérifier que le dataset existe
-    dataset = supabase.table("datasets")\
-        .select("id")\
-        .eq("id", dataset_id)\
-        .single()\
-        .execute()
-
-    if not dataset.data:
-        raise HTTPException(status_code=404, detail="Dataset non trouvé")
-
-    # Vérifier si déjà en favoris
-    existing = supabase.table("user_favorites")\
-        .select("id")\
-        .eq("user_id", current_user.user_id)\
-        .eq("dataset_id", dataset_id)\
-        .execute()
-
-    if existing.data:
-        # Retirer des favoris
-        supabase.table("user_favorites")\
-            .delete()\
-            .eq("user_id", current_user.user_id)\
-            .eq("dataset_id", dataset_id)\
-            .execute()
+    # Bascule atomique en un seul appel (toggle_favorite), réservée à service_role
+    response = await rpc(
+        get_supabase_admin_client(),
+        "toggle_favorite",
+        {"p_dataset_id": dataset_id, "p_user_id": current_user.user_id},
+        errors=DATASET_NOT_FOUND_ERRORS,
+    )
 
+    if response.data:
         return FavoriteResponse(
             success=True,
-            message="Retiré des favoris",
-            is_favorite=False
+            message="Ajouté aux favoris",
+            is_favorite=True
         )
     else:
-        # Ajouter aux favoris
-        supabase.table("user_favorites").insert({
-            "user_id": current_user.user_id,
-            "dataset_id": dataset_id
-        }).execute()
-
         return FavoriteResponse(
             success=True,
-            message="Ajouté aux favoris",
-            is_favorite=True
+            message="Retiré des favoris",
+            is_favorite=False
         )
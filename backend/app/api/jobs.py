@@ -0,0 +1,44 @@
+"""
+Background job API endpoints
+"""
+import uuid
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.database import get_supabase_client, execute
+from app.core.jobs import get_job
+from app.middleware.supabase_auth import SupabaseUser, get_current_user
+from app.schemas import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+async def _owns_job(job: dict, user: Optional[SupabaseUser]) -> bool:
+    """The caller created the dataset the job works on"""
+    dataset_id = (job.get("payload") or {}).get("dataset_id")
+    if user is None or not dataset_id:
+        return False
+    response = await execute(get_supabase_client().table("datasets").select("created_by").eq("id", dataset_id).limit(1))
+    return bool(response.data) and response.data[0].get("created_by") == user.user_id
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job_status(
+    job_id: str,
+    current_user: Optional[SupabaseUser] = Depends(get_current_user),
+):
+    """
+    Status and progress of a background job. The result and the last error
+    (paths, URLs, exception messages) are only returned to the creator of
+    the dataset the job works on.
+    """
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not await _owns_job(job, current_user):
+        job = {**job, "result": None, "last_error": None}
+    return job
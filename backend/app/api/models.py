@@ -5,7 +5,8 @@ import os
 import uuid
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
-from app.core.database import get_supabase_client, get_supabase_admin_client
+from app.core.database import get_supabase_client, get_supabase_admin_client, execute, run_in_db_pool
+from app.core.dataloader import DataLoaders, get_dataloaders
 from app.middleware.supabase_auth import get_current_user, SupabaseUser
 from app.schemas.model import ModelCreate, ModelResponse
 from app.api.profiles import upsert_profile_from_user
@@ -22,7 +23,7 @@ async def list_models(dataset_id: Optional[str] = Query(None)):
     query = supabase.table("models").select("*")
     if dataset_id:
         query = query.eq("dataset_id", dataset_id)
-    response = query.order("created_at", desc=True).execute()
+    response = await execute(query.order("created_at", desc=True))
     return [ModelResponse(**m) for m in (response.data or [])]
 
 
@@ -32,7 +33,7 @@ async def get_model(model_id: str):
     Get a single model by ID.
     """
     supabase = get_supabase_client()
-    response = supabase.table("models").select("*").eq("id", model_id).single().execute()
+    response = await execute(supabase.table("models").select("*").eq("id", model_id).single())
     if not response.data:
         raise HTTPException(status_code=404, detail="Modèle non trouvé.")
     return ModelResponse(**response.data)
@@ -42,16 +43,15 @@ async def get_model(model_id: str):
 async def create_model(
     model: ModelCreate,
     current_user: SupabaseUser = Depends(get_current_user),
+    loaders: DataLoaders = Depends(get_dataloaders),
 ):
     """
     Create a new model affiliated to a dataset.
     """
-    supabase = get_supabase_client()
     supabase_admin = get_supabase_admin_client()
 
     # Verify dataset exists
-    ds = supabase.table("datasets").select("id").eq("id", model.dataset_id).single().execute()
-    if not ds.data:
+    if not await loaders.exists("datasets", model.dataset_id):
         raise HTTPException(status_code=404, detail="Dataset non trouvé.")
 
     data = model.model_dump()
@@ -59,9 +59,9 @@ async def create_model(
 
     # Auto-create profile from JWT data on first model submission
     if current_user:
-        upsert_profile_from_user(current_user, supabase_admin)
+        await run_in_db_pool(upsert_profile_from_user, current_user, supabase_admin)
 
-    response = supabase_admin.table("models").insert(data).execute()
+    response = await execute(supabase_admin.table("models").insert(data))
     if not response.data:
         raise HTTPException(status_code=500, detail="Erreur lors de la création du modèle.")
 
@@ -96,7 +96,7 @@ async def upload_model_file(
     supabase_admin = get_supabase_admin_client()
 
     # Verify model exists and belongs to current user
-    existing = supabase.table("models").select("id, created_by").eq("id", model_id).single().execute()
+    existing = await execute(supabase.table("models").select("id, created_by").eq("id", model_id).single())
     if not existing.data:
         raise HTTPException(status_code=404, detail="Modèle non trouvé.")
     if existing.data["created_by"] != (current_user.user_id if current_user else None):
@@ -105,16 +105,17 @@ async def upload_model_file(
     file_path = f"{model_id}/{uuid.uuid4()}{ext}"
 
     try:
-        supabase_admin.storage.from_("models-files").upload(
+        await run_in_db_pool(
+            supabase_admin.storage.from_("models-files").upload,
             file_path,
             content,
             {"content-type": file.content_type or "application/octet-stream"},
         )
         public_url = supabase_admin.storage.from_("models-files").get_public_url(file_path)
 
-        supabase_admin.table("models").update({
+        await execute(supabase_admin.table("models").update({
             "model_file_url": public_url,
-        }).eq("id", model_id).execute()
+        }).eq("id", model_id))
 
         return {
             "model_file_url": public_url,
@@ -136,11 +137,11 @@ async def delete_model(
     supabase = get_supabase_client()
     supabase_admin = get_supabase_admin_client()
 
-    existing = supabase.table("models").select("created_by").eq("id", model_id).single().execute()
+    existing = await execute(supabase.table("models").select("created_by").eq("id", model_id).single())
     if not existing.data:
         raise HTTPException(status_code=404, detail="Modèle non trouvé.")
 
     if existing.data["created_by"] != (current_user.user_id if current_user else None):
         raise HTTPException(status_code=403, detail="Non autorisé.")
 
-    supabase_admin.table("models").delete().eq("id", model_id).execute()
+    await execute(supabase_admin.table("models").delete().eq("id", model_id))
@@ -3,7 +3,8 @@ Notebook API endpoints - Linked scripts and analyses
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, execute
+from app.core.dataloader import DataLoaders, get_dataloaders
 from app.middleware.supabase_auth import SupabaseUser, require_auth
 from app.schemas import NotebookCreate, NotebookUpdate, NotebookResponse
 
@@ -17,12 +18,11 @@ async def list_notebooks_for_dataset(dataset_id: str):
     """
     supabase = get_supabase_client()
 
-    response = (
+    response = await execute(
         supabase.table("notebooks")
         .select("*")
         .eq("dataset_id", dataset_id)
         .order("created_at", desc=True)
-        .execute()
     )
 
     return [NotebookResponse(**n) for n in response.data]
@@ -35,12 +35,11 @@ async def get_my_notebooks(current_user: SupabaseUser = Depends(require_auth)):
     """
     supabase = get_supabase_client()
 
-    response = (
+    response = await execute(
         supabase.table("notebooks")
         .select("*")
         .eq("user_id", current_user.user_id)
         .order("created_at", desc=True)
-        .execute()
     )
 
     return [NotebookResponse(**n) for n in response.data]
@@ -50,6 +49,7 @@ async def get_my_notebooks(current_user: SupabaseUser = Depends(require_auth)):
 async def create_notebook(
     notebook: NotebookCreate,
     current_user: SupabaseUser = Depends(require_auth),
+    loaders: DataLoaders = Depends(get_dataloaders),
 ):
     """
     Create a new notebook link for a dataset (requires authentication)
@@ -57,9 +57,7 @@ async def create_notebook(
     supabase = get_supabase_client()
 
     # Check if dataset exists
-    dataset = supabase.table("datasets").select("id").eq("id", notebook.dataset_id).single().execute()
-
-    if not dataset.data:
+    if not await loaders.exists("datasets", notebook.dataset_id):
         raise HTTPException(status_code=404, detail="Dataset not found")
 
     # Create notebook
@@ -72,7 +70,7 @@ async def create_notebook(
         "description": notebook.description,
     }
 
-    response = supabase.table("notebooks").insert(data).execute()
+    response = await execute(supabase.table("notebooks").insert(data))
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create notebook")
@@ -92,7 +90,7 @@ async def update_notebook(
     supabase = get_supabase_client()
 
     # Check ownership
-    existing = supabase.table("notebooks").select("*").eq("id", notebook_id).single().execute()
+    existing = await execute(supabase.table("notebooks").select("*").eq("id", notebook_id).single())
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="Notebook not found")
@@ -110,7 +108,7 @@ async def update_notebook(
     if "platform" in update_data and update_data["platform"]:
         update_data["platform"] = update_data["platform"].value
 
-    response = supabase.table("notebooks").update(update_data).eq("id", notebook_id).execute()
+    response = await execute(supabase.table("notebooks").update(update_data).eq("id", notebook_id))
 
     return NotebookResponse(**response.data[0])
 
@@ -126,7 +124,7 @@ async def delete_notebook(
     supabase = get_supabase_client()
 
     # Check ownership
-    existing = supabase.table("notebooks").select("user_id").eq("id", notebook_id).single().execute()
+    existing = await execute(supabase.table("notebooks").select("user_id").eq("id", notebook_id).single())
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="Notebook not found")
@@ -134,4 +132,4 @@ async def delete_notebook(
     if existing.data["user_id"] != current_user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this notebook")
 
-    supabase.table("notebooks").delete().eq("id", notebook_id).execute()
+    await execute(supabase.table("notebooks").delete().eq("id", notebook_id))
@@ -3,7 +3,7 @@ Profile API endpoints
 """
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Depends
-from app.core.database import get_supabase_client, get_supabase_admin_client
+from app.core.database import get_supabase_client, get_supabase_admin_client, execute
 from app.middleware.supabase_auth import get_current_user, SupabaseUser
 from app.schemas.profile import ProfileUpdate, ProfileResponse
 
@@ -14,6 +14,7 @@ def upsert_profile_from_user(user: SupabaseUser, admin_client=None):
     """
     Upsert a profile row from JWT user data.
     Called on first model submission to auto-create the profile.
+    Blocking: call it through run_in_db_pool() from async code.
     """
     if not user:
         return
@@ -34,7 +35,7 @@ async def get_profile(user_id: str):
     Get a public profile by user_id.
     """
     supabase = get_supabase_client()
-    response = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
+    response = await execute(supabase.table("profiles").select("*").eq("id", user_id).single())
     if not response.data:
         raise HTTPException(status_code=404, detail="Profil non trouvé.")
     return ProfileResponse(**response.data)
@@ -55,7 +56,7 @@ async def update_my_profile(
     payload = {"id": current_user.user_id}
     payload.update({k: v for k, v in data.model_dump().items() if v is not None})
 
-    response = supabase_admin.table("profiles").upsert(payload, on_conflict="id").execute()
+    response = await execute(supabase_admin.table("profiles").upsert(payload, on_conflict="id"))
     if not response.data:
         raise HTTPException(status_code=500, detail="Erreur lors de la mise à jour du profil.")
     return ProfileResponse(**response.data[0])
@@ -67,5 +68,5 @@ async def get_profile_models(user_id: str):
     Get all models submitted by a user.
     """
     supabase = get_supabase_client()
-    response = supabase.table("models").select("*").eq("created_by", user_id).order("created_at", desc=True).execute()
+    response = await execute(supabase.table("models").select("*").eq("created_by", user_id).order("created_at", desc=True))
     return response.data or []
@@ -3,7 +3,7 @@ Review API endpoints
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, get_supabase_admin_client, execute, rpc
 from app.middleware.supabase_auth import SupabaseUser, get_current_user, require_auth
 from app.schemas import ReviewCreate, ReviewUpdate, ReviewResponse
 
@@ -17,12 +17,11 @@ async def list_reviews_for_dataset(dataset_id: str):
     """
     supabase = get_supabase_client()
 
-    response = (
+    response = await execute(
         supabase.table("reviews")
         .select("*")
         .eq("dataset_id", dataset_id)
         .order("created_at", desc=True)
-        .execute()
     )
 
     return [ReviewResponse(**r) for r in response.data]
@@ -35,12 +34,11 @@ async def get_my_reviews(current_user: SupabaseUser = Depends(require_auth)):
     """
     supabase = get_supabase_client()
 
-    response = (
+    response = await execute(
         supabase.table("reviews")
         .select("*")
         .eq("user_id", current_user.user_id)
         .order("created_at", desc=True)
-        .execute()
     )
 
     return [ReviewResponse(**r) for r in response.data]
@@ -55,39 +53,30 @@ async def create_review(
     Create a new review for a dataset (requires authentication)
     One review per user per dataset
     """
-    supabase = get_supabase_client()
-
-    # Check if dataset exists
-    dataset = supabase.table("datasets").select("id").eq("id", review.dataset_id).single().execute()
-
-    if not dataset.data:
-        raise HTTPException(status_code=404, detail="Dataset not found")
-
-    # Check if user already reviewed this dataset
-    existing = (
-        supabase.table("reviews")
-        .select("id")
-        .eq("dataset_id", review.dataset_id)
-        .eq("user_id", current_user.user_id)
-        .execute()
+    # Vérification du dataset, unicité et insertion en un seul appel (create_review).
+    # p_user_id vient du jeton vérifié : la RPC n'est exécutable que par service_role
+    response = await rpc(
+        get_supabase_admin_client(),
+        "create_review",
+        {
+            "p_dataset_id": review.dataset_id,
+            "p_user_id": current_user.user_id,
+            "p_utility_score": review.utility_score,
+            "p_cleanliness_score": review.cleanliness_score,
+            "p_documentation_score": review.documentation_score,
+            "p_comment": review.comment,
+        },
+        errors={
+            "SQD01": (404, "Dataset not found"),
+            "22P02": (404, "Dataset not found"),
+            "SQD02": (409, "You have already reviewed this dataset. Use PUT to update."),
+        },
     )
 
-    if existing.data:
-        raise HTTPException(
-            status_code=409,
-            detail="You have already reviewed this dataset. Use PUT to update.",
-        )
-
-    # Create review
-    data = review.model_dump()
-    data["user_id"] = current_user.user_id
-
-    response = supabase.table("reviews").insert(data).execute()
-
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create review")
 
-    return ReviewResponse(**response.data[0])
+    return ReviewResponse(**response.data)
 
 
 @router.put("/{review_id}", response_model=ReviewResponse)
@@ -102,7 +91,7 @@ async def update_review(
     supabase = get_supabase_client()
 
     # Check ownership
-    existing = supabase.table("reviews").select("*").eq("id", review_id).single().execute()
+    existing = await execute(supabase.table("reviews").select("*").eq("id", review_id).single())
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="Review not found")
@@ -116,7 +105,7 @@ async def update_review(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    response = supabase.table("reviews").update(update_data).eq("id", review_id).execute()
+    response = await execute(supabase.table("reviews").update(update_data).eq("id", review_id))
 
     return ReviewResponse(**response.data[0])
 
@@ -132,7 +121,7 @@ async def delete_review(
     supabase = get_supabase_client()
 
     # Check ownership
-    existing = supabase.table("reviews").select("user_id").eq("id", review_id).single().execute()
+    existing = await execute(supabase.table("reviews").select("user_id").eq("id", review_id).single())
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="Review not found")
@@ -140,4 +129,4 @@ async def delete_review(
     if existing.data["user_id"] != current_user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this review")
 
-    supabase.table("reviews").delete().eq("id", review_id).execute()
+    await execute(supabase.table("reviews").delete().eq("id", review_id))
@@ -0,0 +1,243 @@
+"""
+Compute executor for CPU-bound dataset analytics
+
+Un pool de process borné, ouvert par le lifespan de l'application, exécute
+tout le travail pandas / numpy (aperçu, profilage, corrélations) hors de la
+boucle d'événements. L'admission est contrôlée : au-delà de
+`compute_max_queue` tâches en attente ou en cours, la requête reçoit un 503
+avec un en-tête Retry-After au lieu de s'empiler. Chaque tâche a un délai
+maximal d'exécution (504 au-delà), attente en file non comprise.
+
+Chaque process du pool est une « voie » (ProcessPoolExecutor à un process) :
+une tâche peut être routée vers une voie donnée (`routes`), pour que les
+mêmes lignes d'un même fichier soient toujours traitées par le process qui
+les a en cache (app/core/framecache.py). Les tâches non routées vont à la
+voie la moins chargée.
+
+Le délai est appliqué dans le worker (SIGALRM) : la tâche y est interrompue
+et le worker libéré, au lieu de continuer un calcul dont personne n'attend
+plus le résultat. Une tâche admise garde sa place dans la file jusqu'à ce
+que son worker ait réellement fini.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from app.core.config import get_settings
+from app.core import framecache
+
+
+# Sans SIGALRM (Windows), le délai est surveillé côté API, attente en file comprise
+WORKER_DEADLINE = hasattr(signal, "setitimer")
+
+
+class TaskTimeout(Exception):
+    """Raised inside a pool worker when its task exceeds its run-time budget"""
+
+
+def _expired(signum, frame):
+    raise TaskTimeout()
+
+
+def _timed_call(fn: Callable, args: tuple, timeout: float) -> Tuple[Any, float, float]:
+    started = time.time()
+    if not WORKER_DEADLINE:
+        return fn(*args), started, time.time()
+    previous = signal.signal(signal.SIGALRM, _expired)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    return result, started, time.time()
+
+
+def _warmup():
+    import pandas  # noqa: F401  (import payé au démarrage, pas à la première requête)
+
+
+def _summary(samples: Deque[float]) -> dict:
+    if not samples:
+        return {"avg": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "avg": round(sum(ordered) / len(ordered), 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        "max": round(ordered[-1], 1),
+    }
+
+
+class ComputeExecutor:
+    """Lifespan-managed process pool with a bounded queue, timeouts and metrics"""
+
+    def __init__(self):
+        self._lanes: List[ProcessPoolExecutor] = []
+        self._pending: List[int] = []  # tâches soumises et pas terminées, par voie
+        self._context = None
+        self._counters = None
+        self.queued = 0  # tâches admises, pas encore terminées
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._wait_ms: Deque[float] = deque(maxlen=1000)
+        self._run_ms: Deque[float] = deque(maxlen=1000)
+
+    @property
+    def workers(self) -> int:
+        return get_settings().compute_workers or os.cpu_count() or 1
+
+    def _new_lane(self) -> ProcessPoolExecutor:
+        lane = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=self._context,
+            initializer=framecache.init_worker,
+            initargs=(self._counters, framecache.worker_budget_bytes(len(self._pending))),
+        )
+        lane.submit(_warmup)
+        return lane
+
+    def open(self):
+        if self._lanes:
+            return
+        # spawn : pas de fork d'un process qui a déjà des threads (pool DB, boucle asyncio)
+        self._context = multiprocessing.get_context("spawn")
+        self._counters = framecache.shared_counters(self._context)
+        self._pending = [0] * self.workers
+        self._lanes = [self._new_lane() for _ in self._pending]
+
+    def close(self):
+        for lane in self._lanes:
+            lane.shutdown(wait=False, cancel_futures=True)
+        self._lanes = []
+
+    def _lane(self, route: Optional[int]) -> int:
+        if not self._lanes:
+            self.open()
+        if route is not None:
+            return route % len(self._lanes)
+        return min(range(len(self._lanes)), key=self._pending.__getitem__)
+
+    def _retry_after(self, extra: int) -> int:
+        avg_run_s = (sum(self._run_ms) / len(self._run_ms) / 1000) if self._run_ms else 1.0
+        return max(1, math.ceil((self.queued + extra) / self.workers * avg_run_s))
+
+    def _admit(self, count: int):
+        if self.queued + count > get_settings().compute_max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Serveur de calcul saturé, réessayez dans quelques instants.",
+                headers={"Retry-After": str(self._retry_after(count))},
+            )
+        self.queued += count
+
+    def _finished(self, future: Future, submitted: float, lane: int):
+        # Appelé quand le worker a fini (ou la tâche annulée avant d'avoir démarré)
+        self.queued -= 1
+        if lane < len(self._pending):
+            self._pending[lane] -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            if not isinstance(future.exception(), TaskTimeout):
+                self.failed += 1
+            return
+        _, started, finished = future.result()
+        self.completed += 1
+        self._wait_ms.append(max(started - submitted, 0) * 1000)
+        self._run_ms.append((finished - started) * 1000)
+
+    def _submit(self, fn: Callable, args: tuple, timeout: float, route: Optional[int] = None) -> Future:
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        lane = self._lane(route)
+        try:
+            future = self._lanes[lane].submit(_timed_call, fn, args, timeout)
+        except BrokenProcessPool:
+            # Le worker de cette voie est mort (mémoire...) : on la remplace
+            self._lanes[lane] = self._new_lane()
+            future = self._lanes[lane].submit(_timed_call, fn, args, timeout)
+        self.submitted += 1
+        self._pending[lane] += 1
+
+        def done(f: Future):
+            try:
+                loop.call_soon_threadsafe(self._finished, f, submitted, lane)
+            except RuntimeError:
+                pass  # boucle déjà fermée (arrêt)
+
+        future.add_done_callback(done)
+        return future
+
+    async def map(
+        self,
+        fn: Callable,
+        args_list: Sequence[tuple],
+        timeout: Optional[float] = None,
+        routes: Optional[Sequence[int]] = None,
+    ) -> List[Any]:
+        """
+        Run `fn(*args)` for every args tuple in the pool. The whole batch is
+        admitted or rejected at once (503); a task running past `timeout`
+        seconds (time spent queued excluded) fails the batch with a 504.
+        `routes` pins each task to a worker (route modulo the worker count).
+        """
+        timeout = timeout or get_settings().compute_task_timeout_s
+        self._admit(len(args_list))
+        futures: List[Future] = []
+        try:
+            for i, args in enumerate(args_list):
+                futures.append(self._submit(fn, args, timeout, routes[i] if routes is not None else None))
+        except Exception:
+            self.queued -= len(args_list) - len(futures)
+            for future in futures:
+                future.cancel()
+            raise
+
+        waits = [asyncio.wrap_future(future) for future in futures]
+        if not WORKER_DEADLINE:
+            waits = [asyncio.wait_for(w, timeout) for w in waits]
+        try:
+            results = await asyncio.gather(*waits)
+        except (TaskTimeout, asyncio.TimeoutError):
+            self.timeouts += 1
+            raise HTTPException(status_code=504, detail="Calcul trop long, réessayez plus tard.")
+        finally:
+            # Annule les tâches pas encore démarrées ; celles en cours s'arrêtent
+            # à leur propre délai et gardent leur place dans la file jusque-là
+            for future in futures:
+                future.cancel()
+        return [result for result, _, _ in results]
+
+    async def run(self, fn: Callable, *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run one `fn(*args)` in the pool (see `map`)"""
+        return (await self.map(fn, [args], timeout=timeout))[0]
+
+    def stats(self) -> dict:
+        settings = get_settings()
+        return {
+            "workers": self.workers,
+            "max_queue": settings.compute_max_queue,
+            "queue_depth": self.queued,
+            "lane_depths": list(self._pending),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms": _summary(self._wait_ms),
+            "run_ms": _summary(self._run_ms),
+        }
+
+
+compute_executor = ComputeExecutor()
@@ -17,6 +17,60 @@ class Settings(BaseSettings):
     frontend_url_www: str = ""
     frontend_url_vercel: str = ""
 
+    # Monitoring : GET /metrics exige `Authorization: Bearer <metrics_token>` ("" = route désactivée)
+    metrics_token: str = ""
+
+    # Supabase connection pools (un pool par clé, partagé par tout le process)
+    supabase_pool_max_connections: int = 20
+    supabase_pool_max_keepalive: int = 10
+    supabase_pool_keepalive_expiry: float = 30.0
+    supabase_http_timeout: float = 30.0
+    db_max_workers: int = 16  # threads dédiés aux appels supabase-py synchrones
+
+    # Supabase Storage (téléchargement des fichiers de datasets)
+    storage_http_max_connections: int = 50
+    storage_http_max_keepalive: int = 20
+    storage_http_keepalive_expiry: float = 60.0
+    storage_http_max_per_host: int = 10
+    storage_http_timeout: float = 90.0
+
+    # Dataloader (regroupement des lectures par clé)
+    dataloader_batch_window_ms: float = 2.0
+    dataloader_max_batch: int = 100
+
+    # Compteur de téléchargements (write-behind)
+    download_flush_interval_s: float = 10.0
+
+    # Pool de calcul (pandas / numpy hors de la boucle d'événements)
+    compute_workers: int = 0  # 0 = nombre de cœurs
+    compute_max_queue: int = 64  # tâches en attente ou en cours avant de répondre 503
+    compute_task_timeout_s: float = 120.0
+
+    # Profilage des fichiers de datasets (lecture par blocs, mémoire bornée)
+    profile_chunk_rows: int = 50_000
+    analytics_csv_split_mb: int = 8  # taille minimale d'une plage CSV traitée en parallèle
+    sidecar_row_group_rows: int = 100_000  # groupes de lignes du sidecar Parquet (unité de lecture parallèle)
+    file_cache_dir: str = ""  # cache disque des fichiers téléchargés ("" = répertoire temporaire du système)
+    file_cache_max_mb: int = 2048
+    frame_cache_mb: int = 256  # DataFrames lus gardés en mémoire, pour tout le pool (réparti par process ; 0 = désactivé)
+
+    # Calcul unique par (analyse, fichier) entre visiteurs et réplicas
+    analytics_lease_ttl_s: float = 300.0  # bail du calculateur, expire si le réplica disparaît
+    analytics_follower_poll_s: float = 1.0
+    analytics_follower_wait_s: float = 240.0  # au-delà : 503 + Retry-After
+
+    # File de tâches (table jobs, python -m app.worker)
+    worker_concurrency: int = 2  # tâches simultanées par process worker
+    api_embedded_workers: int = 0  # tâches exécutées par l'API elle-même (déploiement mono-process : 1 ou plus)
+    worker_poll_interval_s: float = 2.0
+    job_max_attempts: int = 5
+    job_retry_base_s: float = 5.0  # délai avant la 2e tentative, doublé ensuite
+    job_retry_max_s: float = 600.0
+    job_timeout_s: float = 900.0
+    job_heartbeat_s: float = 15.0
+    job_stale_after_s: float = 120.0  # sans signe de vie, la tâche est remise en file
+    job_shutdown_grace_s: float = 30.0
+
     # App
     app_name: str = "StochastiQdata API"
     debug: bool = False
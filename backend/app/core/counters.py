@@ -0,0 +1,92 @@
+"""
+Write-behind download counters
+
+Les téléchargements sont comptés en mémoire et envoyés périodiquement (et à
+l'arrêt) en un seul appel à `increment_download_counts` (supabase/schema.sql),
+qui incrémente atomiquement `datasets.download_count` et la table de cumul
+journalier `dataset_download_daily`. Le endpoint n'attend jamais l'écriture en base.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from app.core.config import get_settings
+from app.core.database import get_supabase_admin_client, rpc
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCounter:
+    """In-process download increments, flushed in bulk by a background task"""
+
+    def __init__(self):
+        self._pending: Counter[Tuple[str, str]] = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+        self.flushed_increments = 0
+        self.last_error: Optional[str] = None
+
+    def incr(self, dataset_id: str) -> int:
+        """Record one download; returns this process' pending count for the dataset"""
+        day = datetime.now(timezone.utc).date().isoformat()
+        self._pending[(dataset_id, day)] += 1
+        return self.pending(dataset_id)
+
+    def pending(self, dataset_id: str) -> int:
+        return sum(n for (ds, _), n in self._pending.items() if ds == dataset_id)
+
+    async def flush(self):
+        """Send every pending increment in one RPC; re-queue them on failure"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, Counter()
+            payload = [
+                {"dataset_id": dataset_id, "day": day, "count": n}
+                for (dataset_id, day), n in batch.items()
+            ]
+            try:
+                await rpc(get_supabase_admin_client(), "increment_download_counts", {"p_counts": payload})
+            except Exception as e:
+                self._pending.update(batch)
+                self.last_error = str(e)
+                logger.warning("Download counter flush failed: %s", e)
+                return
+            self.flushes += 1
+            self.flushed_increments += sum(batch.values())
+            self.last_error = None
+
+    async def _run(self):
+        interval = get_settings().download_flush_interval_s
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and push what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_datasets": len({ds for ds, _ in self._pending}),
+            "pending_increments": sum(self._pending.values()),
+            "flushes": self.flushes,
+            "flushed_increments": self.flushed_increments,
+            "last_error": self.last_error,
+        }
+
+
+download_counter = DownloadCounter()
@@ -1,17 +1,180 @@
 """
 Supabase database client
+
+Les clients anon et service-role sont partagés par tout le process : ils sont
+ouverts au démarrage de l'application (lifespan, voir app/main.py) et
+réutilisent un pool de connexions HTTP keep-alive au lieu de refaire un
+handshake TCP/TLS à chaque requête.
+
+supabase-py est synchrone : les handlers async ne doivent jamais appeler
+`.execute()` directement mais passer par `execute()` / `run_in_db_pool()`,
+qui exécutent l'appel sur un pool de threads borné sans bloquer la boucle
+d'événements.
 """
-from supabase import create_client, Client
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+import httpx
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+from supabase import create_client, Client, ClientOptions
 from app.core.config import get_settings
 
+ANON_ROLE = "anon"
+SERVICE_ROLE = "service_role"
+
+T = TypeVar("T")
+
+
+def httpx_pool_stats(client: Optional[httpx.Client | httpx.AsyncClient]) -> dict:
+    """
+    Snapshot of the connection pool behind an httpx client
+    (open, idle and in-use connections, queued requests)
+    """
+    if client is None or client.is_closed:
+        return {"open": 0, "idle": 0, "in_use": 0, "queued": 0}
+
+    pool = getattr(client._transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    open_conns = [c for c in connections if not c.is_closed()]
+    idle = sum(1 for c in open_conns if c.is_idle())
+
+    return {
+        "open": len(open_conns),
+        "idle": idle,
+        "in_use": len(open_conns) - idle,
+        "queued": len(getattr(pool, "_requests", [])),
+    }
+
+
+class SupabaseClientRegistry:
+    """
+    Process-wide registry of pooled Supabase clients (one per key role).
+    Clients are created lazily so scripts that never run the app lifespan
+    still work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Client] = {}
+        self._http_clients: Dict[str, httpx.Client] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+
+    def _build(self, role: str) -> Client:
+        settings = get_settings()
+        key = settings.supabase_service_key if role == SERVICE_ROLE else settings.supabase_key
+
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings.supabase_pool_max_connections,
+                max_keepalive_connections=settings.supabase_pool_max_keepalive,
+                keepalive_expiry=settings.supabase_pool_keepalive_expiry,
+            ),
+            timeout=settings.supabase_http_timeout,
+            follow_redirects=True,
+            http2=True,
+        )
+        self._http_clients[role] = http_client
+        return create_client(settings.supabase_url, key, options=ClientOptions(httpx_client=http_client))
+
+    def get(self, role: str) -> Client:
+        client = self._clients.get(role)
+        if client is not None:
+            return client
+        with self._lock:
+            if role not in self._clients:
+                self._clients[role] = self._build(role)
+            return self._clients[role]
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=get_settings().db_max_workers,
+                        thread_name_prefix="supabase-db",
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call on the DB thread pool"""
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+
+    def open(self):
+        """Create both clients up front (called from the app lifespan)"""
+        self.get(ANON_ROLE)
+        self.get(SERVICE_ROLE)
+        self.executor
+
+    def close(self):
+        """Close every pooled HTTP connection and stop the DB thread pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            for http_client in self._http_clients.values():
+                http_client.close()
+            self._http_clients.clear()
+            self._clients.clear()
+
+    def stats(self) -> dict:
+        settings = get_settings()
+        stats = {
+            role: {
+                **httpx_pool_stats(self._http_clients.get(role)),
+                "max_connections": settings.supabase_pool_max_connections,
+                "max_keepalive": settings.supabase_pool_max_keepalive,
+            }
+            for role in (ANON_ROLE, SERVICE_ROLE)
+        }
+        stats["db_threads"] = {
+            "max_workers": settings.db_max_workers,
+            "in_flight": self._in_flight,
+        }
+        return stats
+
+
+supabase_registry = SupabaseClientRegistry()
+
 
 def get_supabase_client() -> Client:
     """Get Supabase client with anon key (respects RLS)"""
-    settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_key)
+    return supabase_registry.get(ANON_ROLE)
 
 
 def get_supabase_admin_client() -> Client:
     """Get Supabase client with service role key (bypasses RLS)"""
-    settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_service_key)
+    return supabase_registry.get(SERVICE_ROLE)
+
+
+async def run_in_db_pool(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run any blocking Supabase call (storage, helpers) off the event loop"""
+    return await supabase_registry.run(fn, *args, **kwargs)
+
+
+async def execute(query):
+    """Execute a PostgREST query builder off the event loop"""
+    return await supabase_registry.run(query.execute)
+
+
+async def rpc(client: Client, fn: str, params: dict, errors: Optional[Dict[str, Tuple[int, str]]] = None):
+    """
+    Call a Postgres function (supabase/schema.sql) off the event loop.
+    `errors` maps the SQLSTATE codes raised by the function to (status, detail).
+    """
+    try:
+        return await execute(client.rpc(fn, params))
+    except APIError as e:
+        if errors and e.code in errors:
+            status_code, detail = errors[e.code]
+            raise HTTPException(status_code=status_code, detail=detail)
+        raise
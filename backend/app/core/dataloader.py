@@ -0,0 +1,136 @@
+"""
+Dataloader: batching and per-request memoization of point lookups
+
+Les lectures `select(...).eq("id", x).single()` émises pendant une courte
+fenêtre (quelques ms) sont regroupées par table et colonnes en une seule
+requête `in_("id", [...])`, puis les lignes sont redistribuées à chaque
+appelant. Le regroupement est partagé par tout le process (plusieurs requêtes
+HTTP concurrentes profitent du même aller-retour) ; la mémoïsation, elle, est
+limitée à une requête HTTP via la dépendance `get_dataloaders`.
+"""
+import asyncio
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import get_settings
+from app.core.database import get_supabase_client, execute
+
+_stats = {"loads": 0, "memo_hits": 0, "batches": 0, "keys_fetched": 0}
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+class _BatchScheduler:
+    """Collects keys for one (table, columns) pair and fetches them in one query"""
+
+    def __init__(self, table: str, columns: str, key: str):
+        self.table = table
+        self.columns = columns
+        self.key = key
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._scheduled = False
+        # La boucle ne garde qu'une référence faible aux tâches : sans celle-ci,
+        # un lot en cours pourrait être collecté et ses appelants attendre indéfiniment
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, value: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(value, []).append(future)
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_later(get_settings().dataloader_batch_window_ms / 1000, self._dispatch)
+        return future
+
+    def _dispatch(self):
+        batch, self._pending = self._pending, {}
+        self._scheduled = False
+        values = list(batch)
+        max_batch = get_settings().dataloader_max_batch
+        for i in range(0, len(values), max_batch):
+            chunk = {v: batch[v] for v in values[i:i + max_batch]}
+            task = asyncio.ensure_future(self._fetch(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: Dict[str, List[asyncio.Future]]):
+        _stats["batches"] += 1
+        _stats["keys_fetched"] += len(batch)
+        try:
+            response = await execute(
+                get_supabase_client()
+                .table(self.table)
+                .select(self.columns)
+                .in_(self.key, list(batch))
+            )
+            rows = {str(row[self.key]): row for row in response.data or []}
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for value, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(rows.get(value))
+
+
+_schedulers: Dict[Tuple[str, str, str], _BatchScheduler] = {}
+
+
+def _scheduler(table: str, columns: str, key: str) -> _BatchScheduler:
+    if columns != "*" and key not in [c.strip() for c in columns.split(",")]:
+        columns = f"{key}, {columns}"
+    scheduler_key = (table, columns, key)
+    if scheduler_key not in _schedulers:
+        _schedulers[scheduler_key] = _BatchScheduler(table, columns, key)
+    return _schedulers[scheduler_key]
+
+
+class DataLoaders:
+    """Request-scoped loader: a row is never fetched twice within one request"""
+
+    def __init__(self):
+        self._memo: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+    async def load(self, table: str, value: str, columns: str = "*", key: str = "id") -> Optional[dict]:
+        """
+        Load one row by key (None if missing). Keys must be UUIDs, so a
+        malformed id cannot make the shared batched query fail.
+        """
+        _stats["loads"] += 1
+        value = str(value)
+        if not _is_uuid(value):
+            return None
+
+        # Une ligne complète déjà chargée satisfait toute projection plus étroite
+        for memo_key in ((table, "*", value), (table, columns, value)):
+            if memo_key in self._memo:
+                _stats["memo_hits"] += 1
+                return await self._memo[memo_key]
+
+        future = _scheduler(table, columns, key).submit(value)
+        self._memo[(table, columns, value)] = future
+        return await future
+
+    async def load_many(self, table: str, values: List[str], columns: str = "*", key: str = "id") -> List[Optional[dict]]:
+        return list(await asyncio.gather(*(self.load(table, v, columns, key) for v in values)))
+
+    async def exists(self, table: str, value: str) -> bool:
+        return await self.load(table, value, columns="id") is not None
+
+
+def get_dataloaders() -> DataLoaders:
+    """FastAPI dependency: one DataLoaders instance per request"""
+    return DataLoaders()
+
+
+def dataloader_stats() -> dict:
+    return dict(_stats)
@@ -0,0 +1,190 @@
+"""
+Content-addressed local disk cache of dataset files
+
+Les fichiers lus par les analyses sont gardés sur disque sous leur clé de
+contenu (file_hash) : un autre visiteur, une autre analyse ou un autre
+worker uvicorn de la même machine ne les retélécharge pas.
+
+- `objects/<clé><ext>` : fichiers complets, écrits dans `tmp/` puis
+  renommés (os.replace, atomique) : jamais de fichier partiel visible ;
+- un verrou `locks/<clé>.lock` (flock) évite que deux process téléchargent
+  le même fichier en même temps ;
+- chaque lecteur reçoit un lien physique `pins/<uuid><ext>` : l'éviction
+  d'un autre process ne supprime pas un fichier en cours de lecture ;
+- au-delà de `file_cache_max_mb`, les fichiers les moins récemment utilisés
+  (mtime, mis à jour à chaque accès) sont supprimés.
+"""
+import asyncio
+import errno
+import fcntl
+import hashlib
+import os
+import re
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from app.core.config import get_settings
+from app.core.http_client import storage_http
+from app.core.singleflight import SingleFlight
+
+# Liens, verrous et téléchargements orphelins (process tué) supprimés à l'ouverture
+_STALE_AFTER_S = 24 * 3600
+_LOCK_POLL_S = 0.2
+_SAFE_KEY = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class DiskFileCache:
+    """Size-capped LRU of downloaded files shared by the processes of a host"""
+
+    def __init__(self):
+        self._root: Optional[str] = None
+        self._downloads = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.downloaded_bytes = 0
+
+    @property
+    def root(self) -> str:
+        if self._root is None:
+            self.open()
+        return self._root
+
+    def open(self):
+        if self._root is not None:
+            return
+        root = get_settings().file_cache_dir or os.path.join(tempfile.gettempdir(), "stochastiq-file-cache")
+        for sub in ("objects", "tmp", "pins", "locks"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        self._root = root
+        cutoff = time.time() - _STALE_AFTER_S
+        for sub in ("tmp", "pins", "locks"):
+            for entry in os.scandir(os.path.join(root, sub)):
+                if entry.stat().st_mtime < cutoff:
+                    _unlink(entry.path)
+
+    @staticmethod
+    def _name(key: str) -> str:
+        key = key.replace(":", ".")
+        return key if _SAFE_KEY.match(key) else hashlib.sha256(key.encode()).hexdigest()
+
+    def _object_path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.root, "objects", self._name(key) + suffix)
+
+    @asynccontextmanager
+    async def local_file(self, key: str, url: str, suffix: str = "", timeout: float = 90) -> AsyncIterator[str]:
+        """
+        Local path of the file `url` whose content key is `key`, downloaded
+        on a miss. The path stays readable until the block exits.
+        """
+        pin = os.path.join(self.root, "pins", uuid.uuid4().hex + suffix)
+        path = self._object_path(key, suffix)
+        while True:
+            if os.path.exists(path):
+                self.hits += 1
+            else:
+                self.misses += 1
+                await self._downloads.do(path, lambda: self._download(url, path, timeout))
+            try:
+                os.link(path, pin)
+                break
+            except FileNotFoundError:
+                continue  # évincé entre-temps par un autre process
+        try:
+            _touch(path)
+            yield pin
+        finally:
+            _unlink(pin)
+
+    def put(self, key: str, source: str, suffix: str = ""):
+        """Add a local file (kept at `source`) to the cache under `key`"""
+        tmp = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+        os.link(source, tmp)
+        os.replace(tmp, self._object_path(key, suffix))
+        self._evict(keep=self._object_path(key, suffix))
+
+    async def _download(self, url: str, path: str, timeout: float):
+        lock_path = os.path.join(self.root, "locks", os.path.basename(path) + ".lock")
+        with open(lock_path, "w") as lock:
+            # Un autre process télécharge déjà ce fichier : on attend son résultat
+            while not _try_lock(lock):
+                await asyncio.sleep(_LOCK_POLL_S)
+                if os.path.exists(path):
+                    return
+            if os.path.exists(path):
+                return
+            tmp = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+            try:
+                with open(tmp, "wb") as f:
+                    self.downloaded_bytes += await storage_http.download(url, f, timeout=timeout)
+                os.replace(tmp, path)
+            finally:
+                _unlink(tmp)
+        self._evict(keep=path)
+
+    def _evict(self, keep: str):
+        limit = get_settings().file_cache_max_mb * 1024 * 1024
+        entries = []
+        for entry in os.scandir(os.path.join(self.root, "objects")):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            if path == keep:
+                continue
+            _unlink(path)
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        files, size = 0, 0
+        if self._root is not None:
+            for entry in os.scandir(os.path.join(self._root, "objects")):
+                try:
+                    size += entry.stat().st_size
+                    files += 1
+                except FileNotFoundError:
+                    pass
+        return {
+            "files": files,
+            "size_mb": round(size / 1024 / 1024, 1),
+            "max_mb": get_settings().file_cache_max_mb,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "downloaded_mb": round(self.downloaded_bytes / 1024 / 1024, 1),
+        }
+
+
+def _try_lock(f) -> bool:
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            return False
+        raise
+
+
+def _touch(path: str):
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+file_cache = DiskFileCache()
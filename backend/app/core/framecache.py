@@ -0,0 +1,143 @@
+"""
+In-process LRU cache of parsed DataFrames
+
+Les process du pool de calcul gardent en mémoire les blocs de lignes qu'ils
+ont lus (app/analytics/parallel.py), clé (fichier, lignes) : profil,
+corrélations... d'un même fichier demandés à quelques instants d'intervalle
+ne le relisent pas. Une entrée peut ne contenir qu'une partie des colonnes
+(projection Parquet) ; seules les colonnes manquantes sont alors lues.
+
+Les parts d'un fichier sont routées vers un process fixe (parallel.py) :
+une part n'est en cache que dans un seul process. Le budget
+`frame_cache_mb` est donc celui de tout le pool, partagé à parts égales
+entre ses process ; il est mesuré avec DataFrame.memory_usage(deep=True) et
+les entrées les moins récemment utilisées sont évincées. Les compteurs sont
+en mémoire partagée : l'API les publie dans /metrics.
+"""
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
+import pandas as pd
+from app.core.config import get_settings
+
+COUNTERS = ("hits", "misses", "evictions", "bytes", "entries")
+
+# Compteurs partagés entre les process du pool (multiprocessing.Array)
+_shared_counters = None
+
+
+def shared_counters(mp_context):
+    """Counters the pool workers write to and the API reads (at each pool start)"""
+    global _shared_counters
+    if _shared_counters is None:
+        _shared_counters = mp_context.Array("q", len(COUNTERS))
+    with _shared_counters.get_lock():
+        # Nouveau pool : les caches des anciens process ont disparu
+        _shared_counters[COUNTERS.index("bytes")] = 0
+        _shared_counters[COUNTERS.index("entries")] = 0
+    return _shared_counters
+
+
+def worker_budget_bytes(workers: int) -> int:
+    """Cache budget of one pool process: its share of `frame_cache_mb`"""
+    return get_settings().frame_cache_mb * 1024 * 1024 // max(workers, 1)
+
+
+def init_worker(counters, budget_bytes: int):
+    """Pool initializer: the worker's cache budget, reported into the shared counters"""
+    global _shared_counters
+    _shared_counters = counters
+    frame_cache._budget = budget_bytes
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+class FrameCache:
+    """LRU of DataFrames under a byte budget"""
+
+    def __init__(self, budget_bytes: Optional[int] = None):
+        self._budget = budget_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[pd.DataFrame, int]]" = OrderedDict()
+
+    @property
+    def budget(self) -> int:
+        if self._budget is None:
+            self._budget = get_settings().frame_cache_mb * 1024 * 1024
+        return self._budget
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def _count(self, name: str, delta: int):
+        if _shared_counters is not None:
+            with _shared_counters.get_lock():
+                _shared_counters[COUNTERS.index(name)] += delta
+
+    def fits(self, nbytes: int) -> bool:
+        return 0 < nbytes <= self.budget
+
+    def _drop(self, key: Hashable, evicted: bool = False):
+        _, size = self._entries.pop(key)
+        self._count("bytes", -size)
+        self._count("entries", -1)
+        if evicted:
+            self._count("evictions", 1)
+
+    def put(self, key: Hashable, df: pd.DataFrame):
+        if key in self._entries:
+            self._drop(key)
+        size = frame_bytes(df)
+        if size > self.budget:
+            return
+        while self._entries and self.size + size > self.budget:
+            self._drop(next(iter(self._entries)), evicted=True)
+        self._entries[key] = (df, size)
+        self._count("bytes", size)
+        self._count("entries", 1)
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        columns: Optional[List[str]],
+        load: Callable[[Optional[List[str]]], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """
+        `columns` (None: all) of the rows `key`. On a miss, `load(missing)`
+        reads only the columns the entry lacks; they are added to it.
+        """
+        entry = self._entries.get(key)
+        cached = entry[0] if entry is not None else None
+        if cached is not None and columns is None:
+            missing = None
+        else:
+            missing = columns if cached is None else [c for c in columns if c not in cached.columns]
+
+        if cached is not None and not missing:
+            self._entries.move_to_end(key)
+            self._count("hits", 1)
+            return cached if columns is None else cached[columns]
+
+        self._count("misses", 1)
+        df = load(missing)
+        if cached is not None:
+            df = pd.concat([cached, df.set_axis(cached.index)], axis=1)
+        self.put(key, df)
+        return df if columns is None else df[columns]
+
+
+frame_cache = FrameCache()
+
+
+def frame_cache_stats(workers: int) -> dict:
+    """Counters summed over the compute pool processes"""
+    values = dict.fromkeys(COUNTERS, 0)
+    if _shared_counters is not None:
+        with _shared_counters.get_lock():
+            values = dict(zip(COUNTERS, _shared_counters[:]))
+    return {
+        **values,
+        "budget_mb": get_settings().frame_cache_mb,
+        "budget_mb_per_process": round(worker_budget_bytes(workers) / (1024 * 1024), 1),
+    }
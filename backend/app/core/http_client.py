@@ -0,0 +1,102 @@
+"""
+Shared HTTP client for Supabase Storage file fetches
+
+Un seul httpx.AsyncClient (HTTP/2, keep-alive) est ouvert par le lifespan de
+l'application : les téléchargements de fichiers réutilisent les connexions au
+lieu de refaire un handshake TCP/TLS à chaque requête.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import IO, AsyncIterator, Dict, Optional
+import httpx
+from app.core.config import get_settings
+from app.core.database import httpx_pool_stats
+
+
+class StorageHttpClient:
+    """
+    Lifespan-managed, connection-pooled AsyncClient with per-host caps
+    and connection-reuse counters
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.new_connections = 0
+
+    def open(self):
+        if self._client is not None:
+            return
+        settings = get_settings()
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.storage_http_max_connections,
+                max_keepalive_connections=settings.storage_http_max_keepalive,
+                keepalive_expiry=settings.storage_http_keepalive_expiry,
+            ),
+            timeout=settings.storage_http_timeout,
+            follow_redirects=True,
+            http2=True,
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_semaphores.clear()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self.open()
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = httpx.URL(url).host
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(get_settings().storage_http_max_per_host)
+        return self._host_semaphores[host]
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Stream a response body (per-host cap held until the body is consumed)"""
+        async with self._host_semaphore(url):
+            self.requests += 1
+            extensions = {**kwargs.pop("extensions", {}), "trace": self._trace}
+            async with self.client.stream(method, url, extensions=extensions, **kwargs) as response:
+                yield response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET a file and read the whole body"""
+        async with self.stream("GET", url, **kwargs) as response:
+            await response.aread()
+            return response
+
+    async def download(self, url: str, fileobj: IO[bytes], **kwargs) -> int:
+        """Stream a file into `fileobj` chunk by chunk; returns the byte count"""
+        size = 0
+        async with self.stream("GET", url, **kwargs) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                fileobj.write(chunk)
+                size += len(chunk)
+        return size
+
+    def stats(self) -> dict:
+        settings = get_settings()
+        return {
+            **httpx_pool_stats(self._client),
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": max(self.requests - self.new_connections, 0),
+            "max_connections": settings.storage_http_max_connections,
+            "max_per_host": settings.storage_http_max_per_host,
+        }
+
+
+storage_http = StorageHttpClient()
@@ -0,0 +1,155 @@
+"""
+Durable background jobs
+
+Les traitements longs (analytics, recalculs, conversions de fichiers...) sont
+inscrits dans la table `jobs` (supabase/schema.sql) puis exécutés par
+`python -m app.worker` (ou par le worker intégré à l'API, voir
+`api_embedded_workers`). La file survit aux redémarrages : une tâche réservée
+par un worker disparu est remise en file faute de signe de vie.
+
+Une tâche est une coroutine enregistrée sous un nom avec `@job_task(...)` ;
+elle reçoit un `JobContext` (payload, tentative, avancement) et renvoie un
+résultat JSON optionnel, visible via `GET /jobs/{id}`.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.config import get_settings
+from app.core.database import get_supabase_admin_client, execute, rpc
+
+
+class PermanentJobError(Exception):
+    """Failure that another attempt cannot fix (the job fails without retry)"""
+
+
+class JobLeaseLost(Exception):
+    """The job was taken back from this worker (stale heartbeat)"""
+
+
+class JobContext:
+    """What a task handler sees of the job it runs"""
+
+    def __init__(self, job: dict, worker_id: str):
+        self.job = job
+        self.worker_id = worker_id
+        self.progress_value: float = 0.0
+        self.progress_message: Optional[str] = None
+
+    @property
+    def id(self) -> str:
+        return self.job["id"]
+
+    @property
+    def payload(self) -> dict:
+        return self.job.get("payload") or {}
+
+    @property
+    def attempt(self) -> int:
+        return self.job["attempts"]
+
+    @property
+    def last_attempt(self) -> bool:
+        return self.job["attempts"] >= self.job["max_attempts"]
+
+    async def progress(self, fraction: Optional[float] = None, message: Optional[str] = None):
+        """Record progress (0..1) and refresh the worker's lease on the job"""
+        if fraction is not None:
+            self.progress_value = fraction
+        if message is not None:
+            self.progress_message = message
+        response = await rpc(get_supabase_admin_client(), "update_job_progress", {
+            "p_job_id": self.id,
+            "p_worker": self.worker_id,
+            "p_progress": fraction,
+            "p_message": message,
+        })
+        if response.data is False:
+            raise JobLeaseLost(f"Job {self.id} is no longer held by {self.worker_id}")
+
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[dict]]]
+
+_TASKS: Dict[str, JobHandler] = {}
+
+
+def job_task(name: str):
+    """Register a coroutine as the handler of the `name` task"""
+    def register(handler: JobHandler) -> JobHandler:
+        _TASKS[name] = handler
+        return handler
+    return register
+
+
+def get_task(name: str) -> Optional[JobHandler]:
+    return _TASKS.get(name)
+
+
+def task_names() -> List[str]:
+    return sorted(_TASKS)
+
+
+def job_key(task: str, *parts: Any) -> str:
+    """Idempotency key such as `dataset_analytics:<dataset_id>:<file_hash>`"""
+    return ":".join([task, *(str(p) for p in parts)])
+
+
+async def enqueue_job(
+    task: str,
+    payload: Optional[dict] = None,
+    idempotency_key: Optional[str] = None,
+    priority: int = 0,
+    max_attempts: Optional[int] = None,
+    delay_s: float = 0,
+) -> dict:
+    """
+    Add a job to the queue. While a job with the same idempotency key is
+    queued or running, that job is returned instead of a new one.
+    """
+    response = await rpc(get_supabase_admin_client(), "enqueue_job", {
+        "p_task": task,
+        "p_payload": payload or {},
+        "p_idempotency_key": idempotency_key,
+        "p_priority": priority,
+        "p_max_attempts": max_attempts or get_settings().job_max_attempts,
+        "p_delay_s": delay_s,
+    })
+    return response.data
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    response = await execute(
+        get_supabase_admin_client().table("jobs").select("*").eq("id", job_id).maybe_single()
+    )
+    return response.data if response else None
+
+
+async def claim_jobs(worker_id: str, limit: int, tasks: Optional[List[str]] = None) -> List[dict]:
+    response = await rpc(get_supabase_admin_client(), "claim_jobs", {
+        "p_worker": worker_id,
+        "p_limit": limit,
+        "p_tasks": tasks,
+    })
+    return response.data or []
+
+
+async def complete_job(job_id: str, worker_id: str, result: Optional[dict] = None) -> bool:
+    response = await rpc(get_supabase_admin_client(), "complete_job", {
+        "p_job_id": job_id,
+        "p_worker": worker_id,
+        "p_result": result,
+    })
+    return bool(response.data)
+
+
+async def fail_job(job_id: str, worker_id: str, error: str, retry_in_s: Optional[float] = None) -> Optional[dict]:
+    """Record a failed attempt; `retry_in_s=None` fails the job for good"""
+    response = await rpc(get_supabase_admin_client(), "fail_job", {
+        "p_job_id": job_id,
+        "p_worker": worker_id,
+        "p_error": error[:2000],
+        "p_retry_in_s": retry_in_s,
+    })
+    return response.data
+
+
+async def requeue_stale_jobs(stale_after_s: float) -> int:
+    response = await rpc(get_supabase_admin_client(), "requeue_stale_jobs", {"p_stale_after_s": stale_after_s})
+    return response.data or 0
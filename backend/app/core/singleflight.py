@@ -0,0 +1,181 @@
+"""
+Single-flight coalescing of expensive computations
+
+Quand le cache d'une analyse est vide (nouveau fichier), tous les visiteurs
+simultanés demandent le même calcul. `coalesce(key, ...)` n'en lance qu'un :
+- dans le process, les appels concurrents sur la même clé partagent une
+  seule tâche (et son résultat ou son erreur) ;
+- entre réplicas, un bail Postgres (`acquire_analytics_lease`, verrou
+  consultatif, supabase/schema.sql) désigne un seul calculateur ; les autres
+  attendent que le résultat apparaisse dans le cache. Le bail est prolongé
+  toutes les TTL/3 pendant le calcul et expire seul si le réplica disparaît.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from fastapi import HTTPException
+from app.core.config import get_settings
+from app.core.database import get_supabase_admin_client, rpc
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight task"""
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.create_task(fn())
+            self._flights[key] = flight
+            self.leaders += 1
+
+            def forget(t: asyncio.Task):
+                if self._flights.get(key) is t:
+                    del self._flights[key]
+                if not t.cancelled():
+                    t.exception()  # évite "exception never retrieved" si tous les appelants sont partis
+
+            flight.add_done_callback(forget)
+        else:
+            self.shared += 1
+        # Un appelant annulé (client déconnecté) n'interrompt pas le calcul des autres
+        return await asyncio.shield(flight)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "shared": self.shared}
+
+
+single_flight = SingleFlight()
+
+
+async def acquire_lease(key: str, holder: str) -> bool:
+    response = await rpc(get_supabase_admin_client(), "acquire_analytics_lease", {
+        "p_key": key,
+        "p_holder": holder,
+        "p_ttl_s": get_settings().analytics_lease_ttl_s,
+    })
+    return bool(response.data)
+
+
+async def renew_lease(key: str, holder: str) -> bool:
+    response = await rpc(get_supabase_admin_client(), "renew_analytics_lease", {
+        "p_key": key,
+        "p_holder": holder,
+        "p_ttl_s": get_settings().analytics_lease_ttl_s,
+    })
+    return bool(response.data)
+
+
+async def _renew_leases(keys: List[str], holder: str):
+    # Toutes les TTL/3 : deux renouvellements peuvent échouer avant l'expiration
+    interval = get_settings().analytics_lease_ttl_s / 3
+    while keys:
+        await asyncio.sleep(interval)
+        for key in list(keys):
+            try:
+                if not await renew_lease(key, holder):
+                    logger.warning("Analytics lease %s was lost", key)
+                    keys.remove(key)
+            except Exception as e:
+                logger.warning("Could not renew analytics lease %s: %s", key, e)
+
+
+@asynccontextmanager
+async def _renewing(keys: Iterable[str], holder: str) -> AsyncIterator[None]:
+    """Keep the leases alive for the duration of the block, however long it runs"""
+    renewal = asyncio.create_task(_renew_leases(list(keys), holder))
+    try:
+        yield
+    finally:
+        renewal.cancel()
+
+
+async def release_lease(key: str, holder: str):
+    try:
+        await rpc(get_supabase_admin_client(), "release_analytics_lease", {"p_key": key, "p_holder": holder})
+    except Exception as e:
+        # Le bail expirera de lui-même
+        logger.warning("Could not release analytics lease %s: %s", key, e)
+
+
+@asynccontextmanager
+async def hold_leases(keys: Iterable[str]) -> AsyncIterator[List[str]]:
+    """Best-effort: take the free leases among `keys` for the duration of the block"""
+    holder = uuid.uuid4().hex
+    held: List[str] = []
+    for key in keys:
+        try:
+            if await acquire_lease(key, holder):
+                held.append(key)
+        except Exception as e:
+            logger.warning("Could not acquire analytics lease %s: %s", key, e)
+    try:
+        async with _renewing(held, holder):
+            yield held
+    finally:
+        for key in held:
+            await release_lease(key, holder)
+
+
+async def _cluster_flight(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    load_cached: Callable[[], Awaitable[Optional[Any]]],
+) -> Any:
+    settings = get_settings()
+    holder = uuid.uuid4().hex
+    deadline = time.monotonic() + settings.analytics_follower_wait_s
+    while True:
+        try:
+            leader = await acquire_lease(key, holder)
+        except Exception as e:
+            logger.warning("Analytics lease unavailable for %s, computing locally: %s", key, e)
+            return await compute()
+
+        if leader:
+            try:
+                # Un autre réplica a pu terminer entre notre lecture du cache et le bail
+                cached = await load_cached()
+                if cached is not None:
+                    return cached
+                async with _renewing([key], holder):
+                    return await compute()
+            finally:
+                await release_lease(key, holder)
+
+        # Suiveur : le calculateur écrira le résultat dans le cache
+        await asyncio.sleep(settings.analytics_follower_poll_s)
+        cached = await load_cached()
+        if cached is not None:
+            return cached
+        if time.monotonic() > deadline:
+            raise HTTPException(
+                status_code=503,
+                detail="Calcul en cours, réessayez dans quelques instants.",
+                headers={"Retry-After": str(int(settings.analytics_follower_poll_s * 5) or 1)},
+            )
+
+
+async def coalesce(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    load_cached: Callable[[], Awaitable[Optional[Any]]],
+) -> Any:
+    """
+    Run `compute()` once for `key` across concurrent callers and replicas.
+    `compute` must store its result where `load_cached` finds it.
+    """
+    return await single_flight.do(key, lambda: _cluster_flight(key, compute, load_cached))
+
+
+def analysis_key(analysis: str, file_hash: str) -> str:
+    return f"{analysis}:{file_hash}"
@@ -2,14 +2,48 @@
 StochastiQdata API - Main Application
 FastAPI backend for dataset rating platform for actuaries
 """
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
-from app.middleware.supabase_auth import SupabaseAuthMiddleware
-from app.api import datasets, reviews, notebooks, benchmarks, favorites, models, profiles
+from app.core.database import supabase_registry
+from app.core.http_client import storage_http
+from app.core.dataloader import dataloader_stats
+from app.core.counters import download_counter
+from app.core.compute import compute_executor
+from app.core.filecache import file_cache
+from app.core.framecache import frame_cache_stats
+from app.core.singleflight import single_flight
+from app.worker import Worker
+from app.middleware.supabase_auth import SupabaseAuthMiddleware, security
+from app.api import datasets, reviews, notebooks, benchmarks, favorites, models, profiles, jobs
 
 settings = get_settings()
 
+# Worker intégré : traite la file `jobs` même sans `python -m app.worker` déployé
+embedded_worker = Worker(concurrency=settings.api_embedded_workers)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources at startup and release them on shutdown"""
+    supabase_registry.open()
+    storage_http.open()
+    file_cache.open()
+    compute_executor.open()
+    download_counter.start()
+    embedded_worker.start()
+    yield
+    await embedded_worker.stop()
+    await download_counter.stop()
+    compute_executor.close()
+    await storage_http.close()
+    supabase_registry.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
@@ -17,6 +51,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -49,6 +84,7 @@ app.include_router(benchmarks.router, prefix="/api/v1")
 app.include_router(favorites.router, prefix="/api/v1")
 app.include_router(models.router, prefix="/api/v1")
 app.include_router(profiles.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -63,3 +99,28 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+async def require_metrics_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    """Reserve /metrics to the monitoring scraper (hidden when no token is configured)"""
+    token = get_settings().metrics_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(credentials.credentials.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)], include_in_schema=False)
+async def metrics():
+    """Connection pool and compute executor statistics for monitoring"""
+    return {
+        "supabase": supabase_registry.stats(),
+        "storage_http": storage_http.stats(),
+        "dataloader": dataloader_stats(),
+        "download_counter": download_counter.stats(),
+        "file_cache": file_cache.stats(),
+        "compute": compute_executor.stats(),
+        "frame_cache": frame_cache_stats(compute_executor.workers),
+        "single_flight": single_flight.stats(),
+        "worker": embedded_worker.stats(),
+    }
@@ -7,10 +7,14 @@ from app.schemas.dataset import (
     ModelType,
     MetricType,
     DatasetLicense,
+    AnalyticsStatus,
     DatasetBase,
     DatasetCreate,
     DatasetResponse,
+    DatasetPartialResponse,
     DatasetListResponse,
+    DATASET_CARD_FIELDS,
+    DATASET_DETAIL_FIELDS,
 )
 from app.schemas.review import (
     ReviewBase,
@@ -37,6 +41,10 @@ from app.schemas.model import (
     ModelCreate,
     ModelResponse,
 )
+from app.schemas.job import (
+    JobStatus,
+    JobResponse,
+)
 
 __all__ = [
     "DatasetSource",
@@ -46,10 +54,14 @@ __all__ = [
     "ModelType",
     "MetricType",
     "DatasetLicense",
+    "AnalyticsStatus",
     "DatasetBase",
     "DatasetCreate",
     "DatasetResponse",
+    "DatasetPartialResponse",
     "DatasetListResponse",
+    "DATASET_CARD_FIELDS",
+    "DATASET_DETAIL_FIELDS",
     "ReviewBase",
     "ReviewCreate",
     "ReviewUpdate",
@@ -67,4 +79,6 @@ __all__ = [
     "BenchmarkLeaderboard",
     "ModelCreate",
     "ModelResponse",
+    "JobStatus",
+    "JobResponse",
 ]
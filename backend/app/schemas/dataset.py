@@ -4,7 +4,7 @@ Pydantic schemas for Dataset
 from typing import Optional, List, Any
 from enum import Enum
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, create_model
 
 
 class DatasetSource(str, Enum):
@@ -45,6 +45,13 @@ class DatasetLicense(str, Enum):
     OTHER = "other"
 
 
+class AnalyticsStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class PivotVariable(str, Enum):
     OCCURRENCE_DATE = "occurrence_date"
     CLAIM_AMOUNT = "claim_amount"
@@ -119,6 +126,10 @@ class DatasetResponse(DatasetBase):
     global_score: float = 0
     review_count: int = 0
     download_count: int = 0
+    analytics_status: Optional[AnalyticsStatus] = Field(None, description="État du précalcul des analyses du fichier")
+    analytics_error: Optional[str] = None
+    analytics_updated_at: Optional[datetime] = None
+    sidecar_url: Optional[str] = Field(None, description="Copie Parquet du fichier, lue par les analyses")
     created_by: Optional[str] = None
     created_at: datetime
     updated_at: datetime
@@ -127,8 +138,32 @@ class DatasetResponse(DatasetBase):
         from_attributes = True
 
 
+def _partial_model(model: type[BaseModel], name: str) -> type[BaseModel]:
+    """Copy of `model` where every field is optional (sparse fieldsets)"""
+    fields = {
+        field_name: (Optional[field.annotation], Field(None, description=field.description))
+        for field_name, field in model.model_fields.items()
+    }
+    return create_model(name, **fields)
+
+
+# Dataset dont seules les colonnes demandées (`fields=`) sont renseignées ;
+# les routes le sérialisent avec response_model_exclude_unset=True.
+DatasetPartialResponse = _partial_model(DatasetResponse, "DatasetPartialResponse")
+
+# Projections par défaut (jamais de computed_cache ni de colonnes hors schéma)
+DATASET_CARD_FIELDS = (
+    "id", "name", "description", "source", "source_url", "tags",
+    "modeling_types", "best_fit_models", "global_score", "review_count",
+    "download_count", "row_count", "column_count", "file_size_mb", "file_url",
+    "data_updated_at", "created_at", "updated_at",
+)
+DATASET_DETAIL_FIELDS = tuple(DatasetResponse.model_fields)
+
+
 class DatasetListResponse(BaseModel):
-    datasets: List[DatasetResponse]
-    total: int
+    datasets: List[DatasetPartialResponse]
+    total: Optional[int] = None  # None quand count=none
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
@@ -0,0 +1,34 @@
+"""
+Pydantic schemas for background Jobs
+"""
+from typing import Optional, Any, Dict
+from enum import Enum
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobResponse(BaseModel):
+    id: str
+    task: str
+    status: JobStatus
+    priority: int = 0
+    progress: float = 0
+    progress_message: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int
+    last_error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    run_after: Optional[datetime] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,246 @@
+"""
+Background job worker
+
+    python -m app.worker [--concurrency N] [--tasks dataset_analytics,...]
+
+Réserve les tâches de la table `jobs` (SKIP LOCKED : autant de workers que
+voulu, sur autant de machines), les exécute avec au plus N tâches
+simultanées, enregistre leur avancement et leur résultat. Un échec est
+retenté avec un délai exponentiel (plafonné, avec gigue) jusqu'à
+`max_attempts`. Le même worker tourne aussi dans l'API quand
+`api_embedded_workers` > 0.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import uuid
+from typing import List, Optional, Set
+from fastapi import HTTPException
+from app.core.config import get_settings
+from app.core.jobs import (
+    JobContext,
+    JobLeaseLost,
+    PermanentJobError,
+    claim_jobs,
+    complete_job,
+    fail_job,
+    get_task,
+    requeue_stale_jobs,
+    task_names,
+)
+
+# Modules qui enregistrent des tâches (@job_task)
+from app.analytics import precompute  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given (1-based) attempt"""
+    settings = get_settings()
+    delay = min(settings.job_retry_max_s, settings.job_retry_base_s * 2 ** (attempt - 1))
+    return round(delay * random.uniform(0.8, 1.2), 1)
+
+
+def _error_message(e: BaseException) -> str:
+    if isinstance(e, HTTPException):
+        return f"{e.status_code}: {e.detail}"
+    return f"{type(e).__name__}: {e}"
+
+
+class Worker:
+    """Claims and runs jobs with bounded concurrency"""
+
+    def __init__(self, concurrency: int, tasks: Optional[List[str]] = None):
+        self.concurrency = concurrency
+        self.tasks = tasks
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._loop_task: Optional[asyncio.Task] = None
+        self.claimed = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+
+    async def _heartbeat(self, ctx: JobContext):
+        interval = get_settings().job_heartbeat_s
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await ctx.progress()
+            except JobLeaseLost:
+                raise
+            except Exception as e:
+                logger.warning("Heartbeat of job %s failed: %s", ctx.id, e)
+
+    async def _execute(self, job: dict):
+        settings = get_settings()
+        ctx = JobContext(job, self.worker_id)
+        handler = get_task(job["task"])
+        if handler is None:
+            self.failed += 1
+            await fail_job(ctx.id, self.worker_id, f"Unknown task: {job['task']}")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(ctx))
+        run = asyncio.create_task(asyncio.wait_for(handler(ctx), settings.job_timeout_s))
+        try:
+            # Le battement de cœur échoue (bail perdu) : la tâche est abandonnée
+            done, _ = await asyncio.wait({run, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+            if run not in done:
+                run.cancel()
+                heartbeat.result()
+            result = run.result()
+        except asyncio.CancelledError:
+            # Arrêt du worker : la tâche repart immédiatement ailleurs
+            run.cancel()
+            await asyncio.shield(fail_job(ctx.id, self.worker_id, "Worker stopped", retry_in_s=0))
+            raise
+        except JobLeaseLost as e:
+            logger.warning("%s", e)
+            return
+        except Exception as e:
+            error = _error_message(e)
+            self.last_error = error
+            retry_in: Optional[float] = None
+            if not isinstance(e, PermanentJobError):
+                retry_in = retry_delay(ctx.attempt)
+                if isinstance(e, HTTPException) and e.status_code == 503:
+                    # Pool de calcul saturé : on revient quand il le suggère
+                    retry_in = float((e.headers or {}).get("Retry-After", retry_in))
+            updated = await fail_job(ctx.id, self.worker_id, error, retry_in)
+            if updated and updated.get("status") == "queued":
+                self.retried += 1
+                logger.info("Job %s (%s) failed, retry in %ss: %s", ctx.id, job["task"], retry_in, error)
+            else:
+                self.failed += 1
+                logger.warning("Job %s (%s) failed: %s", ctx.id, job["task"], error)
+            return
+        finally:
+            heartbeat.cancel()
+
+        await complete_job(ctx.id, self.worker_id, result)
+        self.succeeded += 1
+
+    def _spawn(self, job: dict):
+        task = asyncio.create_task(self._execute(job))
+        self._running.add(task)
+
+        def finished(t: asyncio.Task):
+            self._running.discard(t)
+            self._wakeup.set()
+            if not t.cancelled() and t.exception() is not None:
+                logger.error("Job %s crashed the worker loop", job["id"], exc_info=t.exception())
+
+        task.add_done_callback(finished)
+
+    async def run(self):
+        """Claim jobs until `stop()` is called"""
+        settings = get_settings()
+        ticks_between_sweeps = max(1, int(settings.job_stale_after_s / 2 / settings.worker_poll_interval_s))
+        tick = 0
+        logger.info("Worker %s started (concurrency=%s, tasks=%s)", self.worker_id, self.concurrency, self.tasks or task_names())
+        while not self._stopping:
+            try:
+                if tick % ticks_between_sweeps == 0:
+                    await requeue_stale_jobs(settings.job_stale_after_s)
+                tick += 1
+
+                free = self.concurrency - len(self._running)
+                jobs = await claim_jobs(self.worker_id, free, self.tasks) if free > 0 else []
+                for job in jobs:
+                    self.claimed += 1
+                    self._spawn(job)
+                if jobs and len(jobs) == free:
+                    # File pleine : on attend qu'une place se libère
+                    self._wakeup.clear()
+                    await self._wait(None)
+                    continue
+            except Exception as e:
+                self.last_error = _error_message(e)
+                logger.warning("Worker poll failed: %s", e)
+
+            self._wakeup.clear()
+            await self._wait(settings.worker_poll_interval_s)
+
+    async def _wait(self, timeout: Optional[float]):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def start(self):
+        """Run the claim loop in the background (embedded in the API)"""
+        if self._loop_task is None and self.concurrency > 0:
+            self._loop_task = asyncio.create_task(self.run())
+
+    async def stop(self, grace_s: float = 10.0):
+        """Stop claiming, let running jobs finish for `grace_s`, then hand them back"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._loop_task is not None:
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        if self._running:
+            await asyncio.wait(set(self._running), timeout=grace_s)
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": len(self._running),
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+
+async def main(concurrency: int, tasks: Optional[List[str]]):
+    from app.core.compute import compute_executor
+    from app.core.database import supabase_registry
+    from app.core.filecache import file_cache
+    from app.core.http_client import storage_http
+
+    supabase_registry.open()
+    storage_http.open()
+    file_cache.open()
+    compute_executor.open()
+    worker = Worker(concurrency, tasks)
+
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+
+    worker.start()
+    try:
+        await stopped.wait()
+    finally:
+        logger.info("Worker %s stopping", worker.worker_id)
+        await worker.stop(grace_s=get_settings().job_shutdown_grace_s)
+        compute_executor.close()
+        await storage_http.close()
+        supabase_registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="StochastiQdata background job worker")
+    parser.add_argument("--concurrency", type=int, default=get_settings().worker_concurrency)
+    parser.add_argument("--tasks", help="Comma-separated task names (default: all)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # une requête par sondage sinon
+    asyncio.run(main(args.concurrency, args.tasks.split(",") if args.tasks else None))
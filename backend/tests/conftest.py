@@ -0,0 +1,13 @@
+"""
+Configuration commune des tests
+
+Les réglages Supabase obligatoires reçoivent des valeurs factices : aucun
+test ne joint un vrai projet (clients remplacés par des stubs, ou base
+Postgres locale via TEST_DATABASE_URL).
+"""
+import os
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "test-anon-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-jwt-secret")
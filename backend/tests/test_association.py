@@ -0,0 +1,160 @@
+"""Streaming associations against pandas.crosstab and scipy"""
+import math
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats.contingency import association
+from app.analytics.association import MAX_LEVELS, NUMERIC_BINS, AssociationAccumulator
+from app.analytics.correlation import RankAccumulator
+
+ROWS = 20_000
+CHUNKS = 4
+
+
+def _frame(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    region = rng.choice(["nord", "sud", "est", "ouest"], ROWS)
+    # Produit lié à la région, segment indépendant, montant lié au produit
+    product = np.where(rng.random(ROWS) < 0.6, np.char.add("p-", region), rng.choice(["p-a", "p-b", "p-c"], ROWS))
+    df = pd.DataFrame({
+        "region": region,
+        "product": product,
+        "segment": rng.choice(["x", "y"], ROWS),
+        "amount": rng.gamma(2.0, 100.0, ROWS) * (1 + (product == "p-nord")),
+        "age": rng.integers(18, 90, ROWS).astype(float),
+    })
+    df.loc[rng.random(ROWS) < 0.05, "segment"] = None
+    return df
+
+
+def _chunks(df: pd.DataFrame):
+    step = -(-len(df) // CHUNKS)
+    return [df.iloc[i:i + step] for i in range(0, len(df), step)]
+
+
+def _edges(df: pd.DataFrame) -> dict:
+    ranks = RankAccumulator()
+    for chunk in _chunks(df):
+        ranks.update(chunk)
+    return {col: table.bin_edges(NUMERIC_BINS) for col, table in ranks.tables.items()}
+
+
+def _associations(df: pd.DataFrame) -> dict:
+    """Same reduction as associate_path: bin edges, then one accumulator per part, merged"""
+    edges = _edges(df)
+    merged = AssociationAccumulator(edges)
+    for chunk in _chunks(df):
+        part = AssociationAccumulator(edges)
+        part.update(chunk)
+        merged.merge(part)
+    return merged.to_payload()
+
+
+def _pair(payload: dict, x: str, y: str) -> dict:
+    return next(p for p in payload["pairs"] if {p["x"], p["y"]} == {x, y})
+
+
+def _nmi(x: pd.Series, y: pd.Series) -> float:
+    """Mutual information over the arithmetic mean of the entropies, from counts"""
+    n = len(x)
+    joint, px, py = Counter(zip(x, y)), Counter(x), Counter(y)
+    mi = sum(c / n * math.log(c * n / (px[a] * py[b])) for (a, b), c in joint.items())
+    hx = -sum(c / n * math.log(c / n) for c in px.values())
+    hy = -sum(c / n * math.log(c / n) for c in py.values())
+    return mi / ((hx + hy) / 2)
+
+
+def _binned(df: pd.DataFrame, col: str) -> pd.Series:
+    # Bornes supérieures incluses, au-delà de la dernière : dernière classe
+    edges = _edges(df)[col]
+    return pd.cut(df[col], [-np.inf, *edges[:-1], np.inf], labels=False)
+
+
+@pytest.mark.parametrize("x, y", [("region", "product"), ("region", "segment"), ("product", "segment")])
+def test_categorical_pairs_match_crosstab(x, y):
+    df = _frame()
+    pair = _pair(_associations(df), x, y)
+    both = df[[x, y]].dropna()
+    table = pd.crosstab(both[x], both[y]).to_numpy()
+    assert pair["n"] == len(both)
+    assert pair["cramers_v"] == pytest.approx(association(table, method="cramer"), abs=5e-4 + 1e-9)
+    assert pair["nmi"] == pytest.approx(_nmi(both[x], both[y]), abs=5e-4 + 1e-9)
+
+
+def test_numeric_columns_are_binned_by_equal_counts():
+    df = _frame()
+    payload = _associations(df)
+    kinds = {c["name"]: (c["kind"], c["levels"]) for c in payload["columns"]}
+    assert payload["bins"] == NUMERIC_BINS
+    assert kinds["amount"] == ("numeric", NUMERIC_BINS)
+
+    binned = _binned(df, "amount")
+    counts = binned.value_counts()
+    assert len(counts) == NUMERIC_BINS and counts.max() - counts.min() <= ROWS * 0.01
+
+    pair = _pair(payload, "product", "amount")
+    table = pd.crosstab(df["product"], binned).to_numpy()
+    assert pair["cramers_v"] == pytest.approx(association(table, method="cramer"), abs=5e-4 + 1e-9)
+    assert pair["nmi"] == pytest.approx(_nmi(df["product"], binned), abs=5e-4 + 1e-9)
+    # Numérique × numérique : laissé aux corrélations
+    assert not any({p["x"], p["y"]} == {"amount", "age"} for p in payload["pairs"])
+
+
+def test_numeric_column_with_few_values_keeps_one_bin_per_value():
+    df = _frame()
+    df["rating"] = np.random.default_rng(1).integers(1, 6, ROWS).astype(float)
+    kinds = {c["name"]: (c["kind"], c["levels"]) for c in _associations(df)["columns"]}
+    assert kinds["rating"] == ("numeric", 5)
+
+
+def test_columns_over_max_levels_are_excluded():
+    df = _frame()
+    df["client_id"] = [f"c{i}" for i in range(ROWS)]
+    payload = _associations(df)
+    assert payload["excluded"] == ["client_id"]
+    assert "client_id" not in {c["name"] for c in payload["columns"]}
+    assert not any("client_id" in (p["x"], p["y"]) for p in payload["pairs"])
+    assert payload["max_levels"] == MAX_LEVELS
+
+
+def test_levels_split_across_parts_exceed_max_levels_on_merge():
+    # Chaque part reste sous MAX_LEVELS, leur union le dépasse
+    half = MAX_LEVELS // 2 + 10
+    first = pd.DataFrame({"code": [f"a{i}" for i in range(half)], "kind": "x"})
+    second = pd.DataFrame({"code": [f"b{i}" for i in range(half)], "kind": "y"})
+    merged = AssociationAccumulator()
+    for df in (first, second):
+        part = AssociationAccumulator()
+        part.update(df)
+        assert not part.excluded
+        merged.merge(part)
+    payload = merged.to_payload()
+    assert payload["excluded"] == ["code"] and payload["pairs"] == []
+
+
+def test_merge_realigns_levels_seen_in_a_different_order():
+    df = _frame()
+    edges = _edges(df)
+    # Parts triées différemment : les codes des niveaux diffèrent d'une part à l'autre
+    parts = [df.iloc[:ROWS // 2].sort_values("product"), df.iloc[ROWS // 2:].sort_values("product", ascending=False)]
+    merged = AssociationAccumulator(edges)
+    for chunk in parts:
+        part = AssociationAccumulator(edges)
+        part.update(chunk)
+        merged.merge(part)
+    single = AssociationAccumulator(edges)
+    single.update(df)
+
+    result, expected = merged.to_payload(), single.to_payload()
+    assert result["columns"] == expected["columns"]
+    key = lambda p: (p["x"], p["y"])
+    assert sorted(result["pairs"], key=key) == sorted(expected["pairs"], key=key)
+
+
+def test_merge_rejects_different_columns():
+    first, second = AssociationAccumulator(), AssociationAccumulator()
+    first.update(pd.DataFrame({"a": ["x"], "b": ["y"]}))
+    second.update(pd.DataFrame({"a": ["x"], "c": ["y"]}))
+    with pytest.raises(ValueError):
+        first.merge(second)
@@ -0,0 +1,72 @@
+"""Run-time limits of the compute pool"""
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from app.core.compute import ComputeExecutor
+from app.core.config import get_settings
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setenv("COMPUTE_WORKERS", "1")
+    get_settings.cache_clear()
+    executor = ComputeExecutor()
+    executor.open()
+    asyncio.run(executor.run(abs, 0))  # worker démarré
+    yield executor
+    executor.close()
+    get_settings.cache_clear()
+
+
+def test_timeout_excludes_queue_wait(executor):
+    async def scenario():
+        slow = executor.run(time.sleep, 1.0, timeout=0.5)
+        queued = executor.run(time.sleep, 0.3, timeout=0.5)
+        return await asyncio.gather(slow, queued, return_exceptions=True)
+
+    slow, queued = asyncio.run(scenario())
+    # La seconde tâche a attendu 0,5 s le seul worker puis tourné 0,3 s : pas de 504
+    assert isinstance(slow, HTTPException) and slow.status_code == 504
+    assert queued is None
+    assert executor.timeouts == 1
+
+
+def test_timeout_frees_the_worker(executor):
+    async def scenario():
+        started = time.perf_counter()
+        with pytest.raises(HTTPException) as error:
+            await executor.run(time.sleep, 30, timeout=0.3)
+        assert error.value.status_code == 504
+        assert await executor.run(abs, -1) == 1
+        return time.perf_counter() - started
+
+    # Le worker a été interrompu : la tâche suivante ne l'attend pas 30 s
+    assert asyncio.run(scenario()) < 5
+    assert executor.queued == 0
+    assert executor.failed == 0
+
+
+def test_full_queue_rejects_with_retry_after_then_frees_slots(executor, monkeypatch):
+    monkeypatch.setenv("COMPUTE_MAX_QUEUE", "2")
+    get_settings.cache_clear()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(time.sleep, 0.5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert executor.queued == 2
+        with pytest.raises(HTTPException) as single:
+            await executor.run(abs, -1)
+        with pytest.raises(HTTPException) as batch:
+            await executor.map(abs, [(-1,), (-2,)])
+        await asyncio.gather(*running)
+        # Places rendues à la fin des tâches : le lot entier passe
+        return single.value, batch.value, await executor.map(abs, [(-1,), (-2,)])
+
+    single, batch, results = asyncio.run(scenario())
+    for error in (single, batch):
+        assert error.status_code == 503
+        assert int(error.headers["Retry-After"]) >= 1
+    assert results == [1, 2]
+    assert executor.queued == 0
+    assert executor.rejected == 2
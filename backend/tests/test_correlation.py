@@ -0,0 +1,79 @@
+"""Streaming correlations against DataFrame.corr"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.analytics.correlation import RANK_LEVELS, CorrelationAccumulator, RankAccumulator, correlation_view
+
+ROWS = 30_000
+CHUNKS = 4
+
+
+def _frame(nan_fraction: float = 0.0, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=ROWS)
+    df = pd.DataFrame({
+        "a": base,
+        "b": base * 0.5 + rng.normal(size=ROWS),
+        "c": np.exp(base) + rng.normal(scale=0.1, size=ROWS),
+        "d": rng.integers(0, 5, ROWS).astype(float),
+        "e": rng.normal(size=ROWS),
+    })
+    if nan_fraction:
+        df = df.mask(rng.random(df.shape) < nan_fraction)
+    return df
+
+
+def _chunks(df: pd.DataFrame):
+    step = -(-len(df) // CHUNKS)
+    return [df.iloc[i:i + step] for i in range(0, len(df), step)]
+
+
+def _correlations(df: pd.DataFrame, method: str) -> pd.DataFrame:
+    """Same reduction as correlate_path: one accumulator per part, merged"""
+    ranks = None
+    if method == "spearman":
+        tables = RankAccumulator()
+        for chunk in _chunks(df):
+            part = RankAccumulator()
+            part.update(chunk)
+            tables.merge(part)
+        ranks = tables.tables
+    merged = CorrelationAccumulator(ranks)
+    for chunk in _chunks(df):
+        part = CorrelationAccumulator(ranks)
+        part.update(chunk)
+        merged.merge(part)
+    view = correlation_view(merged.to_payload(method))
+    return pd.DataFrame(view["matrix"], index=view["columns"], columns=view["columns"], dtype=float)
+
+
+def _assert_close(result: pd.DataFrame, expected: pd.DataFrame, tolerance: float = 5e-4):
+    # Coefficients rangés au millième : écart d'arrondi au plus 5e-4
+    assert list(result.columns) == list(expected.columns)
+    assert np.abs(result.to_numpy() - expected.to_numpy()).max() <= tolerance + 1e-9
+
+
+@pytest.mark.parametrize("nan_fraction", [0.0, 0.1])
+def test_pearson_matches_pandas(nan_fraction):
+    df = _frame(nan_fraction)
+    _assert_close(_correlations(df, "pearson"), df.corr())
+
+
+def test_spearman_matches_pandas_without_missing_values():
+    df = _frame().round(1)  # moins de RANK_LEVELS valeurs : rangs exacts, ex-aequo compris
+    _assert_close(_correlations(df, "spearman"), df.corr(method="spearman"))
+
+
+def test_spearman_with_missing_values_ranks_each_column_once():
+    # Écart documenté : rangs sur toutes les valeurs renseignées de chaque
+    # colonne, puis Pearson par paires complètes (pandas reclasse chaque paire)
+    df = _frame(0.1)
+    result = _correlations(df, "spearman")
+    _assert_close(result, df.rank().corr())
+    assert np.abs(result.to_numpy() - df.corr(method="spearman").to_numpy()).max() < 0.01
+
+
+def test_spearman_with_interpolated_ranks():
+    df = _frame()
+    assert df["a"].nunique() > RANK_LEVELS
+    _assert_close(_correlations(df, "spearman"), df.corr(method="spearman"), tolerance=2e-3)
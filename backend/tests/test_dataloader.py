@@ -0,0 +1,82 @@
+"""Batched point lookups (app/core/dataloader.py)"""
+import asyncio
+import uuid
+from types import SimpleNamespace
+import pytest
+from app.core import dataloader
+from app.core.dataloader import DataLoaders
+
+IDS = [str(uuid.uuid4()) for _ in range(3)]
+
+
+class InQuery:
+    """Records the in_() filters it receives and returns the matching rows"""
+
+    def __init__(self, rows, queries, error=None):
+        self.rows, self.queries, self.error = rows, queries, error
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def in_(self, key, values):
+        self.queries.append((key, list(values)))
+        self.values = set(values)
+        return self
+
+    def execute(self):
+        if self.error:
+            raise self.error
+        return SimpleNamespace(data=[r for r in self.rows if r["id"] in self.values])
+
+
+@pytest.fixture
+def database(monkeypatch):
+    monkeypatch.setattr(dataloader, "_schedulers", {})
+    queries = []
+
+    def install(rows=(), error=None):
+        monkeypatch.setattr(dataloader, "get_supabase_client", lambda: InQuery(list(rows), queries, error))
+        return queries
+
+    return install
+
+
+def test_loads_in_one_window_share_one_query(database):
+    queries = database([{"id": i, "name": f"d{n}"} for n, i in enumerate(IDS)])
+
+    async def scenario():
+        # Deux requêtes HTTP distinctes (deux DataLoaders) dans la même fenêtre
+        first, second = DataLoaders(), DataLoaders()
+        return await asyncio.gather(first.load("datasets", IDS[0]), first.load("datasets", IDS[1]), second.load("datasets", IDS[2]))
+
+    rows = asyncio.run(scenario())
+    assert [r["id"] for r in rows] == IDS
+    assert len(queries) == 1
+    assert queries[0][0] == "id" and sorted(queries[0][1]) == sorted(IDS)
+
+
+def test_unknown_and_malformed_keys_resolve_to_none(database):
+    queries = database([{"id": IDS[0]}])
+
+    async def scenario():
+        loaders = DataLoaders()
+        return await asyncio.gather(loaders.load("datasets", IDS[0]), loaders.load("datasets", IDS[1]), loaders.load("datasets", "not-a-uuid"))
+
+    found, unknown, malformed = asyncio.run(scenario())
+    assert found == {"id": IDS[0]} and unknown is None and malformed is None
+    # La clé malformée n'atteint pas la requête groupée
+    assert "not-a-uuid" not in queries[0][1]
+
+
+def test_failed_fetch_reaches_every_waiter(database):
+    database(error=RuntimeError("database down"))
+
+    async def scenario():
+        loaders = DataLoaders()
+        return await asyncio.gather(*(loaders.load("datasets", i) for i in IDS), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) and str(r) == "database down" for r in results)
@@ -0,0 +1,126 @@
+"""Pagination of GET /api/v1/datasets"""
+import uuid
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from app.api import datasets
+from app.main import app
+
+
+class PageQuery:
+    """PostgREST query builder returning a fixed page of rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows, count=len(self.rows))
+
+
+def _list(monkeypatch, **params):
+    rows = [{"id": str(uuid.uuid4()), "name": f"d{i}", "created_at": f"2024-01-0{i + 1}T00:00:00"} for i in range(3)]
+    monkeypatch.setattr(datasets, "get_supabase_client", lambda: PageQuery(rows))
+    response = TestClient(app).get("/api/v1/datasets", params={"page_size": 2, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_next_cursor_on_keyset_sorts(monkeypatch):
+    body = _list(monkeypatch, sort_by="created_at")
+    assert len(body["datasets"]) == 2
+    assert body["next_cursor"]
+
+
+def test_no_cursor_for_relevance(monkeypatch):
+    # La pertinence ne se pagine qu'avec `page` : un curseur serait refusé (400)
+    body = _list(monkeypatch, search="auto")
+    assert len(body["datasets"]) == 2
+    assert body["next_cursor"] is None
+
+
+class KeysetQuery(PageQuery):
+    """Applies the order(), or_() and limit() calls of a keyset page to in-memory rows"""
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.orders, self.filter, self.size = [], None, len(rows)
+
+    def order(self, column, desc=False, nullsfirst=None):
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def or_(self, condition):
+        self.filter = condition
+        return self
+
+    def limit(self, size):
+        self.size = size
+        return self
+
+    @staticmethod
+    def _split(condition):
+        terms, depth, start = [], 0, 0
+        for i, char in enumerate(condition):
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            if char == "," and depth == 0:
+                terms.append(condition[start:i])
+                start = i + 1
+        return terms + [condition[start:]]
+
+    def _match(self, row, term):
+        if term.startswith("and("):
+            return all(self._match(row, t) for t in self._split(term[4:-1]))
+        column, rest = term.split(".", 1)
+        value = row[column]
+        if rest in ("is.null", "not.is.null"):
+            return (value is None) == (rest == "is.null")
+        op, operand = rest.split(".", 1)
+        if value is None:
+            return False
+        operand = type(value)(operand.strip('"'))
+        return {"lt": value < operand, "gt": value > operand, "eq": value == operand}[op]
+
+    def execute(self):
+        rows = [r for r in self.rows if self.filter is None or any(self._match(r, t) for t in self._split(self.filter))]
+        for column, desc, nullsfirst in reversed(self.orders):
+            present = sorted((r for r in rows if r[column] is not None), key=lambda r: r[column], reverse=desc)
+            nulls = [r for r in rows if r[column] is None]
+            rows = nulls + present if nullsfirst else present + nulls
+        return SimpleNamespace(data=rows[:self.size], count=len(self.rows))
+
+
+def _walk(monkeypatch, rows, **params):
+    queries = []
+
+    def client():
+        queries.append(KeysetQuery(rows))
+        return queries[-1]
+
+    monkeypatch.setattr(datasets, "get_supabase_client", client)
+    http = TestClient(app)
+    seen, cursor = [], None
+    while True:
+        page = {"page_size": 2, "count": "none", **params, **({"cursor": cursor} if cursor else {})}
+        response = http.get("/api/v1/datasets", params=page)
+        assert response.status_code == 200
+        body = response.json()
+        seen += [d["id"] for d in body["datasets"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def test_cursor_walks_across_ties_and_nulls(monkeypatch):
+    scores = [4.5, 3.0, 3.0, 3.0, None, None, None, 2.0, 1.5]
+    rows = [{"id": str(uuid.uuid4()), "name": f"d{i}", "global_score": s} for i, s in enumerate(scores)]
+    present = [r for r in rows if r["global_score"] is not None]
+    nulls = sorted((r for r in rows if r["global_score"] is None), key=lambda r: r["id"])
+
+    # Ordre Postgres par défaut : NULL en fin en croissant, en tête en décroissant
+    ascending = sorted(present, key=lambda r: (r["global_score"], r["id"])) + nulls
+    descending = list(reversed(ascending))
+    for order, expected in (("asc", ascending), ("desc", descending)):
+        seen = _walk(monkeypatch, rows, sort_by="global_score", sort_order=order)
+        assert seen == [r["id"] for r in expected], order
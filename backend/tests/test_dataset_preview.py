@@ -0,0 +1,39 @@
+"""GET /api/v1/datasets/{id}/preview when storage fails"""
+from types import SimpleNamespace
+import httpx
+from fastapi.testclient import TestClient
+from app.api import datasets
+from app.main import app
+
+DATASET = {"file_url": "http://storage.test/files/data.csv", "file_hash": "abc", "sidecar_url": None}
+
+
+class RowQuery:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=DATASET)
+
+
+def test_storage_error_is_502_and_not_stored(monkeypatch):
+    saved = []
+
+    async def get(url, **kwargs):
+        return httpx.Response(503, content=b"<html>maintenance</html>", request=httpx.Request("GET", url))
+
+    async def load_analysis(file_hash, analysis):
+        return None
+
+    async def save_analysis(file_hash, analysis, payload):
+        saved.append(analysis)
+
+    monkeypatch.setattr(datasets, "get_supabase_client", lambda: RowQuery())
+    monkeypatch.setattr(datasets.storage_http, "get", get)
+    monkeypatch.setattr(datasets, "load_analysis", load_analysis)
+    monkeypatch.setattr(datasets, "save_analysis", save_analysis)
+    monkeypatch.setattr(datasets, "coalesce", lambda key, fn, wait: fn())
+
+    response = TestClient(app).get("/api/v1/datasets/11111111-1111-1111-1111-111111111111/preview")
+    assert response.status_code == 502
+    assert saved == []
@@ -0,0 +1,42 @@
+"""
+Supabase calls run on the DB thread pool
+
+supabase-py est synchrone : des requêtes simultanées ne doivent pas se
+sérialiser sur la boucle d'événements.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+import httpx
+from app.api import datasets
+from app.main import app
+
+SLEEP_S = 0.3
+REQUESTS = 8
+
+
+class SlowQuery:
+    """PostgREST query builder whose execute() blocks like a slow database"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(SLEEP_S)
+        return SimpleNamespace(data=[], count=0)
+
+
+async def _list_concurrently() -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get("/api/v1/datasets") for _ in range(REQUESTS)))
+        elapsed = time.perf_counter() - started
+    assert all(r.status_code == 200 for r in responses)
+    return elapsed
+
+
+def test_concurrent_requests_overlap(monkeypatch):
+    monkeypatch.setattr(datasets, "get_supabase_client", lambda: SlowQuery())
+    elapsed = asyncio.run(_list_concurrently())
+    # Sérialisé : REQUESTS * SLEEP_S (2,4 s) ; en parallèle : environ un seul SLEEP_S
+    assert elapsed < 2 * SLEEP_S
@@ -0,0 +1,186 @@
+"""
+Job queue functions of supabase/schema.sql, on a real Postgres
+
+Lancés seulement si TEST_DATABASE_URL pointe vers une base jetable
+(ex. postgresql://postgres@localhost/test) : la section `jobs` du schéma y
+est chargée dans un schéma dédié, supprimé à la fin.
+"""
+import os
+import uuid
+from pathlib import Path
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+SCHEMA_SQL = Path(__file__).resolve().parents[2] / "supabase" / "schema.sql"
+
+
+def _jobs_section() -> str:
+    sql = SCHEMA_SQL.read_text(encoding="utf-8")
+    start = sql.index("CREATE TYPE job_status")
+    end = sql.index("-- ====", start)
+    return sql[start:end]
+
+
+@pytest.fixture
+def connect():
+    schema = f"jobs_test_{uuid.uuid4().hex[:8]}"
+    admin = psycopg.connect(DATABASE_URL, autocommit=True)
+    admin.execute(f"CREATE SCHEMA {schema}")
+    connections = []
+
+    def open_connection():
+        conn = psycopg.connect(DATABASE_URL, autocommit=True, options=f"-c search_path={schema},public")
+        connections.append(conn)
+        return conn
+
+    # Rôles de Supabase, visés par les REVOKE/GRANT du schéma (communs à toute l'instance)
+    admin.execute("""
+        DO $$ BEGIN
+            CREATE ROLE anon NOLOGIN;
+            CREATE ROLE authenticated NOLOGIN;
+            CREATE ROLE service_role NOLOGIN;
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$
+    """)
+    setup = open_connection()
+    setup.execute("""
+        DO $$ BEGIN
+            IF to_regproc('uuid_generate_v4') IS NULL THEN
+                CREATE FUNCTION uuid_generate_v4() RETURNS uuid LANGUAGE sql AS 'SELECT gen_random_uuid()';
+            END IF;
+        END $$
+    """)
+    setup.execute(_jobs_section())
+    yield open_connection
+
+    for conn in connections:
+        conn.close()
+    admin.execute(f"DROP SCHEMA {schema} CASCADE")
+    admin.close()
+
+
+def _enqueue(conn, key=None, priority=0, max_attempts=5) -> dict:
+    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
+    return cur.execute(
+        "SELECT * FROM enqueue_job('test', '{}'::jsonb, %s, %s, %s)", (key, priority, max_attempts),
+    ).fetchone()
+
+
+def _claim(conn, worker: str, limit: int = 1) -> list:
+    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
+    return cur.execute("SELECT * FROM claim_jobs(%s, %s)", (worker, limit)).fetchall()
+
+
+def _job(conn, job_id) -> dict:
+    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
+    return cur.execute("SELECT * FROM jobs WHERE id = %s", (job_id,)).fetchone()
+
+
+def test_claims_skip_locked_rows(connect):
+    a, b = connect(), connect()
+    ids = {_enqueue(a)["id"] for _ in range(3)}
+
+    b.execute("SET lock_timeout = '2s'")  # un verrou attendu ferait échouer le test
+    with a.transaction():
+        first = _claim(a, "worker-a", 2)
+        # Les lignes réservées par A (transaction ouverte) sont sautées, pas attendues
+        second = _claim(b, "worker-b", 3)
+    assert len(first) == 2 and len(second) == 1
+    assert {j["id"] for j in first + second} == ids
+    assert _claim(b, "worker-b", 3) == []
+
+
+def test_claims_by_priority(connect):
+    conn = connect()
+    low = _enqueue(conn, priority=0)
+    high = _enqueue(conn, priority=10)
+    assert [j["id"] for j in _claim(conn, "w", 2)] == [high["id"], low["id"]]
+
+
+def test_idempotency_key_deduplicates_active_jobs(connect):
+    conn = connect()
+    first = _enqueue(conn, key="k", priority=1)
+    again = _enqueue(conn, key="k", priority=5)
+    assert again["id"] == first["id"]
+    assert again["priority"] == 5
+
+    [claimed] = _claim(conn, "w")
+    assert _enqueue(conn, key="k")["id"] == first["id"]  # en cours : toujours dédupliquée
+    assert conn.execute("SELECT complete_job(%s, 'w', NULL)", (claimed["id"],)).fetchone()[0]
+    # Terminée : la même clé peut de nouveau être inscrite
+    assert _enqueue(conn, key="k")["id"] != first["id"]
+
+
+def test_retry_until_max_attempts(connect):
+    conn = connect()
+    job = _enqueue(conn, max_attempts=2)
+
+    _claim(conn, "w")
+    conn.execute("SELECT fail_job(%s, 'w', 'boom', 0)", (job["id"],))
+    retried = _job(conn, job["id"])
+    assert (retried["status"], retried["attempts"], retried["last_error"]) == ("queued", 1, "boom")
+
+    _claim(conn, "w")
+    conn.execute("SELECT fail_job(%s, 'w', 'boom again', 0)", (job["id"],))
+    failed = _job(conn, job["id"])
+    assert (failed["status"], failed["attempts"]) == ("failed", 2)
+    assert failed["finished_at"] is not None
+
+
+def test_permanent_failure_is_not_retried(connect):
+    conn = connect()
+    job = _enqueue(conn)
+    _claim(conn, "w")
+    conn.execute("SELECT fail_job(%s, 'w', 'bad input', NULL)", (job["id"],))
+    assert _job(conn, job["id"])["status"] == "failed"
+
+
+def test_stale_heartbeat_requeues_the_job(connect):
+    conn = connect()
+    stale, alive = _enqueue(conn), _enqueue(conn)
+    _claim(conn, "lost", 2)
+    conn.execute("UPDATE jobs SET locked_at = NOW() - INTERVAL '5 minutes' WHERE id = %s", (stale["id"],))
+
+    assert conn.execute("SELECT requeue_stale_jobs(60)").fetchone()[0] == 1
+    requeued = _job(conn, stale["id"])
+    assert (requeued["status"], requeued["locked_by"]) == ("queued", None)
+    assert requeued["last_error"] == "Worker lost (no heartbeat)"
+    assert _job(conn, alive["id"])["status"] == "running"
+
+    # L'ancien worker a perdu la tâche : ni signe de vie ni résultat acceptés
+    assert conn.execute("SELECT update_job_progress(%s, 'lost', 0.5)", (stale["id"],)).fetchone()[0] is False
+    assert conn.execute("SELECT complete_job(%s, 'lost', NULL)", (stale["id"],)).fetchone()[0] is False
+    [reclaimed] = _claim(conn, "new")
+    assert reclaimed["id"] == stale["id"] and reclaimed["attempts"] == 2
+
+
+def test_heartbeat_keeps_the_job(connect):
+    conn = connect()
+    job = _enqueue(conn)
+    _claim(conn, "w")
+    conn.execute("UPDATE jobs SET locked_at = NOW() - INTERVAL '5 minutes' WHERE id = %s", (job["id"],))
+    assert conn.execute("SELECT update_job_progress(%s, 'w', 0.5, 'halfway')", (job["id"],)).fetchone()[0] is True
+    assert conn.execute("SELECT requeue_stale_jobs(60)").fetchone()[0] == 0
+    assert _job(conn, job["id"])["progress"] == 0.5
+
+
+def test_queue_functions_are_reserved_to_the_service(connect):
+    conn = connect()
+    signatures = [
+        "enqueue_job(varchar, jsonb, varchar, integer, integer, double precision)",
+        "claim_jobs(varchar, integer, varchar[])",
+        "update_job_progress(uuid, varchar, real, text)",
+        "complete_job(uuid, varchar, jsonb)",
+        "fail_job(uuid, varchar, text, double precision)",
+        "requeue_stale_jobs(double precision)",
+    ]
+    for signature in signatures:
+        allowed = conn.execute(
+            "SELECT has_function_privilege('anon', %s, 'EXECUTE'), has_function_privilege('authenticated', %s, 'EXECUTE'),"
+            " has_function_privilege('service_role', %s, 'EXECUTE')",
+            (signature,) * 3,
+        ).fetchone()
+        assert allowed == (False, False, True), signature
@@ -0,0 +1,64 @@
+"""GET /api/v1/jobs/{id}: job details are for the dataset creator only"""
+import time
+from types import SimpleNamespace
+import jwt
+from fastapi.testclient import TestClient
+from app.api import jobs
+from app.core.config import get_settings
+from app.main import app
+
+JOB_ID = "22222222-2222-2222-2222-222222222222"
+JOB = {
+    "id": JOB_ID,
+    "task": "dataset_analytics",
+    "status": "failed",
+    "payload": {"dataset_id": "11111111-1111-1111-1111-111111111111", "file_url": "http://storage/private.csv"},
+    "attempts": 5,
+    "max_attempts": 5,
+    "last_error": "FileNotFoundError: /tmp/cache/ab12.csv",
+    "result": {"rows": 10},
+    "created_at": "2024-01-01T00:00:00Z",
+}
+
+
+class CreatorQuery:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=[{"created_by": "owner"}])
+
+
+def _token(user_id: str) -> str:
+    claims = {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 60}
+    return jwt.encode(claims, get_settings().supabase_jwt_secret, algorithm="HS256")
+
+
+def _get(monkeypatch, user_id=None) -> dict:
+    async def get_job(job_id):
+        return dict(JOB)
+
+    monkeypatch.setattr(jobs, "get_job", get_job)
+    monkeypatch.setattr(jobs, "get_supabase_client", lambda: CreatorQuery())
+    headers = {"Authorization": f"Bearer {_token(user_id)}"} if user_id else {}
+    response = TestClient(app).get(f"/api/v1/jobs/{JOB_ID}", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "failed" and "payload" not in body
+    return body
+
+
+def test_anonymous_sees_status_only(monkeypatch):
+    body = _get(monkeypatch)
+    assert body["last_error"] is None and body["result"] is None
+
+
+def test_other_user_sees_status_only(monkeypatch):
+    body = _get(monkeypatch, "someone-else")
+    assert body["last_error"] is None and body["result"] is None
+
+
+def test_creator_sees_details(monkeypatch):
+    body = _get(monkeypatch, "owner")
+    assert body["last_error"] == JOB["last_error"]
+    assert body["result"] == JOB["result"]
@@ -0,0 +1,31 @@
+"""Access to GET /metrics"""
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import get_settings
+from app.main import app
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    def configure(token):
+        monkeypatch.setenv("METRICS_TOKEN", token)
+        get_settings.cache_clear()
+
+    yield configure
+    get_settings.cache_clear()
+
+
+def test_metrics_hidden_without_configured_token(metrics_token):
+    metrics_token("")
+    assert TestClient(app).get("/metrics").status_code == 404
+
+
+def test_metrics_require_the_token(metrics_token):
+    metrics_token("scraper-secret")
+    http = TestClient(app)
+    assert http.get("/metrics").status_code == 401
+    assert http.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = http.get("/metrics", headers={"Authorization": "Bearer scraper-secret"})
+    assert response.status_code == 200
+    assert {"supabase", "compute", "worker"} <= set(response.json())
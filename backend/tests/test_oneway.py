@@ -0,0 +1,85 @@
+"""One-way cube against a pandas groupby"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import poisson
+from app.analytics.oneway import CONFIDENCE, OneWayAccumulator, poisson_interval
+
+ROWS = 20_000
+CHUNKS = 4
+
+
+@pytest.fixture(scope="module")
+def policies() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    exposure = rng.uniform(0.1, 1.0, ROWS)
+    region = rng.choice(["nord", "sud", "est", "ouest"], ROWS)
+    power = rng.integers(4, 10, ROWS)
+    claims = rng.poisson(exposure * np.where(region == "sud", 0.15, 0.08))
+    df = pd.DataFrame({
+        "Region": region,
+        "VehPower": power,
+        "Exposure": exposure,
+        "ClaimNb": claims,
+        "ClaimAmount": claims * rng.gamma(2.0, 800.0, ROWS),
+    })
+    df.loc[rng.random(ROWS) < 0.05, "Region"] = None
+    return df
+
+
+def _cube(df: pd.DataFrame) -> dict:
+    """Same reduction as oneway_path: one accumulator per part, merged"""
+    step = -(-len(df) // CHUNKS)
+    merged = OneWayAccumulator("ClaimNb", "Exposure", "ClaimAmount")
+    for start in range(0, len(df), step):
+        part = OneWayAccumulator("ClaimNb", "Exposure", "ClaimAmount")
+        part.update(df.iloc[start:start + step])
+        merged.merge(part)
+    return merged.to_payload()
+
+
+def _levels(cube: dict, name: str) -> dict:
+    [factor] = [f for f in cube["factors"] if f["name"] == name]
+    return {level["level"]: level for level in factor["levels"]}
+
+
+def _expected(df: pd.DataFrame, factor: str) -> pd.DataFrame:
+    grouped = df.groupby(factor, dropna=False).agg(
+        rows=("ClaimNb", "size"), exposure=("Exposure", "sum"), claims=("ClaimNb", "sum"), amount=("ClaimAmount", "sum"),
+    )
+    grouped["frequency"] = grouped["claims"] / grouped["exposure"]
+    grouped["severity"] = grouped["amount"] / grouped["claims"]
+    return grouped
+
+
+@pytest.mark.parametrize("factor", ["Region", "VehPower"])
+def test_levels_match_groupby(policies, factor):
+    levels = _levels(_cube(policies), factor)
+    expected = _expected(policies, factor)
+    assert len(levels) == len(expected)
+    for key, row in expected.iterrows():
+        level = levels[None if pd.isna(key) else (str(key) if factor == "Region" else float(key))]
+        assert level["rows"] == row["rows"]
+        assert level["exposure"] == pytest.approx(row["exposure"], abs=0.01)
+        assert level["claims"] == pytest.approx(row["claims"])
+        assert level["frequency"] == pytest.approx(row["frequency"], abs=1e-6)
+        assert level["severity"] == pytest.approx(row["severity"], abs=0.01)
+        low, high = poisson_interval(np.array([row["claims"]]))
+        assert level["ci_low"] == pytest.approx(low[0] / row["exposure"], abs=1e-6)
+        assert level["ci_high"] == pytest.approx(high[0] / row["exposure"], abs=1e-6)
+
+
+def test_totals(policies):
+    totals = _cube(policies)["totals"]
+    assert totals["rows"] == ROWS
+    assert totals["frequency"] == pytest.approx(policies["ClaimNb"].sum() / policies["Exposure"].sum(), abs=1e-6)
+
+
+def test_poisson_interval_is_exact():
+    counts = np.array([0, 1, 5, 40])
+    low, high = poisson_interval(counts)
+    tail = (1 - CONFIDENCE) / 2
+    # Bornes de Garwood : P(X >= k | low) = P(X <= k | high) = alpha / 2
+    assert low[0] == 0
+    np.testing.assert_allclose(poisson.sf(counts[1:] - 1, low[1:]), tail, rtol=1e-6)
+    np.testing.assert_allclose(poisson.cdf(counts, high), tail, rtol=1e-6)
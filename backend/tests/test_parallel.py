@@ -0,0 +1,22 @@
+"""Routing of file parts to compute pool processes"""
+from app.analytics.parallel import part_routes
+
+
+def _parquet(row_groups, columns):
+    return {"kind": "parquet", "row_groups": row_groups, "columns": columns}
+
+
+def test_same_rows_same_process_across_analyses():
+    profile = [_parquet([0, 1], ["a", "b", "c"]), _parquet([2, 3], ["a", "b", "c"])]
+    correlations = [_parquet([0, 1], ["a", "b"]), _parquet([2, 3], ["a", "b"])]
+    assert part_routes(profile, "file") == part_routes(correlations, "file")
+
+
+def test_row_blocks_spread_over_processes():
+    parts = [{"kind": "csv_range", "start": s, "end": s + 10, "names": ["a"]} for s in range(0, 40, 10)]
+    assert len({r % 4 for r in part_routes(parts, "file")}) == 4
+
+
+def test_column_blocks_of_one_row_block_spread():
+    parts = [_parquet([0], ["a"]), _parquet([0], ["b"]), _parquet([0], ["c"])]
+    assert len({r % 3 for r in part_routes(parts, "file")}) == 3
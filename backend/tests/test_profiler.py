@@ -0,0 +1,86 @@
+"""Streaming profile against the pandas computation it replaced"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.analytics.profiler import profile_frames
+from app.analytics.sketches import QuantileSketch
+
+ROWS = 200_000
+CHUNKS = 7
+
+
+def _profile(values: np.ndarray) -> dict:
+    df = pd.DataFrame({"x": values})
+    step = -(-len(df) // CHUNKS)
+    [stat] = profile_frames(df.iloc[i:i + step] for i in range(0, len(df), step))["columns"]
+    return stat
+
+
+def _check_quantiles(stat: dict, values: np.ndarray):
+    # Erreur de rang < 1 % : la valeur rendue est encadrée par les quantiles q ± 1 %
+    for key, q in (("p25", 0.25), ("p50", 0.50), ("p75", 0.75)):
+        low, high = np.quantile(values, [q - 0.01, q + 0.01])
+        assert low - 1e-4 <= stat[key] <= high + 1e-4
+
+
+def _check_moments(stat: dict, values: np.ndarray):
+    s = pd.Series(values)
+    for key, expected in (("mean", s.mean()), ("std", s.std()), ("min", s.min()), ("max", s.max())):
+        assert stat[key] == pytest.approx(round(expected, 4), abs=1e-4)
+
+
+def _pandas_histogram(values: np.ndarray, stat: dict) -> np.ndarray:
+    n_bins = len(stat["histogram"]["counts"])
+    return np.histogram(values, bins=np.linspace(values.min(), values.max(), n_bins + 1))[0]
+
+
+def test_continuous_values():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(0, 1, ROWS - 20_000), rng.normal(50, 5, 20_000)])
+    stat = _profile(values)
+
+    _check_moments(stat, values)
+    _check_quantiles(stat, values)
+    assert stat["unique"] == pytest.approx(len(np.unique(values)), rel=0.03)
+    counts = np.array(stat["histogram"]["counts"])
+    assert counts.sum() == ROWS
+    assert np.abs(counts - _pandas_histogram(values, stat)).max() <= 0.01 * ROWS
+
+
+def test_integer_values():
+    rng = np.random.default_rng(1)
+    values = np.minimum(rng.geometric(0.005, ROWS), 2000).astype(np.int64)
+    stat = _profile(values)
+
+    _check_moments(stat, values.astype(np.float64))
+    _check_quantiles(stat, values)
+    assert stat["unique"] == len(np.unique(values))
+    # Moins de 2048 valeurs distinctes : histogramme exact, même quand une
+    # case fine (largeur 2) chevauche une borne
+    assert stat["histogram"]["counts"] == _pandas_histogram(values, stat).tolist()
+
+
+def test_many_integer_values():
+    rng = np.random.default_rng(2)
+    values = rng.integers(0, 50_000, ROWS)
+    stat = _profile(values)
+
+    _check_moments(stat, values.astype(np.float64))
+    _check_quantiles(stat, values)
+    assert stat["unique"] == pytest.approx(len(np.unique(values)), rel=0.03)
+    counts = np.array(stat["histogram"]["counts"])
+    assert np.abs(counts - _pandas_histogram(values, stat)).max() <= 0.01 * ROWS
+
+
+def test_quantiles_interpolate_after_compaction():
+    # Valeurs retenues de poids 2 (un compactage) : [0, 0, 10, 10] pour pandas
+    sketch = QuantileSketch()
+    sketch.levels, sketch.n = [np.empty(0), np.array([0.0, 10.0])], 4
+    assert sketch.quantiles([0.5]) == [pd.Series([0.0, 0.0, 10.0, 10.0]).median()]
+
+
+def test_quantiles_match_pandas_before_compaction():
+    values = np.random.default_rng(3).normal(size=300)
+    stat = _profile(values)
+    expected = pd.Series(values).quantile([0.25, 0.5, 0.75]).round(4).tolist()
+    assert [stat["p25"], stat["p50"], stat["p75"]] == expected
@@ -0,0 +1,44 @@
+"""Analytics leases held across replicas"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.core import singleflight
+from app.core.config import get_settings
+
+
+@pytest.fixture
+def rpc_calls(monkeypatch):
+    monkeypatch.setenv("ANALYTICS_LEASE_TTL_S", "0.3")
+    get_settings.cache_clear()
+    calls = []
+
+    async def rpc(client, fn, params, errors=None):
+        calls.append((fn, params["p_key"]))
+        return SimpleNamespace(data=True)
+
+    monkeypatch.setattr(singleflight, "rpc", rpc)
+    monkeypatch.setattr(singleflight, "get_supabase_admin_client", lambda: None)
+    yield calls
+    get_settings.cache_clear()
+
+
+def test_leases_are_renewed_while_held(rpc_calls):
+    async def hold():
+        async with singleflight.hold_leases(["stats:abc"]) as held:
+            assert held == ["stats:abc"]
+            await asyncio.sleep(0.35)  # plus long que le TTL
+
+    asyncio.run(hold())
+    calls = [fn for fn, _ in rpc_calls]
+    assert calls[0] == "acquire_analytics_lease" and calls[-1] == "release_analytics_lease"
+    assert calls.count("renew_analytics_lease") >= 2
+
+
+def test_renewal_stops_with_the_block(rpc_calls):
+    async def hold():
+        async with singleflight.hold_leases(["stats:abc"]):
+            pass
+        await asyncio.sleep(0.25)
+
+    asyncio.run(hold())
+    assert "renew_analytics_lease" not in [fn for fn, _ in rpc_calls]
@@ -213,6 +213,7 @@ app.get('/datasets', async (req, res) => {
     params.append('page_size', '12');
     params.append('sort_by', sortBy);
     params.append('sort_order', 'desc');
+    params.append('count', 'estimated');
 
     if (source) params.append('source', source);
     if (tags) params.append('tags', tags);
@@ -536,8 +537,16 @@ app.get('/sitemap.xml', async (_req, res) => {
 
   let datasetUrls = [];
   try {
-    const response = await axios.get(`${API_URL}/datasets?page_size=200&sort_by=created_at`);
-    const datasets = response.data.datasets || [];
+    // Parcours par curseur : coût constant par page, pas de COUNT
+    const datasets = [];
+    let cursor = null;
+    do {
+      const params = new URLSearchParams({ page_size: '100', sort_by: 'created_at', count: 'none' });
+      if (cursor) params.append('cursor', cursor);
+      const response = await axios.get(`${API_URL}/datasets?${params.toString()}`);
+      datasets.push(...(response.data.datasets || []));
+      cursor = response.data.next_cursor;
+    } while (cursor);
     datasetUrls = datasets.map(ds => ({
       path: `/modeling/${ds.id}`,
       priority: '0.8',
@@ -600,7 +609,8 @@ app.get('/api/search', limiter, async (req, res) => {
     const response = await axios.get(`${API_URL}/datasets`, {
       params: {
         search: sanitizedQuery,
-        page_size: 5
+        page_size: 5,
+        count: 'none'
       }
     });
 
@@ -6,6 +6,21 @@
 -- Extension pour UUID
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Extensions pour la recherche (accents, tolérance aux fautes de frappe)
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Configuration plein texte française insensible aux accents
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'fr_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION fr_unaccent (COPY = french);
+        ALTER TEXT SEARCH CONFIGURATION fr_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+    END IF;
+END;
+$$;
+
 -- ============================================
 -- ENUM Types
 -- ============================================
@@ -55,6 +70,9 @@ CREATE TYPE metric_type AS ENUM (
     'other'
 );
 
+-- État du précalcul des analyses d'un fichier (aperçu, profil, corrélations)
+CREATE TYPE analytics_status AS ENUM ('pending', 'running', 'done', 'failed');
+
 -- ============================================
 -- Table: datasets
 -- ============================================
@@ -93,6 +111,23 @@ CREATE TABLE datasets (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Compteur de téléchargements (incrémenté par increment_download_counts)
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS download_count INTEGER DEFAULT 0;
+
+-- Précalcul des analyses, lancé à chaque upload de fichier
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS analytics_status analytics_status;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS analytics_error TEXT;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS analytics_updated_at TIMESTAMP WITH TIME ZONE;
+
+-- Fichier courant (uploadé via l'API) ; file_hash = SHA-256 du contenu
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS file_url TEXT;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS file_hash VARCHAR(64);
+-- Copie Parquet typée du fichier (sidecars/<sha256>.v<n>.parquet), lue par les analyses
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS sidecar_url TEXT;
+-- computed_cache (bases existantes) : remplacé par la table dataset_analytics,
+-- plus lu ni écrit. La colonne est laissée en place ; la supprimer relève d'un
+-- nettoyage manuel, une fois toutes les instances de l'API mises à jour.
+
 -- Index pour recherche et filtrage
 CREATE INDEX idx_datasets_source ON datasets(source);
 CREATE INDEX idx_datasets_tags ON datasets USING GIN(tags);
@@ -102,6 +137,73 @@ CREATE INDEX idx_datasets_best_fit_models ON datasets USING GIN(best_fit_models)
 CREATE INDEX idx_datasets_global_score ON datasets(global_score DESC);
 CREATE INDEX idx_datasets_created_at ON datasets(created_at DESC);
 
+-- Index composites pour la pagination par curseur (keyset sur (sort_by, id))
+-- Les scores triables ne sont jamais NULL (un curseur sur NULL ne se compare à rien)
+UPDATE datasets SET global_score = 0 WHERE global_score IS NULL;
+UPDATE datasets SET review_count = 0 WHERE review_count IS NULL;
+ALTER TABLE datasets ALTER COLUMN global_score SET NOT NULL;
+ALTER TABLE datasets ALTER COLUMN review_count SET NOT NULL;
+CREATE INDEX idx_datasets_keyset_global_score ON datasets(global_score, id);
+CREATE INDEX idx_datasets_keyset_created_at ON datasets(created_at, id);
+CREATE INDEX idx_datasets_keyset_name ON datasets(name, id);
+CREATE INDEX idx_datasets_keyset_review_count ON datasets(review_count, id);
+
+-- ============================================
+-- Recherche plein texte et approchée
+-- ============================================
+-- search_vector est une colonne générée (pondérée : nom A, tags B,
+-- description C) indexée en GIN ; l'index trigramme sur le nom rattrape les
+-- fautes de frappe. Les requêtes passent par search_datasets (RPC).
+
+-- unaccent() n'est que STABLE : wrapper IMMUTABLE (dictionnaire explicite) pour les index
+CREATE OR REPLACE FUNCTION immutable_unaccent(TEXT)
+RETURNS TEXT AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+CREATE OR REPLACE FUNCTION datasets_search_document(p_name TEXT, p_description TEXT, p_tags business_tag[])
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('fr_unaccent', COALESCE(p_name, '')), 'A')
+        || setweight(to_tsvector('fr_unaccent', COALESCE(array_to_string(p_tags::TEXT[], ' '), '')), 'B')
+        || setweight(to_tsvector('fr_unaccent', COALESCE(p_description, '')), 'C')
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (datasets_search_document(name, description, tags)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_datasets_search_vector ON datasets USING GIN(search_vector);
+CREATE INDEX IF NOT EXISTS idx_datasets_name_trgm ON datasets USING GIN(immutable_unaccent(lower(name)) gin_trgm_ops);
+
+-- Requête préfixée pour la recherche à la frappe : 'assur auto' -> 'assur':* & 'auto':*
+-- STABLE : la configuration est résolue par son nom (search_path, dictionnaires modifiables)
+CREATE OR REPLACE FUNCTION search_prefix_tsquery(p_query TEXT)
+RETURNS tsquery AS $$
+    SELECT to_tsquery('fr_unaccent', string_agg(quote_literal(w) || ':*', ' & '))
+    FROM regexp_split_to_table(lower(p_query), '[^[:alnum:]]+') AS w
+    WHERE w <> ''
+$$ LANGUAGE sql STABLE;
+
+-- Datasets correspondant à p_query, du plus pertinent au moins pertinent.
+-- Filtres, projection et pagination s'appliquent par-dessus via PostgREST.
+CREATE OR REPLACE FUNCTION search_datasets(p_query TEXT)
+RETURNS SETOF datasets AS $$
+DECLARE
+    tsq tsquery := search_prefix_tsquery(p_query);
+    normalized TEXT := immutable_unaccent(lower(btrim(p_query)));
+BEGIN
+    RETURN QUERY
+    SELECT d.*
+    FROM datasets d
+    WHERE d.search_vector @@ tsq
+       OR normalized <% immutable_unaccent(lower(d.name))
+    ORDER BY
+        COALESCE(ts_rank_cd(d.search_vector, tsq), 0)
+            + word_similarity(normalized, immutable_unaccent(lower(d.name))) DESC,
+        d.global_score DESC,
+        d.id;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
 -- ============================================
 -- Table: reviews (évaluations)
 -- ============================================
@@ -195,47 +297,648 @@ CREATE INDEX idx_benchmarks_metric_value ON benchmarks(metric_value);
 CREATE INDEX idx_benchmarks_user_id ON benchmarks(user_id);
 
 -- ============================================
--- Fonction: Calcul du score global
+-- Table: user_favorites (datasets favoris)
 -- ============================================
-CREATE OR REPLACE FUNCTION calculate_dataset_scores()
-RETURNS TRIGGER AS $$
+CREATE TABLE IF NOT EXISTS user_favorites (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id VARCHAR(255) NOT NULL,
+    dataset_id UUID NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    UNIQUE(user_id, dataset_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_favorites_dataset_id ON user_favorites(dataset_id);
+
+-- ============================================
+-- Scores agrégés: maintenance incrémentale
+-- ============================================
+-- Les sommes par critère et review_count sont tenus à jour par deltas (O(1)
+-- par avis modifié) ; les moyennes et le score global en sont dérivés. Les
+-- triggers sont au niveau instruction (tables de transition) : un import de
+-- N avis ne fait qu'une mise à jour par dataset touché.
+
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS utility_sum BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS cleanliness_sum BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS documentation_sum BIGINT NOT NULL DEFAULT 0;
+
+-- Ancien trigger ligne à ligne (recalcul complet à chaque avis)
+DROP TRIGGER IF EXISTS trigger_update_dataset_scores ON reviews;
+DROP FUNCTION IF EXISTS calculate_dataset_scores();
+
+-- Applique des deltas (sommes et nombre d'avis) et recalcule les colonnes dérivées.
+-- Réservée au service ; les triggers (SECURITY DEFINER) l'appellent en tant
+-- que propriétaire, quel que soit le rôle qui écrit l'avis.
+CREATE OR REPLACE FUNCTION apply_dataset_score_deltas(p_deltas JSONB)
+RETURNS VOID AS $$
 BEGIN
-    UPDATE datasets
+    UPDATE datasets d
+    SET
+        utility_sum = d.utility_sum + t.du,
+        cleanliness_sum = d.cleanliness_sum + t.dc,
+        documentation_sum = d.documentation_sum + t.dd,
+        review_count = COALESCE(d.review_count, 0) + t.dn,
+        updated_at = NOW()
+    FROM (
+        SELECT
+            (e->>'dataset_id')::UUID AS dataset_id,
+            SUM((e->>'du')::BIGINT) AS du,
+            SUM((e->>'dc')::BIGINT) AS dc,
+            SUM((e->>'dd')::BIGINT) AS dd,
+            SUM((e->>'dn')::INTEGER) AS dn
+        FROM jsonb_array_elements(p_deltas) e
+        GROUP BY 1
+    ) t
+    WHERE d.id = t.dataset_id;
+
+    UPDATE datasets d
     SET
-        avg_utility_score = (
-            SELECT COALESCE(AVG(utility_score), 0)
-            FROM reviews WHERE dataset_id = COALESCE(NEW.dataset_id, OLD.dataset_id)
-        ),
-        avg_cleanliness_score = (
-            SELECT COALESCE(AVG(cleanliness_score), 0)
-            FROM reviews WHERE dataset_id = COALESCE(NEW.dataset_id, OLD.dataset_id)
-        ),
-        avg_documentation_score = (
-            SELECT COALESCE(AVG(documentation_score), 0)
-            FROM reviews WHERE dataset_id = COALESCE(NEW.dataset_id, OLD.dataset_id)
-        ),
-        global_score = (
-            SELECT COALESCE(
-                (AVG(utility_score) * 0.4 + AVG(cleanliness_score) * 0.35 + AVG(documentation_score) * 0.25),
-                0
-            )
-            FROM reviews WHERE dataset_id = COALESCE(NEW.dataset_id, OLD.dataset_id)
-        ),
-        review_count = (
-            SELECT COUNT(*)
-            FROM reviews WHERE dataset_id = COALESCE(NEW.dataset_id, OLD.dataset_id)
-        ),
+        avg_utility_score = CASE WHEN d.review_count > 0 THEN d.utility_sum::NUMERIC / d.review_count ELSE 0 END,
+        avg_cleanliness_score = CASE WHEN d.review_count > 0 THEN d.cleanliness_sum::NUMERIC / d.review_count ELSE 0 END,
+        avg_documentation_score = CASE WHEN d.review_count > 0 THEN d.documentation_sum::NUMERIC / d.review_count ELSE 0 END,
+        global_score = CASE WHEN d.review_count > 0 THEN
+            (d.utility_sum * 0.4 + d.cleanliness_sum * 0.35 + d.documentation_sum * 0.25) / d.review_count
+            ELSE 0 END
+    WHERE d.id IN (SELECT (e->>'dataset_id')::UUID FROM jsonb_array_elements(p_deltas) e);
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION apply_dataset_score_deltas(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION apply_dataset_score_deltas(JSONB) TO service_role;
+
+CREATE OR REPLACE FUNCTION reviews_after_insert_scores()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_dataset_score_deltas(COALESCE((
+        SELECT jsonb_agg(to_jsonb(t))
+        FROM (
+            SELECT dataset_id, SUM(utility_score) AS du, SUM(cleanliness_score) AS dc,
+                   SUM(documentation_score) AS dd, COUNT(*) AS dn
+            FROM new_reviews
+            GROUP BY dataset_id
+        ) t
+    ), '[]'::JSONB));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION reviews_after_delete_scores()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_dataset_score_deltas(COALESCE((
+        SELECT jsonb_agg(to_jsonb(t))
+        FROM (
+            SELECT dataset_id, -SUM(utility_score) AS du, -SUM(cleanliness_score) AS dc,
+                   -SUM(documentation_score) AS dd, -COUNT(*) AS dn
+            FROM old_reviews
+            GROUP BY dataset_id
+        ) t
+    ), '[]'::JSONB));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Un UPDATE peut changer les notes ou (rarement) le dataset_id : +nouveau, -ancien
+CREATE OR REPLACE FUNCTION reviews_after_update_scores()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_dataset_score_deltas(COALESCE((
+        SELECT jsonb_agg(to_jsonb(t))
+        FROM (
+            SELECT dataset_id, SUM(du) AS du, SUM(dc) AS dc, SUM(dd) AS dd, SUM(dn) AS dn
+            FROM (
+                SELECT dataset_id, utility_score AS du, cleanliness_score AS dc, documentation_score AS dd, 1 AS dn
+                FROM new_reviews
+                UNION ALL
+                SELECT dataset_id, -utility_score, -cleanliness_score, -documentation_score, -1
+                FROM old_reviews
+            ) changes
+            GROUP BY dataset_id
+        ) t
+        WHERE du <> 0 OR dc <> 0 OR dd <> 0 OR dn <> 0
+    ), '[]'::JSONB));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER trigger_reviews_insert_scores
+AFTER INSERT ON reviews
+REFERENCING NEW TABLE AS new_reviews
+FOR EACH STATEMENT EXECUTE FUNCTION reviews_after_insert_scores();
+
+CREATE TRIGGER trigger_reviews_update_scores
+AFTER UPDATE ON reviews
+REFERENCING OLD TABLE AS old_reviews NEW TABLE AS new_reviews
+FOR EACH STATEMENT EXECUTE FUNCTION reviews_after_update_scores();
+
+CREATE TRIGGER trigger_reviews_delete_scores
+AFTER DELETE ON reviews
+REFERENCING OLD TABLE AS old_reviews
+FOR EACH STATEMENT EXECUTE FUNCTION reviews_after_delete_scores();
+
+-- Contrôle: compare les valeurs incrémentales à un recalcul complet.
+-- Ne renvoie que les datasets en écart (aucune ligne = tout est cohérent).
+CREATE OR REPLACE FUNCTION verify_dataset_scores()
+RETURNS TABLE (
+    dataset_id UUID,
+    review_count INTEGER,
+    expected_review_count BIGINT,
+    global_score DECIMAL,
+    expected_global_score DECIMAL
+) AS $$
+    SELECT
+        d.id,
+        d.review_count,
+        COALESCE(r.n, 0),
+        d.global_score,
+        ROUND(COALESCE(r.global, 0), 1)
+    FROM datasets d
+    LEFT JOIN (
+        SELECT
+            reviews.dataset_id,
+            COUNT(*) AS n,
+            SUM(utility_score) AS su,
+            SUM(cleanliness_score) AS sc,
+            SUM(documentation_score) AS sd,
+            AVG(utility_score) * 0.4 + AVG(cleanliness_score) * 0.35 + AVG(documentation_score) * 0.25 AS global
+        FROM reviews
+        GROUP BY reviews.dataset_id
+    ) r ON r.dataset_id = d.id
+    WHERE COALESCE(d.review_count, 0) <> COALESCE(r.n, 0)
+       OR d.utility_sum <> COALESCE(r.su, 0)
+       OR d.cleanliness_sum <> COALESCE(r.sc, 0)
+       OR d.documentation_sum <> COALESCE(r.sd, 0)
+       OR d.global_score <> ROUND(COALESCE(r.global, 0), 1);
+$$ LANGUAGE sql STABLE;
+
+-- Réinitialise sommes et moyennes depuis un recalcul complet (migration, réparation)
+CREATE OR REPLACE FUNCTION rebuild_dataset_scores()
+RETURNS VOID AS $$
+BEGIN
+    UPDATE datasets SET utility_sum = 0, cleanliness_sum = 0, documentation_sum = 0, review_count = 0;
+
+    PERFORM apply_dataset_score_deltas(COALESCE((
+        SELECT jsonb_agg(jsonb_build_object(
+            'dataset_id', d.id,
+            'du', COALESCE(r.du, 0), 'dc', COALESCE(r.dc, 0),
+            'dd', COALESCE(r.dd, 0), 'dn', COALESCE(r.dn, 0)
+        ))
+        FROM datasets d
+        LEFT JOIN (
+            SELECT reviews.dataset_id, SUM(utility_score) AS du, SUM(cleanliness_score) AS dc,
+                   SUM(documentation_score) AS dd, COUNT(*) AS dn
+            FROM reviews
+            GROUP BY reviews.dataset_id
+        ) r ON r.dataset_id = d.id
+    ), '[]'::JSONB));
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION rebuild_dataset_scores() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION rebuild_dataset_scores() TO service_role;
+
+-- Reprise des sommes ajoutées plus haut (DEFAULT 0) depuis les avis existants
+SELECT rebuild_dataset_scores();
+
+-- ============================================
+-- Fonctions RPC: écritures atomiques en un seul aller-retour
+-- ============================================
+-- Les conflits sont signalés par des SQLSTATE dédiés, traduits en codes HTTP
+-- par l'API (app/core/database.py: rpc) :
+--   SQD01  dataset introuvable         -> 404
+--   SQD02  avis déjà déposé            -> 409
+--   SQD03  benchmark introuvable       -> 404
+-- Elles font confiance à leurs paramètres (p_user_id) : seule l'API, après
+-- avoir vérifié le jeton de l'utilisateur, les appelle (service_role).
+
+-- Crée un avis (vérification du dataset + unicité + insertion)
+CREATE OR REPLACE FUNCTION create_review(
+    p_dataset_id UUID,
+    p_user_id VARCHAR,
+    p_utility_score INTEGER,
+    p_cleanliness_score INTEGER,
+    p_documentation_score INTEGER,
+    p_comment TEXT DEFAULT NULL
+)
+RETURNS reviews AS $$
+DECLARE
+    new_review reviews;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM datasets WHERE id = p_dataset_id) THEN
+        RAISE EXCEPTION 'Dataset not found' USING ERRCODE = 'SQD01';
+    END IF;
+
+    INSERT INTO reviews (dataset_id, user_id, utility_score, cleanliness_score, documentation_score, comment)
+    VALUES (p_dataset_id, p_user_id, p_utility_score, p_cleanliness_score, p_documentation_score, p_comment)
+    ON CONFLICT (dataset_id, user_id) DO NOTHING
+    RETURNING * INTO new_review;
+
+    IF new_review.id IS NULL THEN
+        RAISE EXCEPTION 'Review already exists' USING ERRCODE = 'SQD02';
+    END IF;
+
+    RETURN new_review;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION create_review(UUID, VARCHAR, INTEGER, INTEGER, INTEGER, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_review(UUID, VARCHAR, INTEGER, INTEGER, INTEGER, TEXT) TO service_role;
+
+-- Ajoute un favori ; renvoie FALSE s'il existait déjà
+CREATE OR REPLACE FUNCTION add_favorite(p_dataset_id UUID, p_user_id VARCHAR)
+RETURNS BOOLEAN AS $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM datasets WHERE id = p_dataset_id) THEN
+        RAISE EXCEPTION 'Dataset not found' USING ERRCODE = 'SQD01';
+    END IF;
+
+    INSERT INTO user_favorites (user_id, dataset_id)
+    VALUES (p_user_id, p_dataset_id)
+    ON CONFLICT (user_id, dataset_id) DO NOTHING;
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION add_favorite(UUID, VARCHAR) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION add_favorite(UUID, VARCHAR) TO service_role;
+
+-- Bascule un favori ; renvoie le nouvel état (TRUE = en favori)
+CREATE OR REPLACE FUNCTION toggle_favorite(p_dataset_id UUID, p_user_id VARCHAR)
+RETURNS BOOLEAN AS $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM datasets WHERE id = p_dataset_id) THEN
+        RAISE EXCEPTION 'Dataset not found' USING ERRCODE = 'SQD01';
+    END IF;
+
+    DELETE FROM user_favorites
+    WHERE user_id = p_user_id AND dataset_id = p_dataset_id;
+
+    IF FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    INSERT INTO user_favorites (user_id, dataset_id)
+    VALUES (p_user_id, p_dataset_id)
+    ON CONFLICT (user_id, dataset_id) DO NOTHING;
+
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION toggle_favorite(UUID, VARCHAR) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION toggle_favorite(UUID, VARCHAR) TO service_role;
+
+-- Incrémente atomiquement les upvotes d'un benchmark (pas de lecture-modification-écriture)
+CREATE OR REPLACE FUNCTION upvote_benchmark(p_benchmark_id UUID)
+RETURNS benchmarks AS $$
+DECLARE
+    updated benchmarks;
+BEGIN
+    UPDATE benchmarks
+    SET upvotes = COALESCE(upvotes, 0) + 1
+    WHERE id = p_benchmark_id
+    RETURNING * INTO updated;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Benchmark not found' USING ERRCODE = 'SQD03';
+    END IF;
+
+    RETURN updated;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION upvote_benchmark(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION upvote_benchmark(UUID) TO service_role;
+
+-- ============================================
+-- Téléchargements: cumul journalier + incrément groupé
+-- ============================================
+CREATE TABLE IF NOT EXISTS dataset_download_daily (
+    dataset_id UUID NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    downloads INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (dataset_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dataset_download_daily_day ON dataset_download_daily(day);
+
+-- Applique en une fois les incréments accumulés par l'API :
+-- p_counts = [{"dataset_id": "...", "day": "YYYY-MM-DD", "count": 3}, ...]
+CREATE OR REPLACE FUNCTION increment_download_counts(p_counts JSONB)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE datasets d
+    SET download_count = COALESCE(d.download_count, 0) + t.total
+    FROM (
+        SELECT (e->>'dataset_id')::UUID AS dataset_id, SUM((e->>'count')::INTEGER) AS total
+        FROM jsonb_array_elements(p_counts) e
+        GROUP BY 1
+    ) t
+    WHERE d.id = t.dataset_id;
+
+    INSERT INTO dataset_download_daily (dataset_id, day, downloads)
+    SELECT i.dataset_id, i.day, i.total
+    FROM (
+        SELECT (e->>'dataset_id')::UUID AS dataset_id, (e->>'day')::DATE AS day, SUM((e->>'count')::INTEGER) AS total
+        FROM jsonb_array_elements(p_counts) e
+        GROUP BY 1, 2
+    ) i
+    WHERE EXISTS (SELECT 1 FROM datasets d WHERE d.id = i.dataset_id)
+    ON CONFLICT (dataset_id, day)
+    DO UPDATE SET downloads = dataset_download_daily.downloads + EXCLUDED.downloads;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Appelée uniquement par l'API (app/core/counters.py, client service_role)
+REVOKE EXECUTE ON FUNCTION increment_download_counts(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION increment_download_counts(JSONB) TO service_role;
+
+-- ============================================
+-- File de tâches de fond (python -m app.worker)
+-- ============================================
+CREATE TYPE job_status AS ENUM ('queued', 'running', 'succeeded', 'failed');
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    task VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    idempotency_key VARCHAR(500),
+    priority INTEGER NOT NULL DEFAULT 0,  -- plus grand = pris en premier
+    status job_status NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by VARCHAR(255),
+    locked_at TIMESTAMPTZ,  -- dernier signe de vie du worker
+    progress REAL NOT NULL DEFAULT 0 CHECK (progress >= 0 AND progress <= 1),
+    progress_message TEXT,
+    result JSONB,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+-- Idempotence : une seule tâche en attente ou en cours par clé
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_idempotency_active ON jobs(idempotency_key)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(priority DESC, run_after, created_at)
+    WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs(locked_at)
+    WHERE status = 'running';
+
+-- Inscrit une tâche ; si une tâche active porte déjà la même clé d'idempotence,
+-- elle est renvoyée telle quelle (priorité relevée si besoin)
+CREATE OR REPLACE FUNCTION enqueue_job(
+    p_task VARCHAR,
+    p_payload JSONB DEFAULT '{}'::jsonb,
+    p_idempotency_key VARCHAR DEFAULT NULL,
+    p_priority INTEGER DEFAULT 0,
+    p_max_attempts INTEGER DEFAULT 5,
+    p_delay_s DOUBLE PRECISION DEFAULT 0
+)
+RETURNS jobs AS $$
+DECLARE
+    job jobs;
+BEGIN
+    LOOP
+        INSERT INTO jobs (task, payload, idempotency_key, priority, max_attempts, run_after)
+        VALUES (
+            p_task, COALESCE(p_payload, '{}'::jsonb), p_idempotency_key, p_priority, p_max_attempts,
+            NOW() + make_interval(secs => p_delay_s)
+        )
+        ON CONFLICT (idempotency_key) WHERE status IN ('queued', 'running') DO NOTHING
+        RETURNING * INTO job;
+
+        IF job.id IS NOT NULL THEN
+            RETURN job;
+        END IF;
+
+        UPDATE jobs
+        SET priority = GREATEST(priority, p_priority), updated_at = NOW()
+        WHERE idempotency_key = p_idempotency_key AND status IN ('queued', 'running')
+        RETURNING * INTO job;
+
+        -- Sinon la tâche existante vient de se terminer : nouvel essai d'insertion
+        IF job.id IS NOT NULL THEN
+            RETURN job;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION enqueue_job(VARCHAR, JSONB, VARCHAR, INTEGER, INTEGER, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION enqueue_job(VARCHAR, JSONB, VARCHAR, INTEGER, INTEGER, DOUBLE PRECISION) TO service_role;
+
+-- Réserve jusqu'à p_limit tâches prêtes, par priorité puis ancienneté.
+-- SKIP LOCKED : plusieurs workers se partagent la file sans se bloquer.
+CREATE OR REPLACE FUNCTION claim_jobs(p_worker VARCHAR, p_limit INTEGER DEFAULT 1, p_tasks VARCHAR[] DEFAULT NULL)
+RETURNS SETOF jobs AS $$
+    UPDATE jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_by = p_worker,
+        locked_at = NOW(),
+        progress = 0,
+        progress_message = NULL,
         updated_at = NOW()
-    WHERE id = COALESCE(NEW.dataset_id, OLD.dataset_id);
+    FROM (
+        SELECT id
+        FROM jobs
+        WHERE status = 'queued'
+          AND run_after <= NOW()
+          AND (p_tasks IS NULL OR task = ANY(p_tasks))
+        ORDER BY priority DESC, run_after, created_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) claimed
+    WHERE j.id = claimed.id
+    RETURNING j.*;
+$$ LANGUAGE sql;
+
+REVOKE EXECUTE ON FUNCTION claim_jobs(VARCHAR, INTEGER, VARCHAR[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION claim_jobs(VARCHAR, INTEGER, VARCHAR[]) TO service_role;
+
+-- Avancement + signe de vie ; FALSE si la tâche n'appartient plus à ce worker
+CREATE OR REPLACE FUNCTION update_job_progress(
+    p_job_id UUID,
+    p_worker VARCHAR,
+    p_progress REAL DEFAULT NULL,
+    p_message TEXT DEFAULT NULL
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE jobs
+    SET progress = COALESCE(LEAST(GREATEST(p_progress, 0), 1), progress),
+        progress_message = COALESCE(p_message, progress_message),
+        locked_at = NOW(),
+        updated_at = NOW()
+    WHERE id = p_job_id AND status = 'running' AND locked_by = p_worker;
 
-    RETURN COALESCE(NEW, OLD);
+    RETURN FOUND;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger pour mise à jour automatique des scores
-CREATE TRIGGER trigger_update_dataset_scores
-AFTER INSERT OR UPDATE OR DELETE ON reviews
-FOR EACH ROW EXECUTE FUNCTION calculate_dataset_scores();
+REVOKE EXECUTE ON FUNCTION update_job_progress(UUID, VARCHAR, REAL, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION update_job_progress(UUID, VARCHAR, REAL, TEXT) TO service_role;
+
+CREATE OR REPLACE FUNCTION complete_job(p_job_id UUID, p_worker VARCHAR, p_result JSONB DEFAULT NULL)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE jobs
+    SET status = 'succeeded',
+        progress = 1,
+        result = p_result,
+        last_error = NULL,
+        locked_by = NULL,
+        locked_at = NULL,
+        finished_at = NOW(),
+        updated_at = NOW()
+    WHERE id = p_job_id AND status = 'running' AND locked_by = p_worker;
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION complete_job(UUID, VARCHAR, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION complete_job(UUID, VARCHAR, JSONB) TO service_role;
+
+-- Échec d'une tentative : nouvelle tentative dans p_retry_in_s secondes tant
+-- qu'il en reste, échec définitif sinon (ou si p_retry_in_s est NULL)
+CREATE OR REPLACE FUNCTION fail_job(
+    p_job_id UUID,
+    p_worker VARCHAR,
+    p_error TEXT,
+    p_retry_in_s DOUBLE PRECISION DEFAULT NULL
+)
+RETURNS jobs AS $$
+DECLARE
+    job jobs;
+BEGIN
+    UPDATE jobs
+    SET status = CASE
+            WHEN p_retry_in_s IS NOT NULL AND attempts < max_attempts THEN 'queued'::job_status
+            ELSE 'failed'::job_status
+        END,
+        run_after = CASE
+            WHEN p_retry_in_s IS NOT NULL AND attempts < max_attempts THEN NOW() + make_interval(secs => p_retry_in_s)
+            ELSE run_after
+        END,
+        finished_at = CASE
+            WHEN p_retry_in_s IS NOT NULL AND attempts < max_attempts THEN NULL
+            ELSE NOW()
+        END,
+        last_error = p_error,
+        locked_by = NULL,
+        locked_at = NULL,
+        updated_at = NOW()
+    WHERE id = p_job_id AND status = 'running' AND locked_by = p_worker
+    RETURNING * INTO job;
+
+    RETURN job;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION fail_job(UUID, VARCHAR, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION fail_job(UUID, VARCHAR, TEXT, DOUBLE PRECISION) TO service_role;
+
+-- Remet en file les tâches dont le worker ne donne plus signe de vie
+CREATE OR REPLACE FUNCTION requeue_stale_jobs(p_stale_after_s DOUBLE PRECISION)
+RETURNS INTEGER AS $$
+DECLARE
+    requeued INTEGER;
+BEGIN
+    UPDATE jobs j
+    SET status = CASE WHEN j.attempts < j.max_attempts THEN 'queued'::job_status ELSE 'failed'::job_status END,
+        finished_at = CASE WHEN j.attempts < j.max_attempts THEN NULL ELSE NOW() END,
+        last_error = 'Worker lost (no heartbeat)',
+        locked_by = NULL,
+        locked_at = NULL,
+        updated_at = NOW()
+    FROM (
+        SELECT id
+        FROM jobs
+        WHERE status = 'running' AND locked_at < NOW() - make_interval(secs => p_stale_after_s)
+        FOR UPDATE SKIP LOCKED
+    ) stale
+    WHERE j.id = stale.id;
+
+    GET DIAGNOSTICS requeued = ROW_COUNT;
+    RETURN requeued;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION requeue_stale_jobs(DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION requeue_stale_jobs(DOUBLE PRECISION) TO service_role;
+
+-- ============================================
+-- Résultats d'analytics par contenu de fichier
+-- ============================================
+-- Une ligne par (fichier, analyse, version d'algorithme) : deux analyses
+-- écrivent chacune leur ligne sans se marcher dessus, un fichier ré-uploadé à
+-- l'identique retrouve ses résultats, et changer la version d'un algorithme
+-- n'invalide que cette analyse. Le payload est du JSON compressé (zlib,
+-- base64), opaque pour Postgres.
+CREATE TABLE IF NOT EXISTS dataset_analytics (
+    file_hash VARCHAR(128) NOT NULL,
+    analysis_type VARCHAR(50) NOT NULL,
+    algorithm_version INTEGER NOT NULL,
+    encoding VARCHAR(20) NOT NULL DEFAULT 'zlib+base64',
+    payload TEXT NOT NULL,
+    payload_bytes INTEGER,  -- taille du JSON non compressé
+    computed_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (file_hash, analysis_type, algorithm_version)
+);
+
+-- ============================================
+-- Calculs d'analytics : un seul calcul par (analyse, fichier) sur tous les réplicas
+-- ============================================
+-- PostgREST ne garde pas de session ouverte entre deux appels : le verrou
+-- consultatif (transactionnel) sérialise l'acquisition, le bail matérialise la
+-- possession pendant le calcul et expire seul si le réplica disparaît.
+CREATE TABLE IF NOT EXISTS analytics_leases (
+    lease_key VARCHAR(255) PRIMARY KEY,  -- "<analyse>:<file_hash>"
+    holder VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION acquire_analytics_lease(p_key VARCHAR, p_holder VARCHAR, p_ttl_s DOUBLE PRECISION)
+RETURNS BOOLEAN AS $$
+BEGIN
+    -- Un autre réplica est en train de prendre ce bail : il sera le calculateur
+    IF NOT pg_try_advisory_xact_lock(hashtextextended(p_key, 0)) THEN
+        RETURN FALSE;
+    END IF;
+
+    INSERT INTO analytics_leases (lease_key, holder, expires_at)
+    VALUES (p_key, p_holder, NOW() + make_interval(secs => p_ttl_s))
+    ON CONFLICT (lease_key) DO UPDATE
+    SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+    WHERE analytics_leases.expires_at < NOW();
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Prolonge un bail encore détenu (calcul plus long que le TTL) ; FALSE s'il a été perdu
+CREATE OR REPLACE FUNCTION renew_analytics_lease(p_key VARCHAR, p_holder VARCHAR, p_ttl_s DOUBLE PRECISION)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE analytics_leases
+    SET expires_at = NOW() + make_interval(secs => p_ttl_s)
+    WHERE lease_key = p_key AND holder = p_holder;
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION release_analytics_lease(p_key VARCHAR, p_holder VARCHAR)
+RETURNS VOID AS $$
+    DELETE FROM analytics_leases WHERE lease_key = p_key AND holder = p_holder;
+$$ LANGUAGE sql;
 
 -- ============================================
 -- Row Level Security (RLS)
@@ -244,12 +947,22 @@ FOR EACH ROW EXECUTE FUNCTION calculate_dataset_scores();
 -- Activer RLS
 ALTER TABLE datasets ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reviews ENABLE ROW LEVEL SECURITY;
+-- jobs, analytics_leases : aucune politique, accès réservé à la clé service (API et workers)
+ALTER TABLE jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE analytics_leases ENABLE ROW LEVEL SECURITY;
 
 -- Politique: Tout le monde peut lire les datasets
 CREATE POLICY "Datasets are viewable by everyone"
 ON datasets FOR SELECT
 USING (true);
 
+-- Analyses des fichiers publics : lecture libre, écriture par la clé service
+ALTER TABLE dataset_analytics ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Dataset analytics are viewable by everyone"
+ON dataset_analytics FOR SELECT
+USING (true);
+
 -- Politique: Seuls les utilisateurs authentifiés peuvent créer
 CREATE POLICY "Authenticated users can create datasets"
 ON datasets FOR INSERT